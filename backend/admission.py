@@ -0,0 +1,273 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from supabase_client import env_bool, env_float, env_int
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Request headers a GET response can depend on; coalesced requests must agree on them
+VARY_HEADERS = (b"accept", b"if-none-match", b"if-modified-since", b"range")
+
+
+@dataclass
+class AdmissionSettings:
+    """Per-client rate limits, concurrency limits and GET coalescing for /api.
+
+    Off unless ADMISSION_ENABLED is set: clients are keyed on the peer
+    address, which behind a proxy is the proxy itself, so enabling it there
+    needs RATE_LIMIT_TRUST_FORWARDED as well (see README).
+    """
+    enabled: bool = False
+    rate: float = 20.0  # tokens per second per client
+    burst: float = 40.0  # bucket size
+    heavy_cost: float = 5.0  # tokens taken by a write or export
+    max_clients: int = 10_000  # buckets kept; the least recently seen are dropped
+    trust_forwarded: bool = False  # key clients on X-Forwarded-For (behind a proxy)
+    heavy_concurrency: int = 8
+    heavy_queue: int = 32
+    read_concurrency: int = 64
+    read_queue: int = 256
+    queue_timeout: float = 2.0  # seconds a request may wait for a slot
+    coalesce: bool = True
+    coalesce_max_bytes: int = 4 * 1024 * 1024  # larger responses are not shared
+
+    @classmethod
+    def from_env(cls) -> "AdmissionSettings":
+        return cls(
+            enabled=env_bool("ADMISSION_ENABLED", cls.enabled),
+            rate=env_float("RATE_LIMIT_PER_SECOND", cls.rate),
+            burst=env_float("RATE_LIMIT_BURST", cls.burst),
+            heavy_cost=env_float("RATE_LIMIT_HEAVY_COST", cls.heavy_cost),
+            max_clients=env_int("RATE_LIMIT_MAX_CLIENTS", cls.max_clients),
+            trust_forwarded=env_bool("RATE_LIMIT_TRUST_FORWARDED", cls.trust_forwarded),
+            heavy_concurrency=env_int("HEAVY_CONCURRENCY", cls.heavy_concurrency),
+            heavy_queue=env_int("HEAVY_QUEUE", cls.heavy_queue),
+            read_concurrency=env_int("READ_CONCURRENCY", cls.read_concurrency),
+            read_queue=env_int("READ_QUEUE", cls.read_queue),
+            queue_timeout=env_float("ADMISSION_QUEUE_TIMEOUT", cls.queue_timeout),
+            coalesce=env_bool("COALESCE_GETS", cls.coalesce),
+            coalesce_max_bytes=env_int("COALESCE_MAX_BYTES", cls.coalesce_max_bytes),
+        )
+
+
+class RateLimiter:
+    """Token bucket per client key"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self.buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, updated]
+        self.limited_total = 0
+
+    def take(self, key: str, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0 when admitted, else seconds until they refill"""
+        now = self._clock()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        cost = min(cost, self.burst)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        self.limited_total += 1
+        return (cost - bucket[0]) / self.rate if self.rate > 0 else math.inf
+
+
+class ConcurrencyLimit:
+    """At most `limit` requests at once; up to `queue` more wait `timeout` seconds"""
+
+    def __init__(self, limit: int, queue: int, timeout: float):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed_total = 0
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        elif self.waiting >= self.queue:
+            self.shed_total += 1
+            return False
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.shed_total += 1
+                return False
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": self.waiting,
+                "shed_total": self.shed_total}
+
+
+class AdmissionControl:
+    """Shared state behind AdmissionMiddleware (also read by /api/health/admission)"""
+
+    def __init__(self, settings: AdmissionSettings):
+        self.settings = settings
+        self.limiter = RateLimiter(settings.rate, settings.burst, settings.max_clients)
+        self.heavy = ConcurrencyLimit(settings.heavy_concurrency, settings.heavy_queue, settings.queue_timeout)
+        self.read = ConcurrencyLimit(settings.read_concurrency, settings.read_queue, settings.queue_timeout)
+        self.flights: Dict[tuple, asyncio.Future] = {}
+        self.coalesced_total = 0
+
+    def client_key(self, scope) -> str:
+        if self.settings.trust_forwarded:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",", 1)[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.settings.enabled,
+            "clients": len(self.limiter.buckets),
+            "rate_limited_total": self.limiter.limited_total,
+            "heavy": self.heavy.stats(),
+            "read": self.read.stats(),
+            "coalescing": len(self.flights),
+            "coalesced_total": self.coalesced_total,
+        }
+
+
+async def send_rejection(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def copy_message(message: dict) -> dict:
+    if "headers" in message:
+        return {**message, "headers": list(message["headers"])}
+    return dict(message)
+
+
+class AdmissionMiddleware:
+    """Admission control for requests under `prefix`.
+
+    In order: a per-client token bucket (429 when empty; writes and exports
+    cost `heavy_cost` tokens), coalescing of identical concurrent GETs onto
+    one handler run whose response is replayed to every waiter, and
+    separate concurrency limits for heavy requests (writes, exports) and
+    cheap reads (503 once their queue is full or the wait times out).
+    Rejections carry Retry-After. Health checks are exempt; the change
+    stream is rate limited but holds no concurrency slot.
+    """
+
+    def __init__(self, app, control: AdmissionControl, prefix: str = "/api",
+                 exempt: Tuple[str, ...] = ("/api/health",),
+                 unlimited: Tuple[str, ...] = ("/api/courses/stream",),
+                 heavy_paths: Tuple[str, ...] = ("/api/courses/export",)):
+        self.app = app
+        self.control = control
+        self.prefix = prefix
+        self.exempt = exempt
+        self.unlimited = unlimited
+        self.heavy_paths = heavy_paths
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not self.control.settings.enabled or not path.startswith(self.prefix)
+                or path.startswith(self.exempt)):
+            await self.app(scope, receive, send)
+            return
+
+        control = self.control
+        settings = control.settings
+        method = scope["method"]
+        heavy = method in WRITE_METHODS or path.startswith(self.heavy_paths)
+        wait = control.limiter.take(control.client_key(scope), settings.heavy_cost if heavy else 1.0)
+        if wait:
+            await send_rejection(send, 429, "Rate limit exceeded", wait)
+            return
+
+        if path.startswith(self.unlimited):
+            await self.app(scope, receive, send)
+            return
+        if method == "GET" and settings.coalesce and not heavy:
+            await self._coalesced(scope, receive, send)
+            return
+        await self._limited(control.heavy if heavy else control.read, scope, receive, send)
+
+    async def _limited(self, limit: ConcurrencyLimit, scope, receive, send) -> None:
+        if not await limit.acquire():
+            await send_rejection(send, 503, "Server busy, retry shortly", limit.timeout)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+    async def _coalesced(self, scope, receive, send) -> None:
+        control = self.control
+        headers = dict(scope["headers"])
+        key = (scope["path"], scope["query_string"], *(headers.get(name) for name in VARY_HEADERS))
+        flight = control.flights.get(key)
+        if flight is not None:
+            messages = await asyncio.shield(flight)
+            if messages is not None:
+                control.coalesced_total += 1
+                for message in messages:
+                    await send(copy_message(message))
+                return
+            # The leader's response could not be shared; run our own
+            await self._limited(control.read, scope, receive, send)
+            return
+
+        flight = control.flights[key] = asyncio.get_running_loop().create_future()
+        messages: Optional[list] = []
+        size = 0
+
+        async def capture(message):
+            nonlocal messages, size
+            if messages is not None:
+                size += len(message.get("body", b""))
+                if size > control.settings.coalesce_max_bytes:
+                    # Too large to hold for followers: release them now
+                    messages = None
+                    control.flights.pop(key, None)
+                    flight.set_result(None)
+                else:
+                    # Outer middleware may rewrite the message in place once sent
+                    messages.append(copy_message(message))
+            await send(message)
+
+        try:
+            await self._limited(control.read, scope, receive, capture)
+        finally:
+            if control.flights.get(key) is flight:
+                del control.flights[key]
+            if not flight.done():
+                complete = bool(messages) and messages[-1]["type"] == "http.response.body" \
+                    and not messages[-1].get("more_body", False)
+                flight.set_result(messages if complete else None)
@@ -0,0 +1,230 @@
+import asyncio
+import base64
+import binascii
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from blobstore import BlobStore, iter_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def is_inline(file: dict) -> bool:
+    """True for attachments still carrying Base64 `data` (or bytes already
+    decoded off the event loop, in `content`) rather than a blob id"""
+    return isinstance(file, dict) and bool(file.get("data") or "content" in file) and not file.get("blob_id")
+
+
+def decode_data(data: str) -> bytes:
+    """Decode a Base64 payload, with or without a `data:<type>;base64,` prefix"""
+    if data.startswith("data:"):
+        _, _, data = data.partition(",")
+    try:
+        return base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("file data is not valid Base64")
+
+
+def file_metadata(file: dict, blob_id: str, size: int, sha256: str) -> dict:
+    metadata = {
+        "id": file.get("id") or str(uuid.uuid4()),
+        "name": file.get("name") or "file",
+        "type": file.get("type") or "application/octet-stream",
+        "size": size,
+        "sha256": sha256,
+        "blob_id": blob_id,
+    }
+    if file.get("lastModified") is not None:
+        metadata["lastModified"] = file["lastModified"]
+    return metadata
+
+
+async def externalize_file(store: BlobStore, file: dict) -> dict:
+    """Move one inline attachment into the blob store, returning its metadata"""
+    payload = file.get("content")
+    if payload is None:
+        payload = await asyncio.to_thread(decode_data, file["data"])
+    info = await store.write(iter_bytes(payload))
+    return file_metadata(file, info.blob_id, info.size, info.sha256)
+
+
+async def externalize_files(store: BlobStore, files: Optional[List[dict]]) -> Tuple[List[dict], bool]:
+    """Externalize every inline attachment; returns (files, whether any changed)"""
+    result = []
+    written = []
+    try:
+        for file in files or []:
+            if is_inline(file):
+                file = await externalize_file(store, file)
+                written.append(file["blob_id"])
+            result.append(file)
+    except BaseException:
+        # A later attachment was invalid: nothing will refer to the blobs stored so far
+        for blob_id in written:
+            await store.delete(blob_id)
+        raise
+    return result, bool(written)
+
+
+class InlineFileMigration:
+    """Background job moving legacy Base64 attachments out of course rows.
+
+    `fetch_page(after_id)` returns the next batch of {id, version, files}
+    rows ordered by id; `save_files(course_id, files, version)` writes the
+    rewritten array back, failing if the row changed in the meantime.
+    """
+
+    def __init__(
+        self,
+        store: BlobStore,
+        fetch_page: Callable[[Optional[str]], Awaitable[List[dict]]],
+        save_files: Callable[[str, List[dict], Optional[int]], Awaitable[object]],
+    ):
+        self.store = store
+        self.fetch_page = fetch_page
+        self.save_files = save_files
+        self._task: Optional[asyncio.Task] = None
+        self.state = "idle"
+        self.rows_scanned = 0
+        self.rows_migrated = 0
+        self.files_migrated = 0
+        self.errors: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        """Start the job unless it is already running"""
+        if self.running:
+            return False
+        self.state = "running"
+        self.rows_scanned = self.rows_migrated = self.files_migrated = 0
+        self.errors = []
+        self.started_at = time.time()
+        self.finished_at = None
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self) -> None:
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        after_id = None
+        try:
+            while True:
+                rows = await self.fetch_page(after_id)
+                if not rows:
+                    break
+                for row in rows:
+                    self.rows_scanned += 1
+                    try:
+                        await self._migrate_row(row)
+                    except Exception as e:
+                        logger.exception("Inline file migration failed for course %s", row.get("id"))
+                        self.errors.append(f"{row.get('id')}: {e}")
+                after_id = rows[-1]["id"]
+            self.state = "finished"
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Inline file migration aborted")
+            self.errors.append(str(e))
+            self.state = "failed"
+        finally:
+            self.finished_at = time.time()
+
+    async def _migrate_row(self, row: dict) -> None:
+        files = row.get("files") or []
+        inline = sum(1 for f in files if is_inline(f))
+        if not inline:
+            return
+        migrated, _ = await externalize_files(self.store, files)
+        try:
+            await self.save_files(row["id"], migrated, row.get("version"))
+        except Exception:
+            # The row changed under us; it is picked up again on the next run
+            for blob_id in added_blobs(files, migrated):
+                await self.store.delete(blob_id)
+            raise
+        self.rows_migrated += 1
+        self.files_migrated += inline
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "rows_scanned": self.rows_scanned,
+            "rows_migrated": self.rows_migrated,
+            "files_migrated": self.files_migrated,
+            "errors": self.errors[-20:],
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class FileOperationError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+async def apply_file_operations(store: BlobStore, files: List[dict], ops: List[dict]) -> Tuple[List[dict], List[str]]:
+    """Apply add/remove/rename operations to an attachment list.
+
+    Returns the new list and the blob ids that become unreferenced once it is
+    saved. New blobs are written immediately and deleted again if a later
+    operation is invalid; callers delete them if the save fails.
+    """
+    files = [dict(f) for f in files]
+    removed: List[str] = []
+    written: List[str] = []
+    try:
+        for op in ops:
+            kind = op.get("op")
+            if kind == "add":
+                file = op.get("file") or {}
+                if not is_inline(file):
+                    raise FileOperationError(400, "add requires a file with Base64 data")
+                try:
+                    file = await externalize_file(store, file)
+                except ValueError as e:
+                    raise FileOperationError(400, str(e))
+                written.append(file["blob_id"])
+                files.append(file)
+                continue
+
+            index = next((i for i, f in enumerate(files) if f.get("id") == op.get("id")), None)
+            if index is None:
+                raise FileOperationError(404, f"File {op.get('id')} not found")
+            if kind == "remove":
+                file = files.pop(index)
+                if file.get("blob_id"):
+                    removed.append(file["blob_id"])
+            elif kind == "rename":
+                if not op.get("name"):
+                    raise FileOperationError(400, "rename requires a name")
+                files[index]["name"] = op["name"]
+            else:
+                raise FileOperationError(400, f"Unknown operation {kind!r}")
+    except BaseException:
+        # Nothing is saved, so nothing will refer to the blobs added so far
+        for blob_id in written:
+            await store.delete(blob_id)
+        raise
+    return files, removed
+
+
+def added_blobs(before: List[dict], after: List[dict]) -> List[str]:
+    known = {f.get("blob_id") for f in before}
+    return [f["blob_id"] for f in after if f.get("blob_id") and f["blob_id"] not in known]
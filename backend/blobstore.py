@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class BlobInfo:
+    blob_id: str
+    size: int
+    sha256: str
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobStore(ABC):
+    """Storage for file attachments, addressed by an opaque blob id"""
+
+    @abstractmethod
+    async def write(self, chunks: AsyncIterator[bytes]) -> BlobInfo:
+        """Store a new blob under a fresh id"""
+
+    @abstractmethod
+    async def size(self, blob_id: str) -> int:
+        """Size in bytes; raises BlobNotFound"""
+
+    @abstractmethod
+    def read(self, blob_id: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end] (inclusive) of a blob"""
+
+    @abstractmethod
+    async def delete(self, blob_id: str) -> None:
+        """Remove a blob; deleting a missing blob is not an error"""
+
+    @abstractmethod
+    async def put(self, blob_id: str, data: bytes) -> bool:
+        """Store `data` under a caller-chosen (content-derived) id.
+
+        A no-op returning False if the blob already exists, since the same
+        id always names the same bytes.
+        """
+
+
+class FilesystemBlobStore(BlobStore):
+    """BlobStore on local disk, sharded by the first two characters of the id"""
+
+    def __init__(self, root: Path, chunk_size: int = CHUNK_SIZE):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+
+    def _path(self, blob_id: str) -> Path:
+        if not blob_id.isalnum():
+            raise BlobNotFound(blob_id)
+        return self.root / blob_id[:2] / blob_id
+
+    async def write(self, chunks: AsyncIterator[bytes]) -> BlobInfo:
+        blob_id = uuid.uuid4().hex
+        path = self._path(blob_id)
+        partial = path.with_suffix(".partial")
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        handle = await asyncio.to_thread(open, partial, "wb")
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                # hashlib and file writes release the GIL; keep both off the loop
+                await asyncio.to_thread(self._write_chunk, handle, digest, chunk)
+            await asyncio.to_thread(handle.close)
+            # Readers never observe a half-written blob
+            await asyncio.to_thread(os.replace, partial, path)
+        except BaseException:
+            handle.close()
+            partial.unlink(missing_ok=True)
+            raise
+        return BlobInfo(blob_id=blob_id, size=size, sha256=digest.hexdigest())
+
+    @staticmethod
+    def _write_chunk(handle, digest, chunk: bytes) -> None:
+        digest.update(chunk)
+        handle.write(chunk)
+
+    async def size(self, blob_id: str) -> int:
+        try:
+            stat = await asyncio.to_thread(self._path(blob_id).stat)
+        except FileNotFoundError:
+            raise BlobNotFound(blob_id)
+        return stat.st_size
+
+    async def read(self, blob_id: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        try:
+            handle = await asyncio.to_thread(open, self._path(blob_id), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(blob_id)
+        try:
+            await asyncio.to_thread(handle.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                chunk = await asyncio.to_thread(handle.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            handle.close()
+
+    async def delete(self, blob_id: str) -> None:
+        try:
+            await asyncio.to_thread(self._path(blob_id).unlink)
+        except FileNotFoundError:
+            pass
+
+    async def put(self, blob_id: str, data: bytes) -> bool:
+        path = self._path(blob_id)
+        return await asyncio.to_thread(self._put, path, data)
+
+    @staticmethod
+    def _put(path: Path, data: bytes) -> bool:
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.{uuid.uuid4().hex}.partial")
+        try:
+            partial.write_bytes(data)
+            os.replace(partial, path)
+        finally:
+            partial.unlink(missing_ok=True)
+        return True
+
+
+async def iter_bytes(data: bytes, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Adapt an in-memory payload to BlobStore.write"""
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
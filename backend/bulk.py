@@ -0,0 +1,25 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunked(items: Sequence[T], size: int) -> List[Sequence[T]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def gather_bounded(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int,
+) -> List[R]:
+    """Run `worker` over `items` with at most `concurrency` calls in flight,
+    returning results in input order"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Type
+
+# A loader returns the value to cache and its approximate size in bytes
+Loader = Callable[[], Awaitable[Tuple[Any, int]]]
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+    stale_until: float
+
+
+class ReadCache:
+    """In-process TTL cache with byte-bounded LRU eviction.
+
+    Concurrent misses for the same key share one loader call (single-flight),
+    so an expired hot key costs one upstream request, not one per waiter.
+    Expired entries are kept for a further `stale_ttl` seconds so they can
+    be served when the upstream is unavailable. Values must be treated as
+    immutable by callers.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int, stale_ttl: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._generation = 0
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_served = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = self._clock()
+        if entry.expires_at <= now:
+            if entry.stale_until <= now:
+                self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value even if expired, as long as it is within `stale_ttl`"""
+        entry = self._entries.get(key)
+        if entry is None or entry.stale_until <= self._clock():
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, size: int) -> None:
+        if not self.enabled or size > self.max_bytes:
+            return
+        self._remove(key)
+        expires_at = self._clock() + self.ttl
+        self._entries[key] = CacheEntry(value, size, expires_at, expires_at + self.stale_ttl)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+    def invalidate(self, key: Hashable) -> None:
+        self._generation += 1
+        self.invalidations += 1
+        self._remove(key)
+        self._inflight.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Drop every string key starting with `prefix`"""
+        self._generation += 1
+        self.invalidations += 1
+        for key in [k for k in self._entries if isinstance(k, str) and k.startswith(prefix)]:
+            self._remove(key)
+        for key in [k for k in self._inflight if isinstance(k, str) and k.startswith(prefix)]:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+        self.current_bytes = 0
+
+    async def get_or_load(self, key: Hashable, loader: Loader,
+                          stale_on: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """Return the cached value or load it; when the load raises one of
+        `stale_on` and an expired copy is still held, serve that instead"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if not self.enabled:
+            self.misses += 1
+            value, _ = await loader()
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, loader, self._generation))
+            self._inflight[key] = task
+        try:
+            # Shield so one cancelled waiter does not cancel the shared load
+            return await asyncio.shield(task)
+        except stale_on:
+            stale = self.get_stale(key)
+            if stale is None:
+                raise
+            self.stale_served += 1
+            return stale
+
+    async def _load(self, key: Hashable, loader: Loader, generation: int) -> Any:
+        try:
+            value, size = await loader()
+            # Anything invalidated while we were loading may be stale
+            if generation == self._generation and value is not None:
+                self.set(key, value, size)
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_ttl": self.stale_ttl,
+            "stale_served": self.stale_served,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEvent:
+    __slots__ = ("id", "type", "course_id", "data", "ts")
+
+    def __init__(self, id: int, type: str, course_id: str, data: Optional[dict], ts: float):
+        self.id = id
+        self.type = type
+        self.course_id = course_id
+        self.data = data
+        self.ts = ts
+
+    def encode(self) -> str:
+        """The event as an SSE message"""
+        body = json.dumps({"course_id": self.course_id, "data": self.data, "ts": self.ts}, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {body}\n\n"
+
+
+class Subscription:
+    """One listener's bounded buffer of pending events.
+
+    A listener that falls more than `size` events behind is marked lagged
+    and its backlog dropped; the stream then tells the client to reload
+    instead of letting the buffer grow without bound.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.events: Deque[ChangeEvent] = deque()
+        self.last_id = 0
+        self.lagged = False
+        self._ready = asyncio.Event()
+
+    def push(self, event: ChangeEvent) -> None:
+        if self.lagged or event.id <= self.last_id:
+            return
+        if len(self.events) >= self.size:
+            self.lagged = True
+            self.events.clear()
+        else:
+            self.events.append(event)
+            self.last_id = event.id
+        self._ready.set()
+
+    async def wait(self, timeout: float) -> List[ChangeEvent]:
+        """Pending events, or [] once `timeout` passes without any"""
+        if not self.events and not self.lagged:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    def reset(self, last_id: int) -> None:
+        """Resume live delivery after a lag, from `last_id` on"""
+        self.lagged = False
+        self.events.clear()
+        self.last_id = last_id
+
+
+class ChangeFeed:
+    """In-process pub/sub for course changes.
+
+    Keeps the last `history` events so a reconnecting client can resume
+    from its Last-Event-ID. Event ids increase monotonically; a resume
+    point that is no longer (or never was) in the history needs a reset,
+    i.e. the client reloads the list. Only sees changes made by this
+    process: use MongoChangeFeed with several workers.
+    """
+
+    def __init__(self, history: int = 1000, buffer_size: int = 256):
+        self.history: Deque[ChangeEvent] = deque(maxlen=history)
+        self.buffer_size = buffer_size
+        self.subscribers: Set[Subscription] = set()
+        self.last_id = 0
+        self.published_total = 0
+        self.lagged_total = 0
+
+    async def setup(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(self, type: str, course_id: str, data: Optional[dict] = None) -> None:
+        self.published_total += 1
+        self.deliver(ChangeEvent(self.last_id + 1, type, course_id, data, time.time()))
+
+    def deliver(self, event: ChangeEvent) -> None:
+        if event.id <= self.last_id:
+            return
+        self.last_id = event.id
+        self.history.append(event)
+        for subscription in self.subscribers:
+            was_lagged = subscription.lagged
+            subscription.push(event)
+            if subscription.lagged and not was_lagged:
+                self.lagged_total += 1
+
+    def _backlog(self, last_event_id: int) -> Optional[List[ChangeEvent]]:
+        """Events after `last_event_id` from memory; None if they are not all there"""
+        if last_event_id > self.last_id:
+            return None
+        oldest = self.history[0].id if self.history else self.last_id + 1
+        if last_event_id < oldest - 1:
+            return None
+        return [event for event in self.history if event.id > last_event_id]
+
+    async def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Register a listener, replaying events after `last_event_id`.
+
+        The subscription comes back lagged when that backlog is gone.
+        """
+        subscription = Subscription(self.buffer_size)
+        subscription.last_id = up_to = self.last_id
+        self.subscribers.add(subscription)
+        if last_event_id is None:
+            return subscription
+        backlog = self._backlog(last_event_id)
+        if backlog is None:
+            backlog = await self._replay(last_event_id, up_to)
+        if backlog is None or len(backlog) > self.buffer_size:
+            subscription.lagged = True
+            subscription.events.clear()
+        else:
+            # Live events may already be buffered behind the backlog
+            subscription.events.extendleft(reversed(backlog))
+        return subscription
+
+    async def _replay(self, last_event_id: int, up_to: int) -> Optional[List[ChangeEvent]]:
+        """Events in (last_event_id, up_to] from durable storage, if any"""
+        return None
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "subscribers": len(self.subscribers),
+            "last_id": self.last_id,
+            "history": len(self.history),
+            "published_total": self.published_total,
+            "lagged_total": self.lagged_total,
+        }
+
+
+class MongoChangeFeed(ChangeFeed):
+    """ChangeFeed shared by every worker through a MongoDB collection.
+
+    Publishing takes the next id from a counter document and inserts the
+    event; each worker polls for new events and delivers them to its own
+    subscribers in id order. An id that is missing (a publisher between
+    taking the id and inserting) is waited for up to `gap_timeout`.
+    Events expire after `retention` seconds and can be replayed from the
+    collection until then.
+    """
+
+    def __init__(self, db, history: int = 1000, buffer_size: int = 256, poll_interval: float = 0.5,
+                 retention: float = 3600.0, gap_timeout: float = 2.0, retry_after: float = 5.0,
+                 timeout: float = 2.0):
+        super().__init__(history, buffer_size)
+        self.events = db["course_changes"]
+        self.counters = db["course_change_counters"]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.gap_timeout = gap_timeout
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self._gap_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self.errors = 0
+
+    async def setup(self) -> None:
+        try:
+            await asyncio.wait_for(self._load_position(), timeout=max(self.timeout, 5.0))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Change feed setup failed (%s); events from other workers may be missed", e)
+        self._task = asyncio.create_task(self._poll_forever())
+
+    async def _load_position(self) -> None:
+        await self.events.create_index("created_at", expireAfterSeconds=int(self.retention))
+        latest = await self.events.find_one(sort=[("_id", -1)])
+        self.last_id = latest["_id"] if latest else 0
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, type: str, course_id: str, data: Optional[dict] = None) -> None:
+        try:
+            await asyncio.wait_for(self._insert(type, course_id, data), timeout=self.timeout)
+        except Exception as e:
+            # Publishing runs as a queued job (see server.py), which retries it
+            self.errors += 1
+            logger.error("Publishing %s event for course %s failed: %r", type, course_id, e)
+            raise
+        self.published_total += 1
+        try:
+            # Deliver our own events without waiting for the next poll
+            await asyncio.wait_for(self.poll(), timeout=self.timeout)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Change feed poll after publishing failed (%s); the next poll delivers it", e)
+
+    async def _insert(self, type: str, course_id: str, data: Optional[dict]) -> None:
+        from pymongo import ReturnDocument  # deferred with Motor (see mongo.py)
+
+        counter = await self.counters.find_one_and_update(
+            {"_id": "courses"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+        await self.events.insert_one({
+            "_id": counter["seq"],
+            "type": type,
+            "course_id": course_id,
+            "data": data,
+            "ts": time.time(),
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    async def _poll_forever(self) -> None:
+        while True:
+            delay = self.poll_interval
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                delay = max(delay, self.retry_after)
+                logger.warning("Change feed poll failed (%s); retrying in %ss", e, delay)
+            await asyncio.sleep(delay)
+
+    async def poll(self) -> None:
+        documents = await self.events.find({"_id": {"$gt": self.last_id}}).sort("_id", 1).to_list(self.buffer_size)
+        for document in documents:
+            if document["_id"] != self.last_id + 1:
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < self.gap_timeout:
+                    return
+            self._gap_since = None
+            self.deliver(self._event(document))
+
+    @staticmethod
+    def _event(document: dict) -> ChangeEvent:
+        return ChangeEvent(document["_id"], document["type"], document["course_id"], document.get("data"),
+                           document["ts"])
+
+    async def _replay(self, last_event_id: int, up_to: int) -> Optional[List[ChangeEvent]]:
+        if last_event_id >= up_to:
+            return None
+        try:
+            documents = await self.events.find(
+                {"_id": {"$gt": last_event_id, "$lte": up_to}}
+            ).sort("_id", 1).to_list(self.buffer_size + 1)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Change feed replay failed: %s", e)
+            return None
+        # Expired events leave a gap at the start; the client has to reload
+        if not documents or documents[0]["_id"] != last_event_id + 1:
+            return None
+        return [self._event(document) for document in documents]
+
+    def stats(self) -> dict:
+        return {**super().stats(), "backend": "mongo", "errors": self.errors}
@@ -0,0 +1,216 @@
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: brotli is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is only offered when installed
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+# Event streams stay uncompressed: encoders and proxies buffer compressed
+# bytes, which would hold back events until more arrive
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Sync flush keeps streamed responses (NDJSON) progressive
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> Dict[str, Callable]:
+    """Encoders in server preference order, limited to installed libraries"""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = lambda: _Zstd(zstd_level)
+    if brotli is not None:
+        encoders["br"] = lambda: _Brotli(brotli_quality)
+    encoders["gzip"] = lambda: _Gzip(gzip_level)
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: Optional[str], encodings) -> Optional[str]:
+    """Pick the encoding with the highest client q-value, ties going to the
+    server's order; None means send the response uncompressed"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in encodings:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """Negotiated zstd/br/gzip response compression.
+
+    Compresses responses of a compressible content type once the body
+    reaches `minimum_size`. Streamed bodies are compressed chunk by chunk
+    with a flush after each, so clients still see rows as they are sent.
+    Strong ETags become weak on compressed responses.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders = available_encodings(gzip_level, brotli_quality, zstd_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), None)
+        coding = negotiate(accept, self.encoders)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingSend(send, coding, self.encoders[coding], self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingSend:
+    def __init__(self, send, coding: str, encoder_factory: Callable, minimum_size: int):
+        self.send = send
+        self.coding = coding
+        self.encoder_factory = encoder_factory
+        self.minimum_size = minimum_size
+        self.start: Optional[dict] = None
+        self.encoder = None
+        self.passthrough = False
+
+    def _eligible(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        status = self.start["status"]
+        if status < 200 or status in (204, 206, 304):
+            return False
+        values = {k.lower(): v for k, v in headers}
+        if b"content-encoding" in values or b"no-transform" in values.get(b"cache-control", b""):
+            return False
+        content_type = values.get(b"content-type", b"").decode("latin-1")
+        return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSED_TYPES)
+
+    def _compressed_headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = []
+        for name, value in self.start["headers"]:
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            if lower == b"vary":
+                continue
+            headers.append((name, value))
+        headers.append((b"content-encoding", self.coding.encode()))
+        headers.append((b"vary", self._vary()))
+        return headers
+
+    def _vary(self) -> bytes:
+        existing = [v for k, v in self.start["headers"] if k.lower() == b"vary"]
+        if existing and b"accept-encoding" not in existing[0].lower():
+            return existing[0] + b", Accept-Encoding"
+        return existing[0] if existing else b"Accept-Encoding"
+
+    def _plain_headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = [(k, v) for k, v in self.start["headers"] if k.lower() != b"vary"]
+        headers.append((b"vary", self._vary()))
+        return headers
+
+    async def __call__(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            if not self._eligible(message.get("headers", [])):
+                self.passthrough = True
+                await self.send(message)
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.encoder is None:
+            if not more and len(body) < self.minimum_size:
+                # Small and complete: not worth compressing
+                self.passthrough = True
+                await self.send({**self.start, "headers": self._plain_headers()})
+                await self.send(message)
+                return
+            self.encoder = self.encoder_factory()
+            await self.send({**self.start, "headers": self._compressed_headers()})
+
+        data = self.encoder.compress(body)
+        data += self.encoder.flush() if more else self.encoder.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more})
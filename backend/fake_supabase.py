@@ -0,0 +1,452 @@
+import asyncio
+import json
+import random
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+
+from supabase_client import env_bool, env_float, env_int
+
+# Column defaults from the CREATE TABLE in server.RLS_FIX_SQL
+COURSE_DEFAULTS = {
+    "description": "",
+    "image_url": "",
+    "content_description": "",
+    "files": [],
+    "progress": 0,
+    "tag": "AIS+",
+    "version": 1,
+    "image_variants": None,
+}
+
+COURSE_COLUMNS = {"id", "title", "updated_at", *COURSE_DEFAULTS}
+
+RLS_MESSAGE = 'new row violates row-level security policy for table "courses"'
+
+SEED_TAGS = ("AIS+", "Math", "Science", "History", "Languages")
+
+
+def _file_count(row: dict) -> int:
+    return len(row.get("files") or [])
+
+
+def _files_size(row: dict) -> int:
+    return sum(int(f.get("size") or 0) for f in row.get("files") or [] if isinstance(f, dict))
+
+
+# Computed columns (Postgres functions taking the row) from RLS_FIX_SQL
+COMPUTED_COLUMNS = {"file_count": _file_count, "files_size": _files_size}
+
+
+class PostgrestError(Exception):
+    def __init__(self, status_code: int, code: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+
+    def response(self) -> httpx.Response:
+        body = {"code": self.code, "message": self.message, "details": None, "hint": None}
+        return httpx.Response(self.status_code, json=body)
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas outside parentheses and double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quoted and ch == "\\" and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(ch)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def unquote_value(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def like_regex(pattern: str, case_insensitive: bool) -> re.Pattern:
+    """Compile a LIKE pattern (PostgREST accepts `*` for `%`)"""
+    out, i = [], 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        if ch in "*%":
+            out.append(".*")
+        elif ch == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(ch))
+        i += 1
+    return re.compile("".join(out), re.DOTALL | (re.IGNORECASE if case_insensitive else 0))
+
+
+def _coerce(value: str, like):
+    """Interpret a filter value with the type of the column it is compared to"""
+    if isinstance(like, bool):
+        return value.lower() == "true"
+    if isinstance(like, int):
+        try:
+            return int(value)
+        except ValueError:
+            raise PostgrestError(400, "22P02", f'invalid input syntax for type integer: "{value}"')
+    return value
+
+
+def _compare(op: str, actual, expected: str) -> bool:
+    if op == "is":
+        return actual is None if expected == "null" else actual is _coerce(expected, True)
+    if actual is None:
+        return False
+    if op in ("like", "ilike"):
+        return like_regex(expected, op == "ilike").fullmatch(str(actual)) is not None
+    if op == "in":
+        values = [unquote_value(v) for v in split_top_level(expected.strip()[1:-1])] if expected.strip() else []
+        return actual in [_coerce(v, actual) for v in values]
+    value = _coerce(expected, actual)
+    if op == "eq":
+        return actual == value
+    if op == "neq":
+        return actual != value
+    if op == "gt":
+        return actual > value
+    if op == "gte":
+        return actual >= value
+    if op == "lt":
+        return actual < value
+    if op == "lte":
+        return actual <= value
+    raise PostgrestError(400, "PGRST100", f'unknown operator "{op}"')
+
+
+class Condition:
+    """A parsed filter tree: `col.op.value`, or and(...)/or(...) groups"""
+
+    def __init__(self, kind: str, column: str = "", op: str = "", value: str = "",
+                 children: Optional[List["Condition"]] = None, negate: bool = False):
+        self.kind = kind
+        self.column = column
+        self.op = op
+        self.value = value
+        self.children = children or []
+        self.negate = negate
+
+    @classmethod
+    def column_filter(cls, column: str, expression: str) -> "Condition":
+        negate = expression.startswith("not.")
+        if negate:
+            expression = expression[4:]
+        op, sep, value = expression.partition(".")
+        if not sep:
+            raise PostgrestError(400, "PGRST100", f'failed to parse filter ({column}={expression})')
+        return cls("filter", column=column, op=op, value=unquote_value(value), negate=negate)
+
+    @classmethod
+    def group(cls, kind: str, body: str) -> "Condition":
+        """Parse the `(a.eq.1,and(...))` body of an or=/and= parameter"""
+        if not (body.startswith("(") and body.endswith(")")):
+            raise PostgrestError(400, "PGRST100", f"failed to parse logic tree ({body})")
+        children = []
+        for part in split_top_level(body[1:-1]):
+            for group_kind in ("and", "or", "not.and", "not.or"):
+                if part.startswith(group_kind + "("):
+                    child = cls.group(group_kind.rsplit(".", 1)[-1], part[len(group_kind):])
+                    child.negate = group_kind.startswith("not.")
+                    break
+            else:
+                column, _, expression = part.partition(".")
+                child = cls.column_filter(column, expression)
+            children.append(child)
+        return cls(kind, children=children)
+
+    def matches(self, row: dict) -> bool:
+        if self.kind == "filter":
+            if self.column in COMPUTED_COLUMNS:
+                actual = COMPUTED_COLUMNS[self.column](row)
+            elif self.column in COURSE_COLUMNS:
+                actual = row.get(self.column)
+            else:
+                raise PostgrestError(400, "42703", f"column courses.{self.column} does not exist")
+            result = _compare(self.op, actual, self.value)
+        elif self.kind == "and":
+            result = all(child.matches(row) for child in self.children)
+        else:
+            result = any(child.matches(row) for child in self.children)
+        return not result if self.negate else result
+
+
+class FakeSupabase:
+    """In-process stand-in for the Supabase PostgREST API used by server.py.
+
+    Plug it into SupabaseClient as an httpx transport (`transport()`); it
+    keeps tables in memory and understands the subset of PostgREST the
+    server relies on: select (including the file_count/files_size computed
+    columns), column filters (eq, neq, gt/gte/lt/lte, in, like/ilike, is),
+    or/and logic trees, order, limit/offset, `Prefer: count=...`, and
+    POST/PATCH/DELETE with `return=representation`. Latency, jitter and
+    failures are injected from a seeded RNG so runs are repeatable.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        connect_error_rate: float = 0.0,
+        deny_writes: bool = False,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.connect_error_rate = connect_error_rate
+        # Mimics a table with RLS enabled but no write policies (error 42501)
+        self.deny_writes = deny_writes
+        self.random = random.Random(seed)
+        self.tables: Dict[str, Dict[str, dict]] = {"courses": {}}
+        self.requests_total = 0
+        self.failures_injected = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeSupabase":
+        fake = cls(
+            latency=env_float("FAKE_SUPABASE_LATENCY", 0.0),
+            jitter=env_float("FAKE_SUPABASE_JITTER", 0.0),
+            failure_rate=env_float("FAKE_SUPABASE_FAILURE_RATE", 0.0),
+            connect_error_rate=env_float("FAKE_SUPABASE_CONNECT_ERROR_RATE", 0.0),
+            deny_writes=env_bool("FAKE_SUPABASE_DENY_WRITES", False),
+            seed=env_int("FAKE_SUPABASE_SEED", 0),
+        )
+        fake.seed_courses(env_int("FAKE_SUPABASE_ROWS", 0))
+        return fake
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def seed_courses(self, count: int, files_per_course: int = 2) -> List[dict]:
+        """Insert `count` generated courses with attachment metadata"""
+        rows = []
+        for i in range(count):
+            course_id = str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+            files = [
+                {
+                    "id": str(uuid.UUID(int=self.random.getrandbits(128), version=4)),
+                    "name": f"handout-{n + 1}.pdf",
+                    "type": "application/pdf",
+                    "size": self.random.randint(10_000, 2_000_000),
+                    "sha256": uuid.UUID(int=self.random.getrandbits(128)).hex * 2,
+                    "blob_id": uuid.UUID(int=self.random.getrandbits(128)).hex,
+                }
+                for n in range(files_per_course)
+            ]
+            row = {
+                **COURSE_DEFAULTS,
+                "id": course_id,
+                "title": f"Course {i:05d}",
+                "description": f"Generated course number {i}",
+                "files": files,
+                "progress": self.random.randint(0, 100),
+                "tag": self.random.choice(SEED_TAGS),
+                "updated_at": self.now(),
+            }
+            self.tables["courses"][course_id] = row
+            rows.append(row)
+        return rows
+
+    async def _delay(self) -> None:
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests_total += 1
+        if self.connect_error_rate and self.random.random() < self.connect_error_rate:
+            self.failures_injected += 1
+            raise httpx.ConnectError("injected connection failure", request=request)
+        await self._delay()
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            self.failures_injected += 1
+            return PostgrestError(503, "PGRST000", "injected upstream failure").response()
+        try:
+            return self._dispatch(request)
+        except PostgrestError as e:
+            return e.response()
+
+    def _dispatch(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if not path.startswith("/rest/v1/"):
+            return httpx.Response(404, json={"message": "not found"})
+        table = self.tables.get(path[len("/rest/v1/"):].strip("/"))
+        if table is None:
+            raise PostgrestError(404, "42P01", f'relation "public.{path.rsplit("/", 1)[-1]}" does not exist')
+
+        params = self._parse_query(request.url.query.decode())
+        prefer = request.headers.get("prefer", "")
+        if request.method in ("POST", "PATCH", "DELETE") and self.deny_writes:
+            raise PostgrestError(401, "42501", RLS_MESSAGE)
+        if request.method in ("GET", "HEAD"):
+            return self._select(table, params, prefer)
+        if request.method == "POST":
+            return self._insert(table, params, prefer, self._body(request))
+        if request.method == "PATCH":
+            return self._update(table, params, prefer, self._body(request))
+        if request.method == "DELETE":
+            return self._delete(table, params, prefer)
+        return httpx.Response(405, json={"message": "method not allowed"})
+
+    @staticmethod
+    def _parse_query(query: str) -> List[Tuple[str, str]]:
+        pairs = []
+        for part in query.split("&") if query else []:
+            key, _, value = part.partition("=")
+            pairs.append((unquote(key), unquote(value.replace("+", " "))))
+        return pairs
+
+    @staticmethod
+    def _body(request: httpx.Request):
+        try:
+            return json.loads(request.content or b"null")
+        except ValueError:
+            raise PostgrestError(400, "PGRST102", "Empty or invalid json")
+
+    @staticmethod
+    def _where(params: List[Tuple[str, str]]) -> Condition:
+        children = []
+        for key, value in params:
+            if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            if key in ("or", "and", "not.or", "not.and"):
+                child = Condition.group(key.rsplit(".", 1)[-1], value)
+                child.negate = key.startswith("not.")
+            else:
+                child = Condition.column_filter(key, value)
+            children.append(child)
+        return Condition("and", children=children)
+
+    def _matching(self, table: Dict[str, dict], params) -> List[dict]:
+        where = self._where(params)
+        return [row for row in table.values() if where.matches(row)]
+
+    @staticmethod
+    def _project(rows: List[dict], params) -> List[dict]:
+        select = next((value for key, value in params if key == "select"), "*")
+        if select == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",") if column.strip()]
+        projected = []
+        for row in rows:
+            out = {}
+            for column in columns:
+                if column in COMPUTED_COLUMNS:
+                    out[column] = COMPUTED_COLUMNS[column](row)
+                elif column == "*":
+                    out.update(row)
+                elif column in COURSE_COLUMNS:
+                    out[column] = row.get(column)
+                else:
+                    raise PostgrestError(400, "42703", f"column courses.{column} does not exist")
+            projected.append(out)
+        return projected
+
+    @staticmethod
+    def _order(rows: List[dict], params) -> List[dict]:
+        order = next((value for key, value in params if key == "order"), None)
+        if not order:
+            return rows
+        # Apply the least significant key first; sorts are stable
+        for term in reversed(order.split(",")):
+            column, _, direction = term.partition(".")
+            descending = direction.split(".")[0] == "desc"
+            rows = sorted(
+                rows,
+                key=lambda row: (row.get(column) is None, row.get(column) if row.get(column) is not None else 0),
+                reverse=descending,
+            )
+        return rows
+
+    def _respond(self, status: int, rows: List[dict], prefer: str) -> httpx.Response:
+        if "return=representation" not in prefer:
+            return httpx.Response(204 if status == 200 else status)
+        return httpx.Response(status, json=rows)
+
+    def _select(self, table, params, prefer: str) -> httpx.Response:
+        rows = self._order(self._matching(table, params), params)
+        total = len(rows)
+        offset = int(next((value for key, value in params if key == "offset"), 0))
+        limit = next((value for key, value in params if key == "limit"), None)
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        body = self._project(rows, params)
+
+        count = "*"
+        if "count=exact" in prefer or "count=estimated" in prefer or "count=planned" in prefer:
+            count = str(total)
+        content_range = f"{offset}-{offset + len(body) - 1}/{count}" if body else f"*/{count}"
+        return httpx.Response(200, json=body, headers={"Content-Range": content_range})
+
+    def _insert(self, table, params, prefer: str, body) -> httpx.Response:
+        items = body if isinstance(body, list) else [body]
+        created = []
+        for item in items:
+            if not isinstance(item, dict):
+                raise PostgrestError(400, "PGRST102", "Empty or invalid json")
+            if not item.get("id") or item.get("title") is None:
+                column = "id" if not item.get("id") else "title"
+                raise PostgrestError(400, "23502", f'null value in column "{column}" violates not-null constraint')
+            if item["id"] in table or any(row["id"] == item["id"] for row in created):
+                raise PostgrestError(409, "23505", 'duplicate key value violates unique constraint "courses_pkey"')
+            created.append({**COURSE_DEFAULTS, **item, "version": 1, "updated_at": self.now()})
+        # Statements are atomic: nothing is written if any row is rejected
+        for row in created:
+            table[row["id"]] = row
+        return self._respond(201, self._project(created, params), prefer)
+
+    def _update(self, table, params, prefer: str, body) -> httpx.Response:
+        if not isinstance(body, dict):
+            raise PostgrestError(400, "PGRST102", "Empty or invalid json")
+        rows = self._matching(table, params)
+        for row in rows:
+            # The courses_touch_updated_at trigger
+            row.update(body, updated_at=self.now(), version=row.get("version", 1) + 1)
+        return self._respond(200, self._project(rows, params), prefer)
+
+    def _delete(self, table, params, prefer: str) -> httpx.Response:
+        rows = self._matching(table, params)
+        for row in rows:
+            del table[row["id"]]
+        return self._respond(200, self._project(rows, params), prefer)
+
+    def stats(self) -> dict:
+        return {
+            "rows": {name: len(table) for name, table in self.tables.items()},
+            "requests_total": self.requests_total,
+            "failures_injected": self.failures_injected,
+        }
@@ -0,0 +1,98 @@
+import asyncio
+import base64
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Optional
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Card widths for the 1/2/3-column grid plus the detail hero
+COVER_WIDTHS = (400, 800, 1200)
+COVER_FORMATS = (("webp", "WEBP", "image/webp"), ("jpg", "JPEG", "image/jpeg"))
+MEDIA_TYPES = {ext: media_type for ext, _, media_type in COVER_FORMATS}
+PLACEHOLDER_WIDTH = 16
+
+# Decompression-bomb guard, checked from the header before decoding pixels
+MAX_PIXELS = 40_000_000
+
+
+class ImageError(ValueError):
+    pass
+
+
+def _encode(image: "Image.Image", pil_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if pil_format == "WEBP":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_cover(data: bytes, widths: Iterable[int] = COVER_WIDTHS, quality: int = 80) -> dict:
+    """Decode an uploaded cover and render its resized variants.
+
+    CPU-bound; runs in a worker process. Returns the source dimensions, a
+    tiny blurred JPEG placeholder as a data URL, and one entry per
+    (width, format) with the encoded bytes and their sha256.
+    """
+    # Imported here, in the worker, so loading the app does not pay for Pillow
+    from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            if source.width * source.height > MAX_PIXELS:
+                raise ImageError(f"image is larger than {MAX_PIXELS} pixels")
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGB")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageError(f"not a readable image: {e}")
+
+    # Never upscale; a small source yields a single variant at its own width
+    targets = sorted({min(width, image.width) for width in widths})
+    variants = []
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for ext, pil_format, _ in COVER_FORMATS:
+            content = _encode(resized, pil_format, quality)
+            variants.append({
+                "width": width,
+                "height": height,
+                "format": ext,
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "content": content,
+            })
+
+    thumb_height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    thumb = image.resize((PLACEHOLDER_WIDTH, thumb_height), Image.BILINEAR).filter(ImageFilter.GaussianBlur(1))
+    placeholder = "data:image/jpeg;base64," + base64.b64encode(_encode(thumb, "JPEG", 50)).decode()
+    return {"width": image.width, "height": image.height, "placeholder": placeholder, "variants": variants}
+
+
+class CoverProcessor:
+    """Runs `render_cover` in a lazily started process pool"""
+
+    def __init__(self, workers: int, widths: Iterable[int] = COVER_WIDTHS, quality: int = 80):
+        self.workers = workers
+        self.widths = tuple(widths)
+        self.quality = quality
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def render(self, data: bytes) -> dict:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, render_cover, data, self.widths, self.quality)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def image_name(variant: dict) -> str:
+    """Content-addressed file name for a rendered variant"""
+    return f"{variant['sha256']}.{variant['format']}"
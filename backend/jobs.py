@@ -0,0 +1,598 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+class Job:
+    __slots__ = ("id", "kind", "key", "payload", "status", "attempts", "enqueued_at", "run_at", "error")
+
+    def __init__(self, id: str, kind: str, key: Optional[str], payload: dict, status: str = "queued",
+                 attempts: int = 0, enqueued_at: Optional[float] = None, run_at: Optional[float] = None,
+                 error: Optional[str] = None):
+        self.id = id
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.status = status
+        self.attempts = attempts
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        self.run_at = run_at if run_at is not None else self.enqueued_at
+        self.error = error
+
+    def describe(self) -> dict:
+        return {"id": self.id, "kind": self.kind, "key": self.key, "status": self.status,
+                "attempts": self.attempts, "enqueued_at": self.enqueued_at, "run_at": self.run_at,
+                "error": self.error, "payload": self.payload}
+
+
+class JobQueue:
+    """In-process queue for work derived from a write (blob cleanup, change
+    notifications), run by background workers instead of the request.
+
+    At most `concurrency` jobs run at once, and at most the limit given to
+    `register` per kind. A failed job is retried after an exponential,
+    jittered backoff and moved to the dead letters after `max_attempts`;
+    `retry` puts a dead job back. Jobs of an `ordered` kind run one at a
+    time in the order they were queued: while one waits for its retry, the
+    later ones wait behind it. A job enqueued with the `key` of a job
+    already known is not queued again. Handlers may run more than once for
+    the same job (a retry after a timeout) and must be idempotent.
+
+    Jobs only live in this process: those still queued at shutdown are
+    lost. MongoJobQueue keeps them across restarts.
+    """
+
+    backend = "memory"
+
+    def __init__(self, concurrency: int = 4, max_attempts: int = 5, backoff: float = 1.0,
+                 max_backoff: float = 300.0, timeout: float = 60.0, drain_timeout: float = 10.0,
+                 dead_size: int = 1000, keys_size: int = 10_000):
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.drain_timeout = drain_timeout
+        self.keys_size = keys_size
+        self.handlers: Dict[str, JobHandler] = {}
+        self.limits: Dict[str, int] = {}
+        self.ordered: Set[str] = set()
+        self._held: Dict[str, Job] = {}  # ordered kind -> the failed job the others wait for
+        self.jobs: Dict[str, Job] = {}  # queued and running
+        self.dead: Deque[Job] = deque(maxlen=dead_size)
+        self._keys: "OrderedDict[str, Job]" = OrderedDict()
+        self._ready: List[tuple] = []  # (run_at, sequence, job)
+        self._sequence = 0
+        self._running: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued_total = 0
+        self.deduplicated_total = 0
+        self.completed_total = 0
+        self.retried_total = 0
+        self.dead_total = 0
+
+    def register(self, kind: str, handler: JobHandler, concurrency: Optional[int] = None,
+                 ordered: bool = False) -> None:
+        """Run jobs of `kind` with `handler(payload)`, at most `concurrency` at a
+        time, or one at a time and in order when `ordered`"""
+        self.handlers[kind] = handler
+        self.limits[kind] = 1 if ordered else concurrency or self.concurrency
+        if ordered:
+            self.ordered.add(kind)
+        self._running.setdefault(kind, 0)
+
+    async def enqueue(self, kind: str, payload: dict, key: Optional[str] = None) -> Job:
+        """Queue a job; returns the known job instead when `key` was seen before"""
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for {kind} jobs")
+        if key is not None and key in self._keys:
+            self.deduplicated_total += 1
+            return self._keys[key]
+        job = Job(uuid.uuid4().hex, kind, key, payload)
+        known = await self._persist(job)
+        if known is not None:
+            self.deduplicated_total += 1
+            return known
+        self.enqueued_total += 1
+        self._remember_key(job)
+        self._schedule(job)
+        return job
+
+    def _remember_key(self, job: Job) -> None:
+        if job.key is None:
+            return
+        self._keys[job.key] = job
+        self._keys.move_to_end(job.key)
+        while len(self._keys) > self.keys_size:
+            self._keys.popitem(last=False)
+
+    def _forget(self, job: Job) -> None:
+        """Stop tracking `job`, unless the id has been taken by a newer copy since"""
+        if self.jobs.get(job.id) is job:
+            del self.jobs[job.id]
+        if self._held.get(job.kind) is job:
+            del self._held[job.kind]
+
+    def _schedule(self, job: Job) -> None:
+        job.status = "queued"
+        self.jobs[job.id] = job
+        self._sequence += 1
+        heapq.heappush(self._ready, (job.run_at, self._sequence, job))
+        self._wakeup.set()
+
+    async def setup(self) -> None:
+        self._task = asyncio.create_task(self._dispatch_forever())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._tasks:
+            # Let running jobs finish; the rest go back to the queue
+            done, pending = await asyncio.wait(set(self._tasks), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        await self._release()
+
+    async def _release(self) -> None:
+        """Hand the jobs still queued on shutdown over to the next process"""
+        if self.jobs:
+            logger.error("Dropping %s queued jobs on shutdown", len(self.jobs))
+
+    def _next_job(self) -> Optional[Job]:
+        """The earliest due job whose kind has a free worker, if any"""
+        if len(self._tasks) >= self.concurrency:
+            return None
+        now = time.time()
+        skipped = []
+        found = None
+        while self._ready and self._ready[0][0] <= now:
+            entry = heapq.heappop(self._ready)
+            job = entry[2]
+            if self.jobs.get(job.id) is not job or job.status != "queued":
+                continue  # retried or requeued since
+            held = self._held.get(job.kind)
+            if held is not None and held is not job:
+                skipped.append(entry)  # behind a failed job of an ordered kind
+                continue
+            if self._running[job.kind] < self.limits[job.kind]:
+                found = job
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._ready, entry)
+        return found
+
+    async def _dispatch_forever(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is not None:
+                # Counted before the task runs, so the next pick sees the slot taken
+                self._running[job.kind] += 1
+                job.status = "running"
+                task = asyncio.create_task(self._run(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                continue
+            timeout = None
+            if len(self._tasks) < self.concurrency:
+                # Sleep until the next job falls due; due jobs waiting for
+                # their kind only move on a wakeup
+                now = time.time()
+                upcoming = [entry[0] for entry in self._ready if entry[0] > now]
+                if upcoming:
+                    timeout = min(upcoming) - now
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self, job: Job) -> None:
+        job.attempts += 1
+        started = time.time()
+        metrics.JOB_WAIT.observe(job.kind, value=max(0.0, started - job.run_at))
+        try:
+            if not await self._started(job):
+                # Another worker took the job over while it waited here
+                self._forget(job)
+                job.status = "abandoned"
+                return
+            await asyncio.wait_for(self.handlers[job.kind](job.payload), self.timeout)
+        except asyncio.CancelledError:
+            # Shutdown: the attempt does not count
+            job.attempts -= 1
+            job.status = "queued"
+            raise
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            metrics.JOB_DURATION.observe(job.kind, "failed", value=time.time() - started)
+            self._forget(job)
+            if job.attempts >= self.max_attempts:
+                logger.error("Job %s (%s) failed %s times, dead-lettered: %s", job.id, job.kind, job.attempts,
+                             job.error)
+                await self._bury(job)
+            else:
+                self.retried_total += 1
+                job.run_at = time.time() + self._retry_delay(job.attempts)
+                logger.warning("Job %s (%s) failed (%s); retry %s in %.1fs", job.id, job.kind, job.error,
+                               job.attempts, job.run_at - time.time())
+                if job.kind in self.ordered:
+                    self._held[job.kind] = job
+                self._schedule(job)
+                if not await self._retrying(job):
+                    self._forget(job)
+                    job.status = "abandoned"
+        else:
+            finished = time.time()
+            metrics.JOB_DURATION.observe(job.kind, "completed", value=finished - started)
+            metrics.JOB_LATENCY.observe(job.kind, value=finished - job.enqueued_at)
+            self._forget(job)
+            job.status = "done"
+            job.error = None
+            self.completed_total += 1
+            await self._completed(job)
+        finally:
+            self._running[job.kind] -= 1
+            self._wakeup.set()
+
+    async def _bury(self, job: Job) -> None:
+        job.status = "dead"
+        self.dead.appendleft(job)
+        self.dead_total += 1
+        await self._dead_lettered(job)
+
+    # Persistence hooks, for MongoJobQueue
+    async def _persist(self, job: Job) -> Optional[Job]:
+        """Store a new job; returns the stored job already holding its key"""
+        return None
+
+    async def _started(self, job: Job) -> bool:
+        """Record the attempt; False when the job is no longer this worker's"""
+        return True
+
+    async def _retrying(self, job: Job) -> bool:
+        return True
+
+    async def _completed(self, job: Job) -> None:
+        pass
+
+    async def _dead_lettered(self, job: Job) -> None:
+        pass
+
+    async def dead_letters(self, limit: int = 100) -> List[dict]:
+        """Most recently dead-lettered jobs first"""
+        return [job.describe() for job in list(self.dead)[:limit]]
+
+    async def retry(self, job_id: str) -> Optional[Job]:
+        """Queue a dead-lettered job again, with a fresh set of attempts"""
+        for job in self.dead:
+            if job.id == job_id:
+                self.dead.remove(job)
+                break
+        else:
+            return None
+        job.attempts = 0
+        job.error = None
+        job.run_at = time.time()
+        self._remember_key(job)
+        self._schedule(job)
+        return job
+
+    def stats(self) -> dict:
+        now = time.time()
+        kinds = {kind: {"queued": 0, "running": self._running[kind]} for kind in self.handlers}
+        oldest = None
+        for job in self.jobs.values():
+            if job.status == "queued":
+                kinds[job.kind]["queued"] += 1
+                if job.run_at <= now and (oldest is None or job.run_at < oldest):
+                    oldest = job.run_at
+        return {
+            "backend": self.backend,
+            "queued": sum(kind["queued"] for kind in kinds.values()),
+            "running": len(self._tasks),
+            "dead": len(self.dead),
+            "oldest_due_seconds": round(now - oldest, 3) if oldest is not None else 0,
+            "enqueued_total": self.enqueued_total,
+            "deduplicated_total": self.deduplicated_total,
+            "completed_total": self.completed_total,
+            "retried_total": self.retried_total,
+            "dead_total": self.dead_total,
+            "kinds": kinds,
+        }
+
+
+class MongoJobQueue(JobQueue):
+    """JobQueue whose jobs are also stored in a MongoDB collection, so they
+    survive a restart or a crashed worker.
+
+    Jobs still run in the process that enqueued them, straight from memory;
+    every state change is written through. Each stored job carries a lease,
+    renewed every `recover_interval` seconds (well within `lease`) while
+    its worker holds it. Queued or running jobs whose lease ran out (their
+    worker is gone or cut off from Mongo) are taken over by the first
+    worker to notice. A worker that finds a job taken over from it drops
+    its own copy instead of running it as well. Keys are
+    unique across workers through a unique index. Finished jobs expire
+    after `retention` seconds; dead letters are kept until retried or
+    removed by hand. When Mongo is unavailable jobs still run, in memory
+    only, and writes are not tried again for `retry_after` seconds, so an
+    outage costs enqueueing callers one `store_timeout` at most.
+    """
+
+    backend = "mongo"
+
+    def __init__(self, db, lease: float = 30.0, recover_interval: float = 15.0, retention: float = 86400.0,
+                 store_timeout: float = 2.0, retry_after: float = 10.0, **options):
+        super().__init__(**options)
+        self.collection = db["jobs"]
+        self.lease = lease
+        self.recover_interval = recover_interval
+        self.retention = retention
+        self.store_timeout = store_timeout
+        self.retry_after = retry_after
+        self.owner = uuid.uuid4().hex
+        self._recover_task: Optional[asyncio.Task] = None
+        self._store_down_until = 0.0
+        self._stored: Set[str] = set()  # ids of jobs stored as ours
+        self.recovered_total = 0
+        self.abandoned_total = 0
+        self.unpersisted_total = 0
+        self.errors = 0
+
+    async def setup(self) -> None:
+        await super().setup()
+        self._recover_task = asyncio.create_task(self._recover_forever())
+
+    async def close(self) -> None:
+        if self._recover_task is not None:
+            self._recover_task.cancel()
+            try:
+                await self._recover_task
+            except asyncio.CancelledError:
+                pass
+            self._recover_task = None
+        await super().close()
+
+    async def _ensure_indexes(self) -> None:
+        await self.collection.create_index("key", unique=True, partialFilterExpression={"key": {"$type": "string"}})
+        await self.collection.create_index([("status", 1), ("lease_until", 1)])
+        await self.collection.create_index("finished_at", expireAfterSeconds=int(self.retention),
+                                           partialFilterExpression={"status": "done"})
+
+    def _lease(self) -> datetime:
+        """When another worker may take a job over, unless it is renewed first"""
+        return datetime.fromtimestamp(time.time() + self.lease, timezone.utc)
+
+    @property
+    def store_down(self) -> bool:
+        return time.monotonic() < self._store_down_until
+
+    def _store_failed(self) -> None:
+        self.errors += 1
+        self._store_down_until = time.monotonic() + self.retry_after
+
+    async def _write(self, job: Job, fields: dict) -> bool:
+        """Store `fields` of a job; False when another worker has taken it over"""
+        if job.id not in self._stored or self.store_down:
+            return True
+        try:
+            result = await asyncio.wait_for(
+                self.collection.update_one({"_id": job.id, "owner": self.owner}, {"$set": fields}),
+                timeout=self.store_timeout,
+            )
+        except Exception as e:
+            # The job goes on in memory; at worst another worker repeats it later
+            self._store_failed()
+            logger.warning("Storing %s job %s as %s failed: %s", job.kind, job.id, job.status,
+                           str(e) or type(e).__name__)
+            return True
+        if result.matched_count == 0:
+            self._stored.discard(job.id)
+            self.abandoned_total += 1
+            logger.warning("Job %s (%s) was taken over by another worker", job.id, job.kind)
+            return False
+        return True
+
+    async def _persist(self, job: Job) -> Optional[Job]:
+        from pymongo.errors import DuplicateKeyError  # deferred with Motor (see mongo.py)
+
+        document = {
+            "_id": job.id,
+            "kind": job.kind,
+            "payload": job.payload,
+            "status": job.status,
+            "attempts": 0,
+            "enqueued_at": job.enqueued_at,
+            "run_at": job.run_at,
+            "owner": self.owner,
+            "lease_until": self._lease(),
+        }
+        if job.key is not None:
+            document["key"] = job.key
+        if self.store_down:
+            self.unpersisted_total += 1
+            return None
+        try:
+            await asyncio.wait_for(self.collection.insert_one(document), timeout=self.store_timeout)
+            self._stored.add(job.id)
+        except DuplicateKeyError:
+            try:
+                known = await asyncio.wait_for(self.collection.find_one({"key": job.key}),
+                                               timeout=self.store_timeout)
+            except Exception:
+                known = None
+            return self._job(known) if known else Job(job.id, job.kind, job.key, job.payload, status="unknown")
+        except Exception as e:
+            self._store_failed()
+            self.unpersisted_total += 1
+            logger.warning("Storing new %s job failed (%s); running it from memory only", job.kind,
+                           str(e) or type(e).__name__)
+        return None
+
+    async def _started(self, job: Job) -> bool:
+        return await self._write(job, {"status": "running", "attempts": job.attempts, "lease_until": self._lease()})
+
+    async def _retrying(self, job: Job) -> bool:
+        return await self._write(job, {"status": "queued", "attempts": job.attempts, "run_at": job.run_at,
+                                       "error": job.error, "lease_until": self._lease()})
+
+    async def _completed(self, job: Job) -> None:
+        await self._write(job, {"status": "done", "error": None, "finished_at": datetime.now(timezone.utc)})
+        self._stored.discard(job.id)
+
+    async def _dead_lettered(self, job: Job) -> None:
+        await self._write(job, {"status": "dead", "attempts": job.attempts, "error": job.error,
+                                "finished_at": datetime.now(timezone.utc)})
+        self._stored.discard(job.id)
+
+    async def renew(self) -> None:
+        """Push the leases of this worker's queued and running jobs forward"""
+        if not self._stored or self.store_down:
+            return
+        await asyncio.wait_for(self.collection.update_many(
+            {"owner": self.owner, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"lease_until": self._lease()}},
+        ), timeout=self.store_timeout)
+
+    async def _release(self) -> None:
+        if not self.jobs:
+            return
+        released = {"status": "queued", "lease_until": datetime.now(timezone.utc)}
+        try:
+            # Jobs cut short by the shutdown get their attempt back; a crash still counts
+            await asyncio.wait_for(self.collection.update_many(
+                {"owner": self.owner, "status": "running"}, {"$set": released, "$inc": {"attempts": -1}},
+            ), timeout=self.store_timeout)
+            await asyncio.wait_for(self.collection.update_many(
+                {"owner": self.owner, "status": "queued"}, {"$set": released},
+            ), timeout=self.store_timeout)
+            logger.info("Left %s queued jobs to the other workers", len(self.jobs))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Releasing %s queued jobs failed (%s); they are taken over once their lease ends",
+                           len(self.jobs), e)
+
+    @staticmethod
+    def _job(document: dict) -> Job:
+        return Job(document["_id"], document["kind"], document.get("key"), document.get("payload") or {},
+                   status=document["status"], attempts=document.get("attempts", 0),
+                   enqueued_at=document.get("enqueued_at"), run_at=document.get("run_at"),
+                   error=document.get("error"))
+
+    async def _recover_forever(self) -> None:
+        # In the background, so startup does not wait on Mongo
+        indexed = False
+        while True:
+            try:
+                await self.renew()
+                if not indexed:
+                    await asyncio.wait_for(self._ensure_indexes(), timeout=max(self.store_timeout, 5.0))
+                    indexed = True
+                await self.recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning("Job store setup or recovery failed: %s", str(e) or type(e).__name__)
+            await asyncio.sleep(self.recover_interval)
+
+    async def recover(self, limit: int = 100) -> int:
+        """Take over jobs whose worker is gone; returns how many"""
+        from pymongo import ReturnDocument  # deferred with Motor (see mongo.py)
+
+        recovered = 0
+        for _ in range(limit):
+            now = datetime.now(timezone.utc)
+            document = await asyncio.wait_for(self.collection.find_one_and_update(
+                {"status": {"$in": ["queued", "running"]}, "lease_until": {"$lt": now},
+                 "kind": {"$in": list(self.handlers)}},
+                {"$set": {"owner": self.owner, "status": "queued", "lease_until": self._lease()}},
+                sort=[("run_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            ), timeout=self.store_timeout)
+            if document is None:
+                break
+            job = self._job(document)
+            recovered += 1
+            self.recovered_total += 1
+            self._stored.add(job.id)
+            if job.id in self.jobs:
+                continue  # our own job after a lapse in renewals; the copy here still runs it
+            self._remember_key(job)
+            if job.attempts >= self.max_attempts:
+                # Its worker died on every attempt
+                job.error = job.error or "worker lost"
+                await self._bury(job)
+            else:
+                self._schedule(job)
+        if recovered:
+            logger.info("Took over %s abandoned jobs", recovered)
+        return recovered
+
+    async def dead_letters(self, limit: int = 100) -> List[dict]:
+        if self.store_down:
+            return await super().dead_letters(limit)
+        try:
+            documents = await asyncio.wait_for(
+                self.collection.find({"status": "dead"}).sort("finished_at", -1).to_list(limit),
+                timeout=self.store_timeout,
+            )
+        except Exception as e:
+            self._store_failed()
+            logger.warning("Reading dead letters failed (%s); listing this worker's only",
+                           str(e) or type(e).__name__)
+            return await super().dead_letters(limit)
+        return [self._job(document).describe() for document in documents]
+
+    async def retry(self, job_id: str) -> Optional[Job]:
+        from pymongo import ReturnDocument  # deferred with Motor (see mongo.py)
+
+        document = await asyncio.wait_for(self.collection.find_one_and_update(
+            {"_id": job_id, "status": "dead", "kind": {"$in": list(self.handlers)}},
+            {"$set": {"status": "queued", "attempts": 0, "error": None, "run_at": time.time(),
+                      "owner": self.owner, "lease_until": self._lease()},
+             "$unset": {"finished_at": ""}},
+            return_document=ReturnDocument.AFTER,
+        ), timeout=self.store_timeout)
+        if document is None:
+            return None
+        for job in self.dead:
+            if job.id == job_id:
+                self.dead.remove(job)
+                break
+        job = self._job(document)
+        self._stored.add(job.id)
+        self._remember_key(job)
+        self._schedule(job)
+        return job
+
+    def stats(self) -> dict:
+        return {**super().stats(), "recovered_total": self.recovered_total,
+                "abandoned_total": self.abandoned_total, "unpersisted_total": self.unpersisted_total,
+                "errors": self.errors}
@@ -0,0 +1,104 @@
+import re
+from typing import AsyncIterator
+
+_WHITESPACE = b" \t\r\n"
+_QUOTE, _COMMA, _OPEN_ARRAY, _CLOSE_ARRAY = ord('"'), ord(","), ord("["), ord("]")
+_OPEN = (ord("{"), _OPEN_ARRAY)
+_CLOSE = (ord("}"), _CLOSE_ARRAY)
+
+# The only bytes that matter outside strings; everything between them is skipped in one search
+_STRUCTURAL = re.compile(rb'["{}\[\],]')
+_NON_SPACE = re.compile(rb"[^ \t\r\n]")
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+async def iter_array_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed top-level JSON array into the raw bytes of its items.
+
+    Only the item currently being scanned is buffered, so memory stays
+    proportional to the largest row rather than the whole body. Items are
+    not parsed here; callers json.loads() each one.
+    """
+    buffer = bytearray()
+    depth = 0
+    in_string = False
+    escaped = False
+    started = False
+    finished = False
+    start = None  # offset of the current item in `buffer`
+    pos = 0
+
+    async for chunk in chunks:
+        if finished:
+            continue
+        buffer += chunk
+        while pos < len(buffer):
+            if in_string:
+                if escaped:
+                    escaped = False
+                    pos += 1
+                    continue
+                # Jump to the closing quote, unless an escape comes first
+                quote = buffer.find(b'"', pos)
+                backslash = buffer.find(b"\\", pos, len(buffer) if quote == -1 else quote)
+                if backslash != -1:
+                    escaped = True
+                    pos = backslash + 1
+                elif quote == -1:
+                    pos = len(buffer)
+                else:
+                    in_string = False
+                    pos = quote + 1
+                continue
+
+            if not started or (depth == 1 and start is None):
+                match = _NON_SPACE.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                pos = match.start()
+                if not started:
+                    if buffer[pos] != _OPEN_ARRAY:
+                        raise JSONStreamError("expected a JSON array")
+                    started = True
+                    depth = 1
+                    pos += 1
+                    continue
+                if buffer[pos] != _COMMA and buffer[pos] != _CLOSE_ARRAY:
+                    start = pos
+
+            match = _STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            pos = match.start()
+            byte = buffer[pos]
+            if depth == 1 and (byte == _COMMA or byte == _CLOSE_ARRAY):
+                if start is not None:
+                    yield bytes(buffer[start:pos]).rstrip(_WHITESPACE)
+                    start = None
+                elif byte == _COMMA:
+                    raise JSONStreamError("empty array item")
+                if byte == _CLOSE_ARRAY:
+                    finished = True
+                    break
+            elif byte == _QUOTE:
+                in_string = True
+            elif byte in _OPEN:
+                depth += 1
+            elif byte in _CLOSE:
+                depth -= 1
+            pos += 1
+
+        # Drop everything before the item in progress
+        drop = start if start is not None else pos
+        del buffer[:drop]
+        pos -= drop
+        if start is not None:
+            start = 0
+
+    if not finished:
+        raise JSONStreamError("truncated JSON array")
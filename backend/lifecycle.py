@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Warm-up progress behind the readiness probe.
+
+    The app is live as soon as it answers requests, and ready once every
+    warm-up step has finished or `timeout` seconds have passed, whichever
+    comes first. Steps run concurrently. A failed or unfinished step is
+    reported but does not hold readiness back: a cold instance still
+    serves, and an upstream outage must not take every instance out of
+    rotation. On shutdown the app reports not ready again, so load
+    balancers stop routing to it while it drains.
+    """
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+        self.ready = False
+        self.draining = False
+        self.started_at: Optional[float] = None
+        self.ready_seconds: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+        self._started: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, steps: Dict[str, Callable[[], Awaitable]]) -> None:
+        """Run the warm-up `steps` in the background"""
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(self._warm_up(steps))
+
+    async def stop(self) -> None:
+        self.ready = False
+        self.draining = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _step(self, name: str, warm: Callable[[], Awaitable]) -> None:
+        started = time.perf_counter()
+        try:
+            await warm()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            self.steps[name] = {"ok": False, "seconds": round(time.perf_counter() - started, 3), "error": error}
+            logger.warning("Warm-up step %s failed: %s", name, error)
+        else:
+            self.steps[name] = {"ok": True, "seconds": round(time.perf_counter() - started, 3)}
+
+    async def _warm_up(self, steps: Dict[str, Callable[[], Awaitable]]) -> None:
+        for name in steps:
+            self.steps[name] = {"ok": None, "seconds": None}
+        tasks = [asyncio.create_task(self._step(name, warm)) for name, warm in steps.items()]
+        try:
+            if tasks:
+                await asyncio.wait(tasks, timeout=self.timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+        unfinished = [name for name, step in self.steps.items() if step["ok"] is None]
+        if unfinished:
+            for name in unfinished:
+                self.steps[name] = {"ok": False, "seconds": self.timeout, "error": "timed out"}
+            logger.warning("Warm-up still running after %ss (%s); reporting ready", self.timeout,
+                           ", ".join(unfinished))
+        self.ready = True
+        self.ready_seconds = round(time.perf_counter() - self._started, 3)
+        logger.info("Ready after %.3fs of warm-up", self.ready_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "draining": self.draining,
+            "started_at": self.started_at,
+            "ready_seconds": self.ready_seconds,
+            "steps": self.steps,
+        }
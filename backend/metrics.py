@@ -0,0 +1,250 @@
+import bisect
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Text exposition lines: the header, then one line per series"""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; per-label state is [bucket counts, sum, count]"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        # Counts are stored per bucket and accumulated at render time
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run `collector` before each scrape, e.g. to refresh gauges"""
+        self.collectors.append(collector)
+
+    def render(self) -> bytes:
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode()
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "API requests by route and status", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "API request latency until the response body is sent", ("method", "route")))
+HTTP_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "http_response_size_bytes", "API response body size", ("method", "route"), buckets=SIZE_BUCKETS))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "API requests currently being served", ("method", "route")))
+
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "supabase_requests_total", "Supabase REST calls by table and status", ("method", "table", "status")))
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "supabase_request_duration_seconds", "Supabase REST call latency, retries included", ("method", "table")))
+UPSTREAM_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "supabase_response_size_bytes", "Supabase REST response body size", ("method", "table"), buckets=SIZE_BUCKETS))
+UPSTREAM_JSON_DECODE = REGISTRY.register(Histogram(
+    "supabase_json_decode_seconds", "Time spent in response.json() on Supabase responses", ("method", "table")))
+VALIDATION_LATENCY = REGISTRY.register(Histogram(
+    "response_validation_seconds", "Time spent validating rows into response models", ("model",)))
+
+JOB_WAIT = REGISTRY.register(Histogram(
+    "job_queue_wait_seconds", "Time background jobs waited for a worker once due", ("kind",)))
+JOB_DURATION = REGISTRY.register(Histogram(
+    "job_duration_seconds", "Background job run time by kind and outcome", ("kind", "outcome")))
+JOB_LATENCY = REGISTRY.register(Histogram(
+    "job_latency_seconds", "Time from enqueueing a background job until it completed, retries included",
+    ("kind",), buckets=LATENCY_BUCKETS + (30.0, 60.0, 300.0)))
+
+
+def route_template(routes, scope) -> Optional[str]:
+    """Path template of the route serving `scope` (bounded label cardinality)"""
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request whose path starts with `prefix`.
+
+    Implemented at the ASGI level (not BaseHTTPMiddleware) so streamed
+    responses pass through untouched; latency runs until the last body
+    chunk is sent.
+    """
+
+    def __init__(self, app, routes, prefix: str = "/api"):
+        self.app = app
+        self.routes = routes
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.routes, scope) or "unmatched"
+        status = "500"
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(method, route)
+            HTTP_LATENCY.observe(method, route, value=time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.observe(method, route, value=size)
+            HTTP_REQUESTS.inc(method, route, status)
+
+
+def endpoint_table(endpoint: str) -> str:
+    """Table name from a PostgREST endpoint like `courses?id=eq.1`"""
+    return endpoint.split("?", 1)[0].strip("/").split("/", 1)[0] or "unknown"
+
+
+def observe_upstream(method: str, endpoint: str, status: Union[int, str, None], seconds: float,
+                     size: Optional[int] = None) -> str:
+    """Record one Supabase call; `status` is None when no response arrived"""
+    table = endpoint_table(endpoint)
+    UPSTREAM_REQUESTS.inc(method, table, str(status) if status is not None else "error")
+    UPSTREAM_LATENCY.observe(method, table, value=seconds)
+    if size is not None:
+        UPSTREAM_RESPONSE_SIZE.observe(method, table, value=size)
+    return table
+
+
+def time_json_decode(response, method: str, table: str) -> None:
+    """Record the cost of `response.json()` each time a handler calls it"""
+    decode = response.json
+
+    def json(**kwargs):
+        started = time.perf_counter()
+        try:
+            return decode(**kwargs)
+        finally:
+            UPSTREAM_JSON_DECODE.observe(method, table, value=time.perf_counter() - started)
+
+    response.json = json
+
+
+def validate_rows(model, rows: List[dict]) -> list:
+    """`model.model_validate` over `rows`, timed per model"""
+    started = time.perf_counter()
+    try:
+        return [model.model_validate(row) for row in rows]
+    finally:
+        VALIDATION_LATENCY.observe(model.__name__, value=time.perf_counter() - started)
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Optional
+
+
+class MongoDatabase:
+    """MongoDB database handle that imports Motor and creates its client on
+    first use.
+
+    Importing Motor (and pymongo behind it) is one of the slowest parts of
+    loading the app, and most requests never touch Mongo. Collections
+    handed out before then are resolved when first used, so stores can
+    still be built at import time.
+    """
+
+    def __init__(self, url: Optional[str], name: Optional[str], **options):
+        self.url = url
+        self.name = name
+        self.options = options
+        self._client = None
+        self._database = None
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    @property
+    def database(self):
+        if self._database is None:
+            if not self.url or not self.name:
+                raise RuntimeError("MongoDB needs MONGO_URL and DB_NAME")
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            self._client = AsyncIOMotorClient(self.url, **self.options)
+            self._database = self._client[self.name]
+        return self._database
+
+    def __getitem__(self, name: str) -> "MongoCollection":
+        return MongoCollection(self, name)
+
+    async def ping(self, timeout: float) -> None:
+        """Connect (if not yet connected) and check the server answers"""
+        await asyncio.wait_for(self.database.command("ping"), timeout=timeout)
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._database = None
+
+
+class MongoCollection:
+    """A collection of a MongoDatabase, looked up on first attribute access"""
+
+    __slots__ = ("_owner", "_name", "_collection")
+
+    def __init__(self, owner: MongoDatabase, name: str):
+        self._owner = owner
+        self._name = name
+        self._collection = None
+
+    def __getattr__(self, attribute: str):
+        if self._collection is None:
+            self._collection = self._owner.database[self._name]
+        return getattr(self._collection, attribute)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from starlette.requests import Request
+
+from attachments import decode_data, is_inline
+from supabase_client import env_int
+
+
+class PayloadError(HTTPException):
+    """Raised for oversized or disallowed payloads.
+
+    An HTTPException, so FastAPI passes it through unchanged even when it
+    is raised while the request body is still being read.
+    """
+
+
+@dataclass
+class PayloadLimits:
+    """Request body and attachment limits"""
+    max_body_bytes: int = 64 * 1024 * 1024  # JSON request bodies
+    max_upload_bytes: int = 512 * 1024 * 1024  # multipart uploads
+    max_file_bytes: int = 50 * 1024 * 1024  # one decoded attachment
+    allowed_file_types: Tuple[str, ...] = ()  # MIME types or `image/` prefixes; empty allows all
+    offload_bytes: int = 256 * 1024  # bodies this large are parsed in a worker process
+    workers: int = 2
+
+    @classmethod
+    def from_env(cls) -> "PayloadLimits":
+        types = os.environ.get("ALLOWED_FILE_TYPES", "")
+        return cls(
+            max_body_bytes=env_int("MAX_BODY_BYTES", cls.max_body_bytes),
+            max_upload_bytes=env_int("MAX_UPLOAD_BYTES", cls.max_upload_bytes),
+            max_file_bytes=env_int("MAX_FILE_BYTES", cls.max_file_bytes),
+            allowed_file_types=tuple(t.strip() for t in types.split(",") if t.strip()),
+            offload_bytes=env_int("PAYLOAD_OFFLOAD_BYTES", cls.offload_bytes),
+            workers=env_int("PAYLOAD_WORKERS", cls.workers),
+        )
+
+    def check_file(self, name: str, media_type: Optional[str], size: int) -> None:
+        if size > self.max_file_bytes:
+            raise PayloadError(413, f"File {name!r} is {size} bytes; the limit is {self.max_file_bytes}")
+        if self.allowed_file_types and not type_allowed(media_type or "", self.allowed_file_types):
+            raise PayloadError(415, f"File type {media_type!r} is not allowed")
+
+
+def type_allowed(media_type: str, allowed: Iterable[str]) -> bool:
+    media_type = media_type.split(";", 1)[0].strip().lower()
+    return any(media_type.startswith(t) if t.endswith("/") else media_type == t for t in allowed)
+
+
+def base64_size(data: str) -> int:
+    """Decoded size of a Base64 string (optionally a data: URL) without decoding it"""
+    if data.startswith("data:"):
+        data = data.partition(",")[2]
+    data = data.rstrip()
+    return len(data) * 3 // 4 - (len(data) - len(data.rstrip("=")))
+
+
+def check_inline_files(files: Optional[list], limits: PayloadLimits) -> None:
+    """Size/type checks for Base64 attachments, before they are decoded"""
+    for file in files or []:
+        if is_inline(file) and "content" not in file:
+            limits.check_file(file.get("name") or "file", file.get("type"), base64_size(file["data"]))
+
+
+def inline_files(data: dict) -> list:
+    """Attachments in a course body (`files`) or a files patch (`ops[].file`)"""
+    files = [f for f in data.get("files") or [] if isinstance(f, dict)]
+    for op in data.get("ops") or []:
+        if isinstance(op, dict) and isinstance(op.get("file"), dict):
+            files.append(op["file"])
+    return [f for f in files if is_inline(f)]
+
+
+def decode_payload(body: bytes, limits: PayloadLimits) -> Any:
+    """Parse a JSON body and decode its inline attachments.
+
+    Runs in a worker process. Each Base64 `data` is replaced by the decoded
+    `content` bytes, so the event loop only sees small metadata plus the
+    raw bytes to write to the blob store.
+    """
+    data = json.loads(body)
+    if isinstance(data, dict):
+        files = inline_files(data)
+        check_inline_files(files, limits)
+        for file in files:
+            try:
+                file["content"] = decode_data(file.pop("data"))
+            except ValueError as e:
+                # 400 like inline bodies get from store_inline_files, not a body parse error
+                raise PayloadError(400, str(e))
+    return data
+
+
+def without_content(value: Any) -> Any:
+    """`value` minus the decoded attachment bytes, for validation errors:
+    error responses echo the input and cannot encode bytes"""
+    if isinstance(value, dict):
+        return {k: without_content(v) for k, v in value.items() if not isinstance(v, bytes)}
+    if isinstance(value, list):
+        return [without_content(v) for v in value]
+    return None if isinstance(value, bytes) else value
+
+
+class PayloadParser:
+    """Reads JSON request bodies under a size limit, off the event loop when large"""
+
+    def __init__(self, limits: PayloadLimits):
+        self.limits = limits
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.offloaded_total = 0
+
+    async def read_body(self, request: Request, limit: int) -> bytes:
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > limit:
+            raise PayloadError(413, f"Request body exceeds {limit} bytes")
+        body = bytearray()
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > limit:
+                raise PayloadError(413, f"Request body exceeds {limit} bytes")
+        return bytes(body)
+
+    async def parse(self, request: Request, model: Type[BaseModel]) -> BaseModel:
+        body = await self.read_body(request, self.limits.max_body_bytes)
+        try:
+            if len(body) < self.limits.offload_bytes:
+                data = json.loads(body)
+            else:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.limits.workers)
+                self.offloaded_total += 1
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(self._pool, decode_payload, body, self.limits)
+        except ValueError as e:
+            # Same shape as FastAPI's own body errors
+            raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": str(e), "input": {}}])
+        try:
+            return model.model_validate(data)
+        except ValidationError as e:
+            errors = [{**error, "loc": ("body", *error["loc"]), "input": without_content(error["input"])}
+                      for error in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=without_content(data))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class BodySizeLimitMiddleware:
+    """Reject oversized request bodies before they are buffered.
+
+    A declared Content-Length over the limit gets a 413 without reading the
+    body; chunked bodies are counted as they arrive and cut off at the
+    limit. Multipart uploads get their own, larger limit.
+    """
+
+    def __init__(self, app, limits: PayloadLimits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_type = ""
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-type":
+                content_type = value.decode("latin-1")
+            elif name == b"content-length" and value.isdigit():
+                content_length = int(value)
+        limit = (self.limits.max_upload_bytes if content_type.startswith("multipart/")
+                 else self.limits.max_body_bytes)
+
+        if content_length is not None and content_length > limit:
+            body = json.dumps({"detail": f"Request body exceeds {limit} bytes"}).encode()
+            await send({"type": "http.response.start", "status": 413, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise PayloadError(413, f"Request body exceeds {limit} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,65 @@
+import base64
+import json
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+# Characters PostgREST treats as syntax inside filter values
+_RESERVED = set(',.:()"\\ ')
+
+
+def quote_value(value) -> str:
+    """Quote a filter value for use inside or=(...)/and=(...) groups"""
+    text = str(value)
+    if not any(ch in _RESERVED for ch in text):
+        return text
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def like_pattern(text: str, prefix_only: bool = False) -> str:
+    """Build an ilike pattern, escaping LIKE wildcards in user input"""
+    escaped = text.replace("*", "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}*" if prefix_only else f"*{escaped}*"
+
+
+def build_query(table: str, params: list) -> str:
+    """Join (key, value) pairs into a PostgREST endpoint string"""
+    if not params:
+        return table
+    query = "&".join(f"{key}={quote(str(value), safe='*,().:')}" for key, value in params)
+    return f"{table}?{query}"
+
+
+def keyset_filter(sort: str, order: str, last_value, last_id: str) -> Tuple[str, str]:
+    """Filter selecting rows strictly after (last_value, last_id) in sort order"""
+    op = "gt" if order == "asc" else "lt"
+    if sort == "id":
+        return "id", f"{op}.{last_id}"
+    value = quote_value(last_value)
+    return "or", f"({sort}.{op}.{value},and({sort}.eq.{value},id.{op}.{quote_value(last_id)}))"
+
+
+def encode_cursor(sort: str, order: str, last_value, last_id: str) -> str:
+    payload = json.dumps([sort, order, last_value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Optional[Tuple[object, str]]:
+    """Return (last_value, last_id), or None if the cursor is malformed or
+    was issued for a different sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, last_value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        return None
+    if cursor_sort != sort or cursor_order != order or not isinstance(last_id, str):
+        return None
+    return last_value, last_id
+
+
+def parse_content_range(header: Optional[str]) -> Optional[int]:
+    """Total row count from a `Content-Range: 0-24/1234` header, if present"""
+    if not header or "/" not in header:
+        return None
+    total = header.rsplit("/", 1)[1].lstrip("~")
+    return int(total) if total.isdigit() else None
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]  # (user id, course id)
+
+
+class ProgressBacklogFull(Exception):
+    """`max_pending` records are waiting for Mongo; the heartbeat was not taken"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Progress backlog full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def empty_progress(user_id: str, course_id: str) -> dict:
+    return {"user_id": user_id, "course_id": course_id, "percent": 0, "position": None, "updated_at": None}
+
+
+def merge_progress(older: dict, newer: dict) -> dict:
+    """Combine two states of one record: percent only ever grows, the
+    playback position is the most recent one"""
+    return {**newer, "percent": max(older["percent"], newer["percent"])}
+
+
+class ProgressStore:
+    """Per-user course progress, written behind to MongoDB.
+
+    Heartbeats only touch memory: they update the hot cache and a dirty
+    map that coalesces every heartbeat for the same (user, course) into
+    one pending record. A background task flushes the dirty map every
+    `flush_interval` seconds (sooner once half of `max_pending` records
+    wait) as a single unordered bulk write of upserts. `$max` keeps percent
+    monotonic without reading the stored document first. A failed flush
+    puts its records back to be retried with the next one.
+
+    `max_pending` is a hard cap on the records held in memory, including
+    the batch being flushed: while Mongo is down, heartbeats for records not
+    already pending raise ProgressBacklogFull instead of growing the buffer.
+    """
+
+    def __init__(self, db, flush_interval: float = 2.0, max_pending: int = 5000,
+                 cache_size: int = 50_000, timeout: float = 5.0):
+        self.collection = db["course_progress"]
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.cache: "OrderedDict[Key, dict]" = OrderedDict()
+        self.dirty: Dict[Key, dict] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._flushing = 0  # records in the bulk write under way
+        self.heartbeats_total = 0
+        self.coalesced_total = 0
+        self.flushes_total = 0
+        self.written_total = 0
+        self.errors_total = 0
+        self.rejected_total = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def setup(self) -> None:
+        self._task = asyncio.create_task(self._flush_forever())
+
+    async def _ensure_index(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self.collection.create_index([("user_id", 1), ("course_id", 1)], unique=True),
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            logger.warning("Progress index setup failed: %s", e)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Last chance for buffered heartbeats
+        await self.flush()
+        if self.dirty:
+            logger.error("Dropping %s unsaved progress records on shutdown", len(self.dirty))
+
+    def _remember(self, key: Key, record: dict) -> None:
+        self.cache[key] = record
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def get(self, user_id: str, course_id: str) -> dict:
+        key = (user_id, course_id)
+        record = self.dirty.get(key) or self.cache.get(key)
+        if record is not None:
+            self.cache_hits += 1
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            return record
+        self.cache_misses += 1
+        document = await asyncio.wait_for(
+            self.collection.find_one({"user_id": user_id, "course_id": course_id}, {"_id": 0}),
+            timeout=self.timeout,
+        )
+        # A heartbeat may have landed while we were reading
+        record = self.dirty.get(key) or self.cache.get(key)
+        if record is None:
+            record = self._from_document(document) if document else empty_progress(user_id, course_id)
+            self._remember(key, record)
+        return record
+
+    def _check_capacity(self, key: Key) -> None:
+        if key not in self.dirty and len(self.dirty) + self._flushing >= self.max_pending:
+            self.rejected_total += 1
+            self._wakeup.set()
+            raise ProgressBacklogFull(self.flush_interval)
+
+    async def record(self, user_id: str, course_id: str, percent: int, position: Optional[float] = None) -> dict:
+        """Apply one heartbeat; returns the merged record.
+
+        Raises ProgressBacklogFull while `max_pending` records wait for Mongo.
+        """
+        self.heartbeats_total += 1
+        key = (user_id, course_id)
+        self._check_capacity(key)
+        known = True
+        try:
+            current = await self.get(user_id, course_id)
+        except Exception as e:
+            # Still buffer the heartbeat; `$max` keeps the stored percent safe
+            logger.warning("Progress read failed (%s); recording without it", e)
+            current = empty_progress(user_id, course_id)
+            known = False
+        record = merge_progress(current, {
+            "user_id": user_id,
+            "course_id": course_id,
+            "percent": percent,
+            "position": position if position is not None else current["position"],
+            "updated_at": datetime.now(timezone.utc),
+        })
+        if record["percent"] == current["percent"] and record["position"] == current["position"]:
+            return current  # nothing new to store
+        if key in self.dirty:
+            self.coalesced_total += 1
+        else:
+            self._check_capacity(key)  # again: others may have filled it while we read
+        self.dirty[key] = record
+        if known:
+            # Without the stored state the merged percent may be too low to cache
+            self._remember(key, record)
+        if len(self.dirty) * 2 >= self.max_pending:
+            self._wakeup.set()
+        return record
+
+    async def for_user(self, user_id: str) -> List[dict]:
+        documents = await asyncio.wait_for(
+            self.collection.find({"user_id": user_id}, {"_id": 0}).to_list(None),
+            timeout=self.timeout,
+        )
+        records = {d["course_id"]: self._from_document(d) for d in documents}
+        for (user, course_id), record in self.dirty.items():
+            if user == user_id:
+                records[course_id] = merge_progress(records.get(course_id, record), record)
+        return sorted(records.values(), key=lambda r: r["updated_at"] or datetime.min.replace(tzinfo=timezone.utc),
+                      reverse=True)
+
+    @staticmethod
+    def _from_document(document: dict) -> dict:
+        record = {**empty_progress(document["user_id"], document["course_id"]), **document}
+        if record["updated_at"] is not None and record["updated_at"].tzinfo is None:
+            record["updated_at"] = record["updated_at"].replace(tzinfo=timezone.utc)
+        return record
+
+    async def _flush_forever(self) -> None:
+        # In the background, so startup does not wait on Mongo
+        await self._ensure_index()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write every pending record in one bulk write; returns how many"""
+        from pymongo import UpdateOne  # deferred with Motor (see mongo.py)
+
+        async with self._flush_lock:
+            if not self.dirty:
+                return 0
+            batch, self.dirty = self.dirty, {}
+            self._flushing = len(batch)
+            operations = [
+                UpdateOne(
+                    {"user_id": user_id, "course_id": course_id},
+                    {"$max": {"percent": record["percent"]},
+                     "$set": {"position": record["position"], "updated_at": record["updated_at"]}},
+                    upsert=True,
+                )
+                for (user_id, course_id), record in batch.items()
+            ]
+            try:
+                await asyncio.wait_for(self.collection.bulk_write(operations, ordered=False), timeout=self.timeout)
+            except Exception as e:
+                self.errors_total += 1
+                logger.warning("Progress flush of %s records failed (%s); retrying", len(batch), e)
+                for key, record in batch.items():
+                    newer = self.dirty.get(key)
+                    self.dirty[key] = merge_progress(record, newer) if newer else record
+                return 0
+            finally:
+                self._flushing = 0
+            self.flushes_total += 1
+            self.written_total += len(batch)
+            return len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.dirty),
+            "cached": len(self.cache),
+            "heartbeats_total": self.heartbeats_total,
+            "coalesced_total": self.coalesced_total,
+            "flushes_total": self.flushes_total,
+            "written_total": self.written_total,
+            "errors_total": self.errors_total,
+            "rejected_total": self.rejected_total,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
@@ -0,0 +1,106 @@
+import weakref
+from typing import Iterable, List, Optional
+
+import orjson
+
+from repository import summarize_course
+from serialization import RowProjector
+
+
+class CourseRecord:
+    """One course as it is served: immutable, slotted, with its response
+    bodies already serialized.
+
+    `summary` and `full` are the CourseSummary and Course JSON of the row
+    (`full` is None when the row was read without its files), so responses
+    are assembled by joining these fragments rather than rebuilding dicts
+    or models per request. Only the fields handlers still look at are kept
+    besides them.
+    """
+
+    __slots__ = ("id", "tag", "version", "updated_at", "summary", "full", "__weakref__")
+
+    def __init__(self, id: str, tag: Optional[str], version: Optional[int], updated_at: Optional[str],
+                 summary: bytes, full: Optional[bytes]):
+        set_field = object.__setattr__
+        set_field(self, "id", id)
+        set_field(self, "tag", tag)
+        set_field(self, "version", version)
+        set_field(self, "updated_at", updated_at)
+        set_field(self, "summary", summary)
+        set_field(self, "full", full)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CourseRecord is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("CourseRecord is immutable")
+
+    def body(self, view: str) -> bytes:
+        """JSON of the "full" or "summary" view (the summary without files)"""
+        return self.full if view == "full" and self.full is not None else self.summary
+
+    def row(self, view: str = "full") -> dict:
+        """The `view` body decoded again, for the rare callers that need a dict"""
+        return orjson.loads(self.body(view))
+
+    def __repr__(self) -> str:
+        return f"CourseRecord(id={self.id!r}, version={self.version!r})"
+
+
+class CourseRecords:
+    """Builds CourseRecords from repository rows, reusing unchanged ones.
+
+    Records are interned by course id for as long as anything (a cached
+    page or course, the search index) holds them. A row whose version and
+    updated_at match the interned record is the same row again, so its
+    serialized bodies are reused instead of being rendered once more.
+    """
+
+    def __init__(self, course: RowProjector, summary: RowProjector):
+        self.course = course
+        self.summary = summary
+        self._interned: "weakref.WeakValueDictionary[str, CourseRecord]" = weakref.WeakValueDictionary()
+        self.built_total = 0
+        self.reused_total = 0
+
+    def build(self, row: dict) -> CourseRecord:
+        """Record for a row of any view; rows with `files` also get the full body"""
+        has_files = "files" in row
+        version = row.get("version")
+        updated_at = row.get("updated_at")
+        summary = None
+        known = self._interned.get(row["id"])
+        if known is not None and version is not None and known.version == version \
+                and known.updated_at == updated_at:
+            if known.full is not None or not has_files:
+                self.reused_total += 1
+                return known
+            summary = known.summary
+        if summary is None:
+            summary = orjson.dumps(self.summary(summarize_course(dict(row)) if has_files else row))
+        full = orjson.dumps(self.course(row)) if has_files else None
+        record = CourseRecord(row["id"], row.get("tag"), version, updated_at, summary, full)
+        # Only a newer row takes over: a one-off record (an export row) must
+        # not displace the one the caches and search index hold
+        if known is None or known.version is None or (version is not None and version > known.version):
+            self._interned[record.id] = record
+        self.built_total += 1
+        return record
+
+    def many(self, rows: Iterable[dict]) -> List[CourseRecord]:
+        return [self.build(row) for row in rows]
+
+    def stats(self) -> dict:
+        return {"interned": len(self._interned), "built_total": self.built_total,
+                "reused_total": self.reused_total}
+
+
+def join_array(fragments: Iterable[bytes]) -> bytes:
+    """A JSON array of already serialized values"""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def extend_object(fragment: bytes, extra: dict) -> bytes:
+    """A serialized (non-empty) JSON object with `extra`'s keys appended"""
+    return fragment[:-1] + b"," + orjson.dumps(extra)[1:]
@@ -0,0 +1,735 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+import metrics
+from jsonstream import iter_array_items
+from postgrest import build_query, keyset_filter, like_pattern, parse_content_range, quote_value
+from resilience import CircuitBreaker, UpstreamUnavailable
+from supabase_client import SupabaseClient, env_float, env_int
+
+# Only needed for COURSE_REPOSITORY=asyncpg; imported by load_asyncpg()
+asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+TABLE = "courses"
+
+# Columns a client may write; anything else is rejected before reaching SQL
+WRITABLE_COLUMNS = ("id", "title", "description", "image_url", "content_description", "files", "progress",
+                    "tag", "image_variants")
+
+# file_count/files_size are the computed columns defined in RLS_FIX_SQL, so
+# `files` never leaves Postgres for a summary. image_variants comes from the
+# same SQL, so it shares their fallback.
+COMPUTED_COLUMNS = ("file_count", "files_size")
+SUMMARY_COLUMNS = ("id", "title", "description", "image_url", "progress", "tag")
+
+# Row version and last write: they tell whether a row changed since it was
+# last read (records.py) and date list pages. Also from RLS_FIX_SQL, so the
+# fallback drops them too.
+ROW_STATE_COLUMNS = ("version", "updated_at")
+
+# Column sets callers can ask for; "full" is every column
+VIEWS = {
+    "summary": (*SUMMARY_COLUMNS, "image_variants", *COMPUTED_COLUMNS, *ROW_STATE_COLUMNS),
+    "search": (*SUMMARY_COLUMNS, "image_variants", *COMPUTED_COLUMNS, *ROW_STATE_COLUMNS, "content_description"),
+    "files": ("id", "version", "files"),
+}
+
+# What a Row Level Security denial stopped, by operation
+ACTIONS = {"GET": "read courses", "POST": "create courses", "PATCH": "update courses", "DELETE": "delete courses"}
+
+
+class RepositoryError(HTTPException):
+    """The database refused an operation.
+
+    An HTTPException carrying the database's status and error body, so
+    handlers can let it through unchanged.
+    """
+
+
+class StorageUnavailable(RepositoryError):
+    """No answer from the database (connection failed or timed out)"""
+
+    def __init__(self, error: Exception):
+        super().__init__(status_code=500, detail=f"Connection error: {error}")
+
+
+class PolicyViolation(RepositoryError):
+    """Row Level Security denied the operation (Postgres error 42501)"""
+
+    def __init__(self, action: str, error: Any):
+        super().__init__(status_code=403, detail=error)
+        self.action = action
+
+
+@dataclass
+class Rows:
+    """Rows read or written, with the JSON they were decoded from"""
+    rows: List[dict]
+    content: bytes = b"[]"  # sizes cache entries and seeds ETags
+    total: Optional[int] = None  # row estimate, for list reads
+
+
+@dataclass(frozen=True)
+class CourseQuery:
+    """Filters, order and keyset position of a course list read"""
+    tag: Optional[str] = None
+    q: Optional[str] = None  # case-insensitive title substring
+    prefix: Optional[str] = None  # case-insensitive title prefix
+    sort: str = "title"
+    order: str = "asc"
+    after: Optional[Tuple[Any, str]] = None  # (sort value, id) of the previous page's last row
+    limit: Optional[int] = None
+
+    def key(self) -> str:
+        """Stable cache key for this query"""
+        return json.dumps([self.tag, self.q, self.prefix, self.sort, self.order, self.after, self.limit],
+                          separators=(",", ":"))
+
+
+def summarize_course(row: dict) -> dict:
+    """Compute file_count/files_size locally for rows fetched with `files`"""
+    files = row.pop("files", None) or []
+    row["file_count"] = len(files)
+    row["files_size"] = sum(int(f.get("size") or 0) for f in files if isinstance(f, dict))
+    return row
+
+
+def upstream_error(response: httpx.Response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
+class CourseRepository(ABC):
+    """Storage for the courses table.
+
+    Reads return the rows together with the JSON they were decoded from;
+    "summary" and "search" rows always carry file_count/files_size. Errors
+    surface as RepositoryError (PolicyViolation for RLS denials,
+    StorageUnavailable when the database cannot be reached) and
+    resilience.UpstreamUnavailable when the circuit breaker rejects a call.
+    """
+
+    name = "base"
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def warm(self, connections: int) -> None:
+        """Open up to `connections` pooled connections ahead of traffic"""
+
+    @abstractmethod
+    def pool_stats(self) -> dict:
+        """Connection pool gauges for /api/health/pool and /metrics"""
+
+    @abstractmethod
+    async def list(self, view: str, query: CourseQuery) -> Rows:
+        """One page of courses matching `query`, with a total row count"""
+
+    @abstractmethod
+    async def stream(self, stack: AsyncExitStack, view: str, query: CourseQuery) -> AsyncIterator[dict]:
+        """Every course matching `query`, read incrementally.
+
+        Raises before returning if the read fails to start; the resources
+        behind the iterator are released when `stack` is closed.
+        """
+
+    @abstractmethod
+    async def get(self, course_id: str, view: str = "full") -> Rows:
+        """The course with `course_id`, if any"""
+
+    @abstractmethod
+    async def scan(self, view: str, after_id: Optional[str], limit: int) -> Rows:
+        """Up to `limit` courses ordered by id, after `after_id`"""
+
+    @abstractmethod
+    async def insert(self, rows: List[dict]) -> Rows:
+        """Insert `rows`; returns them as stored"""
+
+    @abstractmethod
+    async def update(self, ids: Sequence[str], changes: dict, version: Optional[int] = None) -> Rows:
+        """Apply `changes` to the listed courses; returns the updated rows.
+
+        With `version`, only rows still at that version are updated.
+        """
+
+    @abstractmethod
+    async def delete(self, ids: Sequence[str]) -> Rows:
+        """Delete the listed courses; returns the deleted rows"""
+
+
+class PostgrestCourseRepository(CourseRepository):
+    """Courses through Supabase's PostgREST API, over the pooled client.
+
+    Summaries use the computed columns from RLS_FIX_SQL; the first time
+    PostgREST reports them missing (42703) reads switch to fetching `files`
+    and summarizing locally.
+    """
+
+    name = "postgrest"
+
+    def __init__(self, client: SupabaseClient, breaker: CircuitBreaker):
+        self.client = client
+        self.breaker = breaker
+        self.computed_columns = True
+
+    async def start(self) -> None:
+        await self.client.start()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def warm(self, connections: int) -> None:
+        # Concurrent requests make the pool connect (and TLS-handshake) that
+        # many times; the connections are then kept alive for real traffic
+        connections = min(connections, self.client.settings.max_keepalive_connections)
+        await asyncio.gather(*(self.request("HEAD", f"{TABLE}?select=id&limit=1") for _ in range(connections)))
+
+    def pool_stats(self) -> dict:
+        return self.client.pool_stats()
+
+    async def request(self, method: str, endpoint: str, data=None, headers: dict = None,
+                      timeout: float = None) -> httpx.Response:
+        """Make requests to Supabase REST API through the circuit breaker.
+
+        GETs may be hedged (see resilience.CircuitBreaker); raises
+        UpstreamUnavailable when the breaker rejects the call.
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.breaker.call(
+                lambda: self.client.request(method, endpoint, data, headers=headers, timeout=timeout),
+                hedge=method == "GET",
+            )
+        except UpstreamUnavailable:
+            metrics.observe_upstream(method, endpoint, "rejected", time.perf_counter() - started)
+            raise
+        except httpx.RequestError as e:
+            metrics.observe_upstream(method, endpoint, None, time.perf_counter() - started)
+            raise StorageUnavailable(e) from e
+        table = metrics.observe_upstream(
+            method, endpoint, response.status_code, time.perf_counter() - started, len(response.content))
+        metrics.time_json_decode(response, method, table)
+        return response
+
+    @staticmethod
+    def raise_error(method: str, status_code: int, error: Any) -> None:
+        if isinstance(error, dict) and error.get("code") == "42501":
+            raise PolicyViolation(ACTIONS[method], error)
+        raise RepositoryError(status_code=status_code, detail=error)
+
+    def _select(self, view: str) -> Tuple[str, bool]:
+        """(select parameter, whether rows need summarize_course)"""
+        if view not in VIEWS:
+            return "*", False
+        columns = VIEWS[view]
+        if self.computed_columns or "file_count" not in columns:
+            return ",".join(columns), False
+        fallback = [c for c in columns
+                    if c not in COMPUTED_COLUMNS and c not in ROW_STATE_COLUMNS and c != "image_variants"]
+        return ",".join([*fallback, "files"]), True
+
+    def _missing_computed(self, view: str, error: Any) -> bool:
+        """Whether `error` means the computed columns are missing; switches to the fallback"""
+        if not (self.computed_columns and "file_count" in VIEWS.get(view, ())):
+            return False
+        if not (isinstance(error, dict) and error.get("code") == "42703"):
+            return False
+        logger.warning("file_count/files_size missing in Supabase; run RLS_FIX_SQL. Falling back to files column")
+        self.computed_columns = False
+        return True
+
+    async def _read(self, view: str, params: list, headers: dict = None) -> Tuple[httpx.Response, bool]:
+        while True:
+            select, summarize = self._select(view)
+            response = await self.request("GET", build_query(TABLE, [("select", select)] + params), headers=headers)
+            if response.status_code == 400 and self._missing_computed(view, upstream_error(response)):
+                continue
+            return response, summarize
+
+    @staticmethod
+    def _rows(response: httpx.Response, summarize: bool) -> List[dict]:
+        rows = response.json()
+        return [summarize_course(row) for row in rows] if summarize else rows
+
+    @staticmethod
+    def _filters(query: CourseQuery) -> list:
+        params = []
+        if query.tag:
+            params.append(("tag", f"eq.{query.tag}"))
+        if query.q:
+            params.append(("title", f"ilike.{like_pattern(query.q)}"))
+        if query.prefix:
+            params.append(("title", f"ilike.{like_pattern(query.prefix, prefix_only=True)}"))
+        if query.after is not None:
+            params.append(keyset_filter(query.sort, query.order, *query.after))
+        # id breaks ties so ordering is stable across pages
+        order = query.order
+        params.append(("order", f"id.{order}" if query.sort == "id" else f"{query.sort}.{order},id.{order}"))
+        if query.limit is not None:
+            params.append(("limit", query.limit))
+        return params
+
+    @staticmethod
+    def _ids(ids: Sequence[str]) -> Tuple[str, str]:
+        return "id", f"in.({','.join(quote_value(course_id) for course_id in ids)})"
+
+    async def list(self, view: str, query: CourseQuery) -> Rows:
+        if query.after is None:
+            response, summarize = await self._read(view, self._filters(query), headers={"Prefer": "count=estimated"})
+            total = parse_content_range(response.headers.get("content-range"))
+        else:
+            # Counted with the page, the keyset condition would leave only the
+            # rows after the cursor: count the query without it, alongside
+            (response, summarize), total = await asyncio.gather(self._read(view, self._filters(query)),
+                                                                self._count(query))
+        if response.status_code in (200, 206):
+            return Rows(self._rows(response, summarize), response.content, total)
+        if response.status_code == 404:
+            return Rows([], total=0)
+        self.raise_error("GET", response.status_code, upstream_error(response))
+
+    async def _count(self, query: CourseQuery) -> Optional[int]:
+        """Estimated rows matching `query` from its first page on"""
+        params = [("select", "id"), *self._filters(replace(query, after=None, limit=0))]
+        response = await self.request("HEAD", build_query(TABLE, params), headers={"Prefer": "count=estimated"})
+        if response.status_code not in (200, 206):
+            return None
+        return parse_content_range(response.headers.get("content-range"))
+
+    async def stream(self, stack: AsyncExitStack, view: str, query: CourseQuery) -> AsyncIterator[dict]:
+        while True:
+            select, summarize = self._select(view)
+            endpoint = build_query(TABLE, [("select", select)] + self._filters(query))
+            started = time.perf_counter()
+            try:
+                upstream = await self.breaker.open_stream(
+                    stack, lambda: stack.enter_async_context(self.client.stream("GET", endpoint)))
+            except UpstreamUnavailable:
+                metrics.observe_upstream("GET", endpoint, "rejected", time.perf_counter() - started)
+                raise
+            except httpx.RequestError as e:
+                raise StorageUnavailable(e) from e
+            # Latency to the response headers; the body size is unknown up front
+            metrics.observe_upstream("GET", endpoint, upstream.status_code, time.perf_counter() - started)
+            if upstream.status_code == 200:
+                break
+            content = await upstream.aread()
+            await stack.aclose()
+            error = json.loads(content) if content else {}
+            if upstream.status_code == 400 and self._missing_computed(view, error):
+                continue
+            self.raise_error("GET", upstream.status_code, error)
+
+        async def rows():
+            async for raw in iter_array_items(upstream.aiter_bytes()):
+                row = json.loads(raw)
+                yield summarize_course(row) if summarize else row
+
+        return rows()
+
+    async def get(self, course_id: str, view: str = "full") -> Rows:
+        response, summarize = await self._read(view, [("id", f"eq.{course_id}")])
+        if response.status_code != 200:
+            self.raise_error("GET", response.status_code, upstream_error(response))
+        return Rows(self._rows(response, summarize), response.content)
+
+    async def scan(self, view: str, after_id: Optional[str], limit: int) -> Rows:
+        params = [("order", "id.asc"), ("limit", limit)]
+        if after_id is not None:
+            params.append(("id", f"gt.{after_id}"))
+        response, summarize = await self._read(view, params)
+        if response.status_code != 200:
+            self.raise_error("GET", response.status_code, upstream_error(response))
+        return Rows(self._rows(response, summarize), response.content)
+
+    async def insert(self, rows: List[dict]) -> Rows:
+        response = await self.request("POST", TABLE, rows)
+        if response.status_code not in (200, 201):
+            self.raise_error("POST", response.status_code, upstream_error(response))
+        return Rows(response.json(), response.content)
+
+    async def update(self, ids: Sequence[str], changes: dict, version: Optional[int] = None) -> Rows:
+        params = [self._ids(ids)]
+        if version is not None:
+            params.append(("version", f"eq.{version}"))
+        response = await self.request("PATCH", build_query(TABLE, params), changes)
+        if response.status_code != 200:
+            self.raise_error("PATCH", response.status_code, upstream_error(response))
+        return Rows(response.json(), response.content)
+
+    async def delete(self, ids: Sequence[str]) -> Rows:
+        response = await self.request("DELETE", build_query(TABLE, [self._ids(ids)]))
+        if response.status_code not in (200, 204):
+            self.raise_error("DELETE", response.status_code, upstream_error(response))
+        if response.status_code == 204 or not response.content:
+            # No representation returned: all we know is that the ids are gone
+            return Rows([{"id": course_id} for course_id in ids])
+        return Rows(response.json(), response.content)
+
+
+@dataclass
+class DatabaseSettings:
+    """Connection pool settings for the direct Postgres repository"""
+    dsn: str = ""
+    min_size: int = 1
+    max_size: int = 10
+    command_timeout: float = 15.0
+    max_inactive_lifetime: float = 300.0
+    # Prepared statements cached per connection; 0 behind a transaction-mode
+    # pooler (e.g. Supabase's on port 6543), which cannot keep them
+    statement_cache_size: int = 256
+    stream_batch: int = 200  # rows fetched per round trip by exports
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        return cls(
+            dsn=os.environ.get("DATABASE_URL", cls.dsn),
+            min_size=env_int("DATABASE_POOL_MIN_SIZE", cls.min_size),
+            max_size=env_int("DATABASE_POOL_MAX_SIZE", cls.max_size),
+            command_timeout=env_float("DATABASE_COMMAND_TIMEOUT", cls.command_timeout),
+            max_inactive_lifetime=env_float("DATABASE_POOL_MAX_INACTIVE_LIFETIME", cls.max_inactive_lifetime),
+            statement_cache_size=env_int("DATABASE_STATEMENT_CACHE_SIZE", cls.statement_cache_size),
+            stream_batch=env_int("DATABASE_STREAM_BATCH", cls.stream_batch),
+        )
+
+
+# SQL for columns that are not plain table columns
+COLUMN_SQL = {
+    "file_count": "coalesce(jsonb_array_length(c.files), 0) AS file_count",
+    "files_size": ("(SELECT coalesce(sum((f->>'size')::bigint), 0) "
+                   "FROM jsonb_array_elements(coalesce(c.files, '[]'::jsonb)) AS f) AS files_size"),
+}
+
+# SQLSTATEs mapped to the status PostgREST would have answered with
+SQLSTATE_STATUS = {"23503": 409, "23505": 409, "42P01": 404, "42883": 404, "25006": 405}
+
+# SQLSTATE classes meaning the database itself is in trouble (connection
+# exceptions, insufficient resources, operator intervention, system errors)
+OUTAGE_CLASSES = ("08", "53", "57", "58")
+
+# Failures reaching or talking to the database (asyncpg's own are added by
+# load_asyncpg)
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError)
+
+VERBS = {"GET": "SELECT", "POST": "INSERT", "PATCH": "UPDATE", "DELETE": "DELETE"}
+
+
+def like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def load_asyncpg():
+    """Import asyncpg on first use, so the PostgREST setup never loads it"""
+    global asyncpg, CONNECTION_ERRORS
+    if asyncpg is None:
+        import asyncpg as module
+
+        asyncpg = module
+        CONNECTION_ERRORS = (module.PostgresError, module.InterfaceError, OSError, asyncio.TimeoutError)
+    return asyncpg
+
+
+class AsyncpgCourseRepository(CourseRepository):
+    """Courses straight from Postgres over an asyncpg connection pool.
+
+    Every statement is parameterized and built from a small set of
+    templates, so asyncpg's per-connection statement cache prepares each
+    one once and reuses it. Postgres renders the result rows as a single
+    JSON document (json_agg), which skips per-column decoding and gives the
+    same representation PostgREST would have sent. Calls go through the
+    same circuit breaker as PostgREST; errors the database answers with
+    (constraint violations, bad input) do not count against it.
+    """
+
+    name = "asyncpg"
+
+    def __init__(self, settings: DatabaseSettings, breaker: CircuitBreaker):
+        try:
+            load_asyncpg()
+        except ImportError:
+            raise RuntimeError("COURSE_REPOSITORY=asyncpg needs the 'asyncpg' package")
+        if not settings.dsn:
+            raise RuntimeError("COURSE_REPOSITORY=asyncpg needs DATABASE_URL")
+        self.settings = settings
+        self.breaker = breaker
+        self._pool = None
+        self._lock = asyncio.Lock()
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def _get_pool(self):
+        async with self._lock:
+            if self._pool is None:
+                settings = self.settings
+                self._pool = await asyncpg.create_pool(
+                    settings.dsn,
+                    min_size=settings.min_size,
+                    max_size=settings.max_size,
+                    command_timeout=settings.command_timeout,
+                    max_inactive_connection_lifetime=settings.max_inactive_lifetime,
+                    statement_cache_size=settings.statement_cache_size,
+                    server_settings={"application_name": "classroom-api"},
+                )
+                logger.info("Postgres pool started (min_size=%s, max_size=%s)", settings.min_size, settings.max_size)
+            return self._pool
+
+    async def start(self) -> None:
+        try:
+            await self._get_pool()
+        except Exception as e:
+            # Retried on first use, so a database outage does not block startup
+            logger.warning("Postgres pool could not connect yet: %s", e)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._pool is not None:
+                await self._pool.close()
+                self._pool = None
+
+    async def warm(self, connections: int) -> None:
+        pool = await self._get_pool()
+
+        async def ping():
+            async with pool.acquire() as connection:
+                await connection.fetchval("SELECT 1")
+
+        await asyncio.gather(*(ping() for _ in range(min(connections, self.settings.max_size))))
+
+    def pool_stats(self) -> dict:
+        pool = self._pool
+        size = pool.get_size() if pool is not None else 0
+        idle = pool.get_idle_size() if pool is not None else 0
+        return {
+            "started": pool is not None,
+            "min_size": self.settings.min_size,
+            "max_size": self.settings.max_size,
+            "connections": size,
+            "idle_connections": idle,
+            "active_connections": size - idle,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "requests_total": self.requests_total,
+            "retries_total": 0,
+            "errors_total": self.errors_total,
+        }
+
+    @staticmethod
+    def translate(method: str, error: Exception) -> RepositoryError:
+        """RepositoryError for an asyncpg failure, with a PostgREST-style body"""
+        if not isinstance(error, asyncpg.PostgresError) or error.sqlstate[:2] in OUTAGE_CLASSES:
+            return StorageUnavailable(error)
+        detail = {
+            "code": error.sqlstate,
+            "message": getattr(error, "message", None) or str(error),
+            "details": getattr(error, "detail", None),
+            "hint": getattr(error, "hint", None),
+        }
+        if error.sqlstate == "42501":
+            return PolicyViolation(ACTIONS[method], detail)
+        status = SQLSTATE_STATUS.get(error.sqlstate, 400 if error.sqlstate[:2] in ("22", "23", "42") else 500)
+        return RepositoryError(status_code=status, detail=detail)
+
+    async def _fetch(self, method: str, sql: str, *args) -> Rows:
+        """Run a statement returning one JSON text value through the breaker"""
+        verb = VERBS[method]
+        started = time.perf_counter()
+
+        async def attempt():
+            pool = await self._get_pool()
+            try:
+                return await pool.fetchrow(sql, *args)
+            except asyncpg.PostgresError as e:
+                if e.sqlstate[:2] in OUTAGE_CLASSES:
+                    raise
+                return e  # answered by the database: not an outage
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            result = await self.breaker.call(attempt)
+        except UpstreamUnavailable:
+            metrics.observe_upstream(verb, TABLE, "rejected", time.perf_counter() - started)
+            raise
+        except CONNECTION_ERRORS as e:
+            self.errors_total += 1
+            metrics.observe_upstream(verb, TABLE, None, time.perf_counter() - started)
+            raise self.translate(method, e) from e
+        finally:
+            self.in_flight -= 1
+        if isinstance(result, Exception):
+            metrics.observe_upstream(verb, TABLE, result.sqlstate, time.perf_counter() - started)
+            raise self.translate(method, result)
+
+        content = result["rows"].encode()
+        metrics.observe_upstream(verb, TABLE, "ok", time.perf_counter() - started, len(content))
+        decode_started = time.perf_counter()
+        rows = json.loads(content)
+        metrics.UPSTREAM_JSON_DECODE.observe(verb, TABLE, value=time.perf_counter() - decode_started)
+        total = result["total"] if "total" in result.keys() else None
+        return Rows(rows, content, total)
+
+    @staticmethod
+    def _columns(view: str) -> str:
+        if view not in VIEWS:
+            return "c.*"
+        return ", ".join(COLUMN_SQL.get(column, f"c.{column}") for column in VIEWS[view])
+
+    @staticmethod
+    def _where(query: CourseQuery, args: list) -> str:
+        def arg(value) -> str:
+            args.append(value)
+            return f"${len(args)}"
+
+        clauses = []
+        if query.tag:
+            clauses.append(f"c.tag = {arg(query.tag)}")
+        if query.q:
+            clauses.append(f"c.title ILIKE {arg('%' + like_escape(query.q) + '%')}")
+        if query.prefix:
+            clauses.append(f"c.title ILIKE {arg(like_escape(query.prefix) + '%')}")
+        if query.after is not None:
+            op = ">" if query.order == "asc" else "<"
+            value, last_id = query.after
+            if query.sort == "id":
+                clauses.append(f"c.id {op} {arg(last_id)}")
+            else:
+                clauses.append(f"(c.{query.sort}, c.id) {op} ({arg(value)}, {arg(last_id)})")
+        return " AND ".join(clauses) or "true"
+
+    @staticmethod
+    def _order(query: CourseQuery) -> str:
+        # id breaks ties so ordering is stable across pages
+        direction = "ASC" if query.order == "asc" else "DESC"
+        if query.sort == "id":
+            return f"c.id {direction}"
+        return f"c.{query.sort} {direction}, c.id {direction}"
+
+    @staticmethod
+    def _changes(changes: dict) -> List[str]:
+        columns = [column for column in WRITABLE_COLUMNS if column in changes]
+        unknown = set(changes) - set(WRITABLE_COLUMNS)
+        if unknown:
+            raise RepositoryError(status_code=400, detail={
+                "code": "PGRST204", "message": f"Could not find the '{sorted(unknown)[0]}' column of '{TABLE}'"})
+        return columns
+
+    async def list(self, view: str, query: CourseQuery) -> Rows:
+        args = []
+        where = self._where(query, args)
+        limit = f" LIMIT {int(query.limit)}" if query.limit is not None else ""
+        sql = (
+            f"SELECT {self._total(query)} AS total, "
+            f"(SELECT coalesce(json_agg(r), '[]')::text FROM "
+            f"(SELECT {self._columns(view)} FROM {TABLE} c WHERE {where} ORDER BY {self._order(query)}{limit}) r"
+            f") AS rows"
+        )
+        return await self._fetch("GET", sql, *args)
+
+    def _total(self, query: CourseQuery) -> str:
+        """SQL for the X-Total-Count of a list page, never filtered by the cursor"""
+        if not (query.tag or query.q or query.prefix):
+            # The planner's estimate, like PostgREST's count=estimated; exact only before the first ANALYZE
+            return (f"coalesce((SELECT reltuples::bigint FROM pg_class WHERE oid = '{TABLE}'::regclass "
+                    f"AND reltuples >= 0), (SELECT count(*) FROM {TABLE}))")
+        if query.after is not None:
+            # An exact filtered count per page is a scan per page; the first page already reported it
+            return "NULL"
+        # Filter placeholders come before the keyset ones, so they line up with the page's arguments
+        return f"(SELECT count(*) FROM {TABLE} c WHERE {self._where(query, [])})"
+
+    async def stream(self, stack: AsyncExitStack, view: str, query: CourseQuery) -> AsyncIterator[dict]:
+        args = []
+        sql = (f"SELECT row_to_json(r)::text FROM (SELECT {self._columns(view)} FROM {TABLE} c "
+               f"WHERE {self._where(query, args)} ORDER BY {self._order(query)}) r")
+        batch_size = self.settings.stream_batch
+        try:
+            pool = await self._get_pool()
+            connection = await stack.enter_async_context(pool.acquire())
+            # A cursor needs a transaction; read-only and one snapshot for the whole export
+            await stack.enter_async_context(connection.transaction(isolation="repeatable_read", readonly=True))
+            cursor = await connection.cursor(sql, *args)
+            first = await cursor.fetch(batch_size)
+        except CONNECTION_ERRORS as e:
+            await stack.aclose()
+            raise self.translate("GET", e) from e
+
+        async def rows():
+            batch = first
+            while batch:
+                for record in batch:
+                    yield json.loads(record[0])
+                if len(batch) < batch_size:
+                    return
+                batch = await cursor.fetch(batch_size)
+
+        return rows()
+
+    async def get(self, course_id: str, view: str = "full") -> Rows:
+        sql = (f"SELECT coalesce(json_agg(r), '[]')::text AS rows FROM "
+               f"(SELECT {self._columns(view)} FROM {TABLE} c WHERE c.id = $1) r")
+        return await self._fetch("GET", sql, course_id)
+
+    async def scan(self, view: str, after_id: Optional[str], limit: int) -> Rows:
+        where = "c.id > $2" if after_id is not None else "true"
+        sql = (f"SELECT coalesce(json_agg(r), '[]')::text AS rows FROM "
+               f"(SELECT {self._columns(view)} FROM {TABLE} c WHERE {where} ORDER BY c.id LIMIT $1) r")
+        args = (limit, after_id) if after_id is not None else (limit,)
+        return await self._fetch("GET", sql, *args)
+
+    async def insert(self, rows: List[dict]) -> Rows:
+        if not rows:
+            return Rows([])
+        columns: Dict[str, None] = {}
+        for row in rows:
+            columns.update(dict.fromkeys(self._changes(row)))
+        # Columns no row sets keep their defaults (version, updated_at)
+        names = ", ".join(columns)
+        sql = (f"WITH w AS (INSERT INTO {TABLE} ({names}) "
+               f"SELECT {names} FROM jsonb_populate_recordset(NULL::{TABLE}, $1::jsonb) RETURNING *) "
+               f"SELECT coalesce(json_agg(w), '[]')::text AS rows FROM w")
+        return await self._fetch("POST", sql, json.dumps(rows))
+
+    async def update(self, ids: Sequence[str], changes: dict, version: Optional[int] = None) -> Rows:
+        args = [list(ids)]
+        where = "c.id = ANY($1::text[])"
+        if version is not None:
+            args.append(version)
+            where += " AND c.version = $2"
+        columns = self._changes(changes)
+        if not columns:
+            # Nothing to write: answer with the matching rows, as PostgREST does
+            sql = f"SELECT coalesce(json_agg(c), '[]')::text AS rows FROM {TABLE} c WHERE {where}"
+            return await self._fetch("PATCH", sql, *args)
+        args.append(json.dumps(changes))
+        names = ", ".join(columns)
+        # ROW(...) so a single column is still assigned as a row
+        sql = (f"WITH w AS (UPDATE {TABLE} AS c SET ({names}) = ROW({', '.join(f'p.{n}' for n in columns)}) "
+               f"FROM jsonb_populate_record(NULL::{TABLE}, ${len(args)}::jsonb) AS p "
+               f"WHERE {where} RETURNING c.*) "
+               f"SELECT coalesce(json_agg(w), '[]')::text AS rows FROM w")
+        return await self._fetch("PATCH", sql, *args)
+
+    async def delete(self, ids: Sequence[str]) -> Rows:
+        sql = (f"WITH w AS (DELETE FROM {TABLE} c WHERE c.id = ANY($1::text[]) RETURNING c.*) "
+               f"SELECT coalesce(json_agg(w), '[]')::text AS rows FROM w")
+        return await self._fetch("DELETE", sql, list(ids))
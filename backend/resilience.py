@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Optional, Tuple
+
+import httpx
+
+from supabase_client import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling Supabase; maps to 503 with Retry-After"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+class UpstreamBusy(UpstreamUnavailable):
+    pass
+
+
+@dataclass
+class BreakerSettings:
+    """Circuit breaker, bulkhead and hedging settings for Supabase calls"""
+    enabled: bool = True
+    window: int = 50  # most recent calls considered when deciding to trip
+    min_calls: int = 10
+    failure_rate: float = 0.5
+    slow_call_seconds: float = 2.0
+    slow_call_rate: float = 0.8
+    open_seconds: float = 10.0
+    half_open_calls: int = 3
+    max_concurrency: int = 64
+    acquire_timeout: float = 1.0
+    hedge_enabled: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_delay: float = 0.05
+    hedge_min_samples: int = 20
+
+    @classmethod
+    def from_env(cls) -> "BreakerSettings":
+        return cls(
+            enabled=env_bool("SUPABASE_BREAKER_ENABLED", cls.enabled),
+            window=env_int("SUPABASE_BREAKER_WINDOW", cls.window),
+            min_calls=env_int("SUPABASE_BREAKER_MIN_CALLS", cls.min_calls),
+            failure_rate=env_float("SUPABASE_BREAKER_FAILURE_RATE", cls.failure_rate),
+            slow_call_seconds=env_float("SUPABASE_BREAKER_SLOW_CALL_SECONDS", cls.slow_call_seconds),
+            slow_call_rate=env_float("SUPABASE_BREAKER_SLOW_CALL_RATE", cls.slow_call_rate),
+            open_seconds=env_float("SUPABASE_BREAKER_OPEN_SECONDS", cls.open_seconds),
+            half_open_calls=env_int("SUPABASE_BREAKER_HALF_OPEN_CALLS", cls.half_open_calls),
+            max_concurrency=env_int("SUPABASE_MAX_CONCURRENCY", cls.max_concurrency),
+            acquire_timeout=env_float("SUPABASE_ACQUIRE_TIMEOUT", cls.acquire_timeout),
+            hedge_enabled=env_bool("SUPABASE_HEDGE_ENABLED", cls.hedge_enabled),
+            hedge_quantile=env_float("SUPABASE_HEDGE_QUANTILE", cls.hedge_quantile),
+            hedge_min_delay=env_float("SUPABASE_HEDGE_MIN_DELAY", cls.hedge_min_delay),
+            hedge_min_samples=env_int("SUPABASE_HEDGE_MIN_SAMPLES", cls.hedge_min_samples),
+        )
+
+
+class LatencyWindow:
+    """Recent call latencies, for picking the hedge delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: Optional[list] = None
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._sorted = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+def is_failure(response) -> bool:
+    """Upstream faults count against the breaker; 4xx answers (and results
+    that are not HTTP responses, e.g. database rows) do not"""
+    return response is None or getattr(response, "status_code", 0) >= 500
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker with a concurrency limit and GET hedging.
+
+    Trips when, over the last `window` calls, the failure rate (transport
+    errors and 5xx) or the slow-call rate reaches its threshold. While open,
+    calls fail fast with CircuitOpen; after `open_seconds` a few probe calls
+    are let through and the breaker closes again if they succeed. At most
+    `max_concurrency` calls run at once; callers wait up to
+    `acquire_timeout` for a slot and then get UpstreamBusy.
+    """
+
+    def __init__(self, settings: Optional[BreakerSettings] = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings or BreakerSettings()
+        self._clock = clock
+        self._semaphore = asyncio.Semaphore(self.settings.max_concurrency)
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=self.settings.window)
+        self.latencies = LatencyWindow()
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._probes = 0  # half-open calls currently in flight
+        self._probe_successes = 0
+        self.in_flight = 0
+        self.rejected_total = 0
+        self.busy_total = 0
+        self.hedges_total = 0
+        self.hedge_wins_total = 0
+        self.trips_total = 0
+
+    def _retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.settings.open_seconds - self._clock())
+
+    def _admit(self) -> bool:
+        """Raise CircuitOpen unless a call may go out; True for half-open probes"""
+        if self.state == "open":
+            if self._retry_after() > 0:
+                self.rejected_total += 1
+                raise CircuitOpen("Supabase circuit is open", self._retry_after())
+            self.state = "half_open"
+            self._probes = self._probe_successes = 0
+        if self.state == "half_open":
+            if self._probes >= self.settings.half_open_calls:
+                self.rejected_total += 1
+                raise CircuitOpen("Supabase circuit is half-open", self.settings.open_seconds)
+            self._probes += 1
+            return True
+        return False
+
+    def _trip(self, reason: str) -> None:
+        self.state = "open"
+        self.opened_at = self._clock()
+        self.trips_total += 1
+        self._outcomes.clear()
+        logger.warning("Supabase circuit opened (%s); failing fast for %.1fs", reason, self.settings.open_seconds)
+
+    def record(self, failed: bool, seconds: float) -> None:
+        slow = seconds >= self.settings.slow_call_seconds
+        if not failed:
+            self.latencies.add(seconds)
+        if self.state == "half_open":
+            if failed or slow:
+                self._trip("probe failed")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.settings.half_open_calls:
+                self.state = "closed"
+                self._outcomes.clear()
+                logger.info("Supabase circuit closed")
+            return
+        if self.state != "closed":
+            return
+        self._outcomes.append((failed, slow))
+        calls = len(self._outcomes)
+        if calls < self.settings.min_calls:
+            return
+        failures = sum(1 for f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, s in self._outcomes if s)
+        if failures / calls >= self.settings.failure_rate:
+            self._trip(f"{failures}/{calls} calls failed")
+        elif slow_calls / calls >= self.settings.slow_call_rate:
+            self._trip(f"{slow_calls}/{calls} calls slower than {self.settings.slow_call_seconds}s")
+
+    async def _acquire(self) -> None:
+        if not self._semaphore.locked():
+            # Uncontended: acquire() returns without suspending
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            return
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.settings.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.busy_total += 1
+            raise UpstreamBusy("Too many concurrent Supabase calls", self.settings.acquire_timeout)
+        self.in_flight += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _timed(self, call: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        started = self._clock()
+        response = None
+        try:
+            response = await call()
+            return response
+        except asyncio.CancelledError:
+            # A losing hedge; says nothing about upstream health
+            raise
+        except Exception:
+            self.record(True, self._clock() - started)
+            raise
+        finally:
+            if response is not None:
+                self.record(is_failure(response), self._clock() - started)
+
+    def hedge_delay(self) -> Optional[float]:
+        settings = self.settings
+        if not settings.hedge_enabled or len(self.latencies) < settings.hedge_min_samples:
+            return None
+        return max(settings.hedge_min_delay, self.latencies.quantile(settings.hedge_quantile))
+
+    async def call(self, call: Callable[[], Awaitable[httpx.Response]], hedge: bool = False) -> httpx.Response:
+        """Run `call` under the breaker; with `hedge`, duplicate it if slow.
+
+        Only idempotent calls (GETs) may be hedged: the duplicate is sent
+        when the first attempt is still pending at the recent p95 latency,
+        and whichever answers first wins.
+        """
+        if not self.settings.enabled:
+            return await call()
+        probe = self._admit()
+        try:
+            await self._acquire()
+            try:
+                delay = self.hedge_delay() if hedge else None
+                if delay is None:
+                    return await self._timed(call)
+                return await self._hedged(call, delay)
+            finally:
+                self._release()
+        finally:
+            if probe:
+                self._probes -= 1
+
+    async def open_stream(self, stack: AsyncExitStack, call: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Run `call`, which opens a streamed response on `stack`, under the breaker.
+
+        The concurrency slot is held until `stack` closes, so long reads
+        count against `max_concurrency`; only the time to the response
+        headers is recorded. Streams are never hedged.
+        """
+        if not self.settings.enabled:
+            return await call()
+        probe = self._admit()
+        try:
+            await self._acquire()
+            # Registered first, so released after the stream is closed
+            stack.callback(self._release)
+            return await self._timed(call)
+        finally:
+            if probe:
+                self._probes -= 1
+
+    async def _hedged(self, call, delay: float) -> httpx.Response:
+        first = asyncio.ensure_future(self._timed(call))
+        attempts = [first]
+        hedged = False
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or self._semaphore.locked():
+                # Answered in time, or no spare capacity for a duplicate
+                return await first
+
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            self.hedges_total += 1
+            hedged = True
+            second = asyncio.ensure_future(self._timed(call))
+            attempts.append(second)
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    if winner is second:
+                        self.hedge_wins_total += 1
+                    return winner.result()
+            # Both attempts failed
+            return first.result()
+        finally:
+            # Also reached when the caller is cancelled mid-wait: no attempt may outlive it
+            for task in attempts:
+                task.cancel()
+            if hedged:
+                self._release()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.settings.enabled,
+            "state": self.state,
+            "retry_after": round(self._retry_after(), 3) if self.state == "open" else 0.0,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.settings.max_concurrency,
+            "window_calls": len(self._outcomes),
+            "window_failures": sum(1 for f, _ in self._outcomes if f),
+            "window_slow_calls": sum(1 for _, s in self._outcomes if s),
+            "trips_total": self.trips_total,
+            "rejected_total": self.rejected_total,
+            "busy_total": self.busy_total,
+            "hedge_enabled": self.settings.hedge_enabled,
+            "hedge_delay": self.hedge_delay(),
+            "hedges_total": self.hedges_total,
+            "hedge_wins_total": self.hedge_wins_total,
+        }
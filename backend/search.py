@@ -0,0 +1,244 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+import time
+import unicodedata
+from operator import itemgetter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Field weights: a title hit counts three times a body hit
+SEARCH_FIELDS = {"title": 3.0, "description": 1.5, "content_description": 1.0}
+
+# Typeahead: the last query word also matches up to this many longer terms
+MAX_PREFIX_EXPANSIONS = 64
+PREFIX_PENALTY = 0.8
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TAGS = re.compile(r"<[^>]+>")
+_WORDS = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased, accent-folded words of `text` (HTML tags dropped)"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", _TAGS.sub(" ", text))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORDS.findall(text.lower())
+
+
+class SearchIndex:
+    """In-memory inverted index over course text, ranked with BM25.
+
+    Postings map each term to {course id: field-weighted term frequency};
+    a sorted vocabulary serves prefix lookups for the last, possibly
+    unfinished, query word. Every query word must match (AND semantics).
+    """
+
+    def __init__(self, fields: Dict[str, float] = SEARCH_FIELDS):
+        self.fields = fields
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.terms: List[str] = []  # sorted vocabulary
+        self.documents: Dict[str, dict] = {}
+        self.doc_terms: Dict[str, Set[str]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, course_id: str, text: Dict[str, Optional[str]], document: dict) -> None:
+        """Index (or re-index) a course; `document` is returned with its hits"""
+        self.remove(course_id)
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.fields.items():
+            for term in tokenize(text.get(field)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+                length += weight
+        for term, frequency in frequencies.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.terms, term)
+            posting[course_id] = frequency
+        self.documents[course_id] = document
+        self.doc_terms[course_id] = set(frequencies)
+        self.doc_lengths[course_id] = length
+        self.total_length += length
+
+    def remove(self, course_id: str) -> None:
+        terms = self.doc_terms.pop(course_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[course_id]
+            if not posting:
+                del self.postings[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+        del self.documents[course_id]
+        self.total_length -= self.doc_lengths.pop(course_id)
+
+    def expand(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with `prefix`, shortest first"""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\uffff", start)
+        matches = self.terms[start:end]
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            matches = heapq.nsmallest(MAX_PREFIX_EXPANSIONS, matches, key=len)
+        return matches
+
+    def _term_scores(self, term: str, weight: float, scores: Dict[str, float]) -> None:
+        posting = self.postings.get(term)
+        if not posting:
+            return
+        count = len(self.documents)
+        idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+        # BM25 with the length normalisation folded into two constants
+        factor = weight * idf * (K1 + 1)
+        base = K1 * (1 - B)
+        per_length = K1 * B * count / self.total_length if self.total_length else 0.0
+        lengths = self.doc_lengths
+        for course_id, frequency in posting.items():
+            score = factor * frequency / (frequency + base + per_length * lengths[course_id])
+            if score > scores.get(course_id, 0.0):
+                scores[course_id] = score
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True,
+               where: Optional[Callable[[dict], bool]] = None) -> Tuple[int, List[Tuple[float, dict]]]:
+        """Return (number of matches, top `limit` (score, document) pairs)"""
+        words = tokenize(query)
+        if not words:
+            return 0, []
+        total: Optional[Dict[str, float]] = None
+        for position, word in enumerate(words):
+            scores: Dict[str, float] = {}
+            self._term_scores(word, 1.0, scores)
+            if prefix and position == len(words) - 1:
+                for term in self.expand(word):
+                    if term != word:
+                        self._term_scores(term, PREFIX_PENALTY, scores)
+            if total is None:
+                total = scores
+            else:
+                total = {course_id: score + scores[course_id]
+                         for course_id, score in total.items() if course_id in scores}
+            if not total:
+                return 0, []
+        matches = ((score, self.documents[course_id]) for course_id, score in total.items())
+        if where is not None:
+            matches = [(score, document) for score, document in matches if where(document)]
+        else:
+            matches = list(matches)
+        top = heapq.nlargest(limit, matches, key=itemgetter(0))
+        return len(matches), top
+
+    def stats(self) -> dict:
+        return {"documents": len(self.documents), "terms": len(self.terms)}
+
+
+class CourseSearch:
+    """Keeps a SearchIndex in step with the courses table.
+
+    The index is loaded in the background at startup (and every
+    `refresh_interval` seconds, to pick up writes made by other workers)
+    and patched in place by this process's own writes. Writes that land
+    while a reload is running are replayed onto the new index before it
+    replaces the old one.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Iterable[Tuple[str, dict, dict]]]],
+                 refresh_interval: float = 300.0, retry_after: float = 5.0):
+        self.loader = loader  # yields (course id, text fields, document) for every course
+        self.refresh_interval = refresh_interval
+        self.retry_after = retry_after
+        self.index = SearchIndex()
+        self.ready = False
+        self.loaded_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.errors = 0
+        self._pending: Optional[List[Tuple[str, Optional[dict], Optional[dict]]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.reload()
+                delay = self.refresh_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                delay = self.retry_after if not self.ready else self.refresh_interval
+                logger.warning("Search index load failed (%s); retrying in %ss", e, delay)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def reload(self) -> None:
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            index = SearchIndex()
+            for count, (course_id, text, document) in enumerate(await self.loader(), 1):
+                index.add(course_id, text, document)
+                if count % 500 == 0:
+                    await asyncio.sleep(0)  # let requests through while indexing
+            for course_id, text, document in self._pending:
+                if text is None:
+                    index.remove(course_id)
+                else:
+                    index.add(course_id, text, document)
+        finally:
+            self._pending = None
+        self.index = index
+        self.ready = True
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - started
+        logger.info("Search index loaded: %s courses, %s terms in %.2fs",
+                    len(index), len(index.terms), self.load_seconds)
+
+    def upsert(self, course_id: str, text: dict, document: dict) -> None:
+        self.index.add(course_id, text, document)
+        if self._pending is not None:
+            self._pending.append((course_id, text, document))
+
+    def remove(self, course_id: str) -> None:
+        self.index.remove(course_id)
+        if self._pending is not None:
+            self._pending.append((course_id, None, None))
+
+    def search(self, query: str, limit: int = 20, tag: Optional[str] = None) -> Tuple[int, List[Tuple[float, dict]]]:
+        where = (lambda record: record.tag == tag) if tag else None
+        return self.index.search(query, limit, where=where)
+
+    def stats(self) -> dict:
+        return {
+            **self.index.stats(),
+            "ready": self.ready,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "errors": self.errors,
+        }
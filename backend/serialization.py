@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+class RowProjector:
+    """Shape upstream rows like a response model without validating them.
+
+    Rows read back from our own Supabase table already have the model's
+    types, so `model_validate` followed by FastAPI re-serializing the model
+    is pure overhead. Projecting onto the model's fields keeps the response
+    shape identical: unknown columns are dropped (extra="ignore") and
+    missing ones get the field default.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.defaults: Dict[str, Any] = {
+            name: None if field.is_required() else field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items()
+        }
+
+    def __call__(self, row: dict) -> dict:
+        return {name: row.get(name, default) for name, default in self.defaults.items()}
+
+    def many(self, rows: List[dict]) -> List[dict]:
+        return [self(row) for row in rows]
+
+
+def json_response(content: Any, response: Response) -> ORJSONResponse:
+    """Serialize `content` with orjson, keeping headers set on the injected `response`.
+
+    Returning a Response bypasses FastAPI's response_model handling, which
+    would otherwise drop the headers of the `response` parameter.
+    """
+    result = ORJSONResponse(content, status_code=response.status_code or 200)
+    result.headers.raw.extend(response.headers.raw)
+    return result
+
+
+def bytes_response(content: bytes, response: Response) -> Response:
+    """Like `json_response`, for a body that is already serialized JSON"""
+    result = Response(content, status_code=response.status_code or 200, media_type="application/json")
+    result.headers.raw.extend(response.headers.raw)
+    return result
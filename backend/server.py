@@ -1,30 +1,70 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.responses import JSONResponse, StreamingResponse
+import asyncio
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
+from typing import List, Optional, Any, Literal, Tuple
+import json
+import math
+import orjson
 import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from urllib.parse import quote
 from datetime import datetime, timezone
-import httpx
+
+from admission import AdmissionControl, AdmissionMiddleware, AdmissionSettings
+from attachments import (FileOperationError, InlineFileMigration, added_blobs, apply_file_operations,
+                         externalize_files, file_metadata)
+from blobstore import BlobNotFound, FilesystemBlobStore
+from bulk import chunked, gather_bounded
+from cache import ReadCache
+from changefeed import ChangeFeed, MongoChangeFeed
+from compression import CompressionMiddleware
+from fake_supabase import FakeSupabase
+from images import MEDIA_TYPES, CoverProcessor, ImageError, image_name
+from jobs import JobQueue, MongoJobQueue
+from lifecycle import Readiness
+import metrics
+from conditional import check_not_modified, content_etag, parse_range, parse_timestamp
+from shared_cache import MongoSharedCache, SharedCache
+from mongo import MongoDatabase
+from progress import ProgressBacklogFull, ProgressStore
+from records import CourseRecord, CourseRecords, extend_object, join_array
+from payloads import BodySizeLimitMiddleware, PayloadLimits, PayloadParser, check_inline_files
+from resilience import BreakerSettings, CircuitBreaker, UpstreamUnavailable
+from search import SEARCH_FIELDS, CourseSearch
+from serialization import RowProjector, bytes_response
+from postgrest import decode_cursor, encode_cursor
+from repository import (AsyncpgCourseRepository, CourseQuery, DatabaseSettings, PolicyViolation,
+                        PostgrestCourseRepository, RepositoryError, StorageUnavailable)
+from supabase_client import PoolSettings, SupabaseClient, env_bool
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection (Motor is imported and connects on first use)
+db = MongoDatabase(os.environ.get('MONGO_URL'), os.environ.get('DB_NAME'))
+
+# Supabase configuration (the hosted project unless overridden)
+SUPABASE_URL = os.environ.get('SUPABASE_URL', "https://chusvhzyqvgxbxudmnsl.supabase.co")
+SUPABASE_KEY = os.environ.get('SUPABASE_KEY', "sb_publishable_K3WeV8ieU_V3yxo1YQtQqg_NiDiXeVN")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the services below (see start_services); stop them in reverse order on shutdown"""
+    async with AsyncExitStack() as stack:
+        await start_services(stack)
+        yield
 
-# Supabase configuration (hardcoded as per requirements)
-SUPABASE_URL = "https://chusvhzyqvgxbxudmnsl.supabase.co"
-SUPABASE_KEY = "sb_publishable_K3WeV8ieU_V3yxo1YQtQqg_NiDiXeVN"
 
 # Create the main app
-app = FastAPI(title="Classroom Interface API")
+app = FastAPI(title="Classroom Interface API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -60,11 +100,116 @@ class CourseUpdate(BaseModel):
     files: Optional[List[dict]] = None
     progress: Optional[int] = None
     tag: Optional[str] = None
+    # Expected row version; when set, the update fails with 409 if it moved on
+    version: Optional[int] = None
+
+
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+    format: str
+    size: int
+
+
+class CoverImage(BaseModel):
+    """Resized renditions of an uploaded cover (POST /courses/{id}/cover).
+
+    `src` is the image_url they were rendered for; clients should ignore the
+    variants once image_url no longer matches it.
+    """
+    src: str
+    width: int
+    height: int
+    placeholder: str  # tiny blurred JPEG data URL
+    variants: List[ImageVariant]
 
 
 class Course(CourseBase):
     model_config = ConfigDict(extra="ignore")
     id: str
+    version: Optional[int] = None
+    image_variants: Optional[CoverImage] = None
+
+
+class CourseSummary(BaseModel):
+    """Card-sized view of a course, without the Base64 file payloads"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    title: str
+    description: Optional[str] = ""
+    image_url: Optional[str] = ""
+    progress: Optional[int] = 0
+    tag: Optional[str] = "AIS+"
+    file_count: int = 0
+    files_size: int = 0
+    image_variants: Optional[CoverImage] = None
+
+
+class SearchHit(CourseSummary):
+    score: float
+
+
+class SearchResults(BaseModel):
+    query: str
+    total: int  # matches before `limit`
+    results: List[SearchHit]
+
+
+class FileMetadata(BaseModel):
+    """Attachment entry kept in `files`; the bytes live in the blob store"""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    type: str
+    size: int
+    sha256: str
+    blob_id: str
+    lastModified: Optional[int] = None
+
+
+class FileOperation(BaseModel):
+    op: Literal["add", "remove", "rename"]
+    id: Optional[str] = None  # remove/rename: target file id
+    name: Optional[str] = None  # rename: new name
+    file: Optional[dict] = None  # add: {name, type, data (Base64), lastModified}
+
+
+class FilesPatch(BaseModel):
+    version: int
+    ops: List[FileOperation]
+
+
+class BulkDelete(BaseModel):
+    ids: List[str]
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: int
+    course: Optional[Course] = None
+    error: Optional[Any] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class ProgressUpdate(BaseModel):
+    """One progress heartbeat from a player or reader"""
+    percent: int = Field(ge=0, le=100)
+    position: Optional[float] = Field(None, ge=0)  # seconds into the current media, if any
+
+
+class CourseProgress(BaseModel):
+    user_id: str
+    course_id: str
+    percent: int = 0  # highest percent reported; never decreases
+    position: Optional[float] = None
+    updated_at: Optional[datetime] = None
 
 
 class RLSErrorResponse(BaseModel):
@@ -74,29 +219,141 @@ class RLSErrorResponse(BaseModel):
     sql_fix: str
 
 
-# Supabase API helper
-async def supabase_request(method: str, endpoint: str, data: dict = None):
-    """Make requests to Supabase REST API"""
-    headers = {
-        "apikey": SUPABASE_KEY,
-        "Authorization": f"Bearer {SUPABASE_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
-    }
-    
-    url = f"{SUPABASE_URL}/rest/v1/{endpoint}"
-    
-    async with httpx.AsyncClient() as client:
-        if method == "GET":
-            response = await client.get(url, headers=headers)
-        elif method == "POST":
-            response = await client.post(url, headers=headers, json=data)
-        elif method == "PATCH":
-            response = await client.patch(url, headers=headers, json=data)
-        elif method == "DELETE":
-            response = await client.delete(url, headers=headers)
-        
-        return response
+# Shared, pooled Supabase client (opened on startup, closed on shutdown).
+# SUPABASE_BACKEND=fake serves the API from an in-memory PostgREST stand-in
+# (see fake_supabase.py) for offline benchmarks and tests.
+if os.environ.get('SUPABASE_BACKEND', 'http') == 'fake':
+    fake_supabase = FakeSupabase.from_env()
+    supabase = SupabaseClient(SUPABASE_URL, SUPABASE_KEY, PoolSettings.from_env(), transport=fake_supabase.transport())
+else:
+    fake_supabase = None
+    supabase = SupabaseClient(SUPABASE_URL, SUPABASE_KEY, PoolSettings.from_env())
+
+
+# Fails fast (503) when Supabase is erroring or slow and caps concurrent calls
+breaker = CircuitBreaker(BreakerSettings.from_env())
+
+# Where course rows live: Supabase's PostgREST API (default), or Postgres
+# directly over an asyncpg pool with COURSE_REPOSITORY=asyncpg and
+# DATABASE_URL (see repository.py). Handlers only talk to `repository`.
+if os.environ.get('COURSE_REPOSITORY', 'postgrest') == 'asyncpg':
+    repository = AsyncpgCourseRepository(DatabaseSettings.from_env(), breaker)
+else:
+    repository = PostgrestCourseRepository(supabase, breaker)
+
+# In-process read cache for course pages and rows (invalidated on writes).
+# Expired entries are kept for COURSE_CACHE_STALE_TTL and served while
+# Supabase is unreachable.
+course_cache = ReadCache(
+    ttl=float(os.environ.get('COURSE_CACHE_TTL', '10')),
+    max_bytes=int(os.environ.get('COURSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    stale_ttl=float(os.environ.get('COURSE_CACHE_STALE_TTL', '300')),
+)
+
+# Read failures that fall back to a stale cached copy
+STALE_ON = (UpstreamUnavailable, StorageUnavailable)
+
+# Cache shared by all workers, checked before going to Supabase
+if os.environ.get('SHARED_CACHE_BACKEND', 'mongo') == 'mongo':
+    shared_cache = MongoSharedCache(db, ttl=float(os.environ.get('SHARED_CACHE_TTL', '60')))
+else:
+    shared_cache = SharedCache()
+
+# Course change events behind /api/courses/stream. The in-memory feed only
+# sees this process's writes; with several workers use
+# CHANGE_FEED_BACKEND=mongo so every worker relays every change.
+CHANGE_FEED_HISTORY = int(os.environ.get('CHANGE_FEED_HISTORY', '1000'))
+CHANGE_FEED_BUFFER = int(os.environ.get('CHANGE_FEED_BUFFER', '256'))
+if os.environ.get('CHANGE_FEED_BACKEND', 'memory') == 'mongo':
+    change_feed = MongoChangeFeed(
+        db,
+        history=CHANGE_FEED_HISTORY,
+        buffer_size=CHANGE_FEED_BUFFER,
+        poll_interval=float(os.environ.get('CHANGE_FEED_POLL_INTERVAL', '0.5')),
+        retention=float(os.environ.get('CHANGE_FEED_RETENTION', '3600')),
+    )
+else:
+    change_feed = ChangeFeed(history=CHANGE_FEED_HISTORY, buffer_size=CHANGE_FEED_BUFFER)
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', '15'))
+SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', '3000'))
+
+# Per-user progress: heartbeats are coalesced in memory and written to Mongo
+# in batches every PROGRESS_FLUSH_INTERVAL seconds, never to the courses row
+progress_store = ProgressStore(
+    db,
+    flush_interval=float(os.environ.get('PROGRESS_FLUSH_INTERVAL', '2')),
+    max_pending=int(os.environ.get('PROGRESS_MAX_PENDING', '5000')),
+    cache_size=int(os.environ.get('PROGRESS_CACHE_SIZE', '50000')),
+)
+
+# Work derived from a course write (change events, blob cleanup) is queued
+# and run in the background once the write succeeded. With Mongo the jobs
+# are stored too (JOB_QUEUE_BACKEND=mongo, the default when MONGO_URL is
+# set), so they survive restarts and a dead worker's jobs are taken over
+job_queue_options = dict(
+    concurrency=int(os.environ.get('JOB_CONCURRENCY', '4')),
+    max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', '5')),
+    backoff=float(os.environ.get('JOB_BACKOFF', '1')),
+    max_backoff=float(os.environ.get('JOB_MAX_BACKOFF', '300')),
+    timeout=float(os.environ.get('JOB_TIMEOUT', '60')),
+)
+if os.environ.get('JOB_QUEUE_BACKEND', 'mongo' if db.url else 'memory') == 'mongo':
+    job_queue = MongoJobQueue(db, retention=float(os.environ.get('JOB_RETENTION', '86400')), **job_queue_options)
+else:
+    job_queue = JobQueue(**job_queue_options)
+
+# Attachment storage (course rows only keep FileMetadata)
+blob_store = FilesystemBlobStore(Path(os.environ.get('BLOB_STORE_DIR', ROOT_DIR / 'blobs')))
+
+# Cover image renditions, stored under their sha256 and served as immutable
+image_store = FilesystemBlobStore(Path(os.environ.get('IMAGE_STORE_DIR', ROOT_DIR / 'images')))
+cover_processor = CoverProcessor(
+    workers=int(os.environ.get('IMAGE_WORKERS', '2')),
+    quality=int(os.environ.get('IMAGE_QUALITY', '80')),
+)
+COVER_MAX_BYTES = int(os.environ.get('COVER_MAX_BYTES', str(20 * 1024 * 1024)))
+
+# Request body/attachment limits; large JSON bodies are parsed (and their
+# Base64 attachments decoded) in worker processes
+payload_limits = PayloadLimits.from_env()
+payload_parser = PayloadParser(payload_limits)
+
+# Per-client token buckets, heavy/read concurrency limits and coalescing of
+# identical concurrent GETs for everything under /api (see admission.py)
+admission = AdmissionControl(AdmissionSettings.from_env())
+
+# Warm-up after startup: pooled connections are opened and the first course
+# pages loaded into the caches before /api/health/ready reports ready, for
+# at most STARTUP_WARMUP_TIMEOUT seconds (see lifecycle.py)
+STARTUP_WARMUP = env_bool('STARTUP_WARMUP', True)
+STARTUP_WARM_CONNECTIONS = int(os.environ.get('STARTUP_WARM_CONNECTIONS', '8'))
+readiness = Readiness(timeout=float(os.environ.get('STARTUP_WARMUP_TIMEOUT', '10')))
+
+# Course rows read back from Supabase are projected onto the response model
+# instead of being validated again; TRUST_UPSTREAM_ROWS=false restores
+# full validation (e.g. while changing the table schema)
+TRUST_UPSTREAM_ROWS = env_bool('TRUST_UPSTREAM_ROWS', True)
+course_rows = RowProjector(Course)
+summary_rows = RowProjector(CourseSummary)
+
+# Cached pages, courses and search hits hold CourseRecords: rows with their
+# summary/full JSON rendered once, so reads join bytes (see records.py)
+course_records = CourseRecords(course_rows, summary_rows)
+
+
+def offloaded_body(model):
+    """Dependency parsing the JSON body into `model` via payload_parser.
+
+    Use with `openapi_extra=body_schema(model)` so the docs still show it.
+    """
+    async def parse(request: Request):
+        return await payload_parser.parse(request, model)
+    return Depends(parse)
+
+
+def body_schema(model) -> dict:
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
 
 
 RLS_FIX_SQL = """
@@ -111,9 +368,29 @@ CREATE TABLE IF NOT EXISTS public.courses (
   content_description TEXT DEFAULT '',
   files JSONB DEFAULT '[]',
   progress INTEGER DEFAULT 0,
-  tag TEXT DEFAULT 'AIS+'
+  tag TEXT DEFAULT 'AIS+',
+  updated_at TIMESTAMPTZ DEFAULT now(),
+  version INTEGER NOT NULL DEFAULT 1
 );
 
+-- Keep updated_at current (used for Last-Modified on course reads) and bump
+-- the row version on every write (optimistic concurrency for edits):
+ALTER TABLE public.courses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now();
+ALTER TABLE public.courses ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION public.courses_touch_updated_at()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at := now();
+  NEW.version := OLD.version + 1;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS courses_touch_updated_at ON public.courses;
+CREATE TRIGGER courses_touch_updated_at BEFORE UPDATE ON public.courses
+  FOR EACH ROW EXECUTE FUNCTION public.courses_touch_updated_at();
+
 -- Enable RLS
 ALTER TABLE public.courses ENABLE ROW LEVEL SECURITY;
 
@@ -138,174 +415,1115 @@ CREATE POLICY "Public update access" ON public.courses
 -- Allow anyone to delete courses (for demo purposes)
 CREATE POLICY "Public delete access" ON public.courses
   FOR DELETE USING (true);
+
+-- Indexes backing keyset pagination and tag filters on GET /api/courses:
+CREATE INDEX IF NOT EXISTS courses_title_id_idx ON public.courses (title, id);
+CREATE INDEX IF NOT EXISTS courses_tag_idx ON public.courses (tag);
+
+-- Resized cover renditions written by POST /api/courses/{id}/cover:
+ALTER TABLE public.courses ADD COLUMN IF NOT EXISTS image_variants JSONB;
+
+-- Computed columns used by the course list summary (GET /api/courses):
+CREATE OR REPLACE FUNCTION public.file_count(public.courses)
+RETURNS INTEGER LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(jsonb_array_length($1.files), 0)
+$$;
+
+CREATE OR REPLACE FUNCTION public.files_size(public.courses)
+RETURNS BIGINT LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(SUM((f->>'size')::BIGINT), 0)
+  FROM jsonb_array_elements(COALESCE($1.files, '[]'::jsonb)) AS f
+$$;
 """
 
 
+# Course list page size (the list endpoint never returns more than the max)
+DEFAULT_PAGE_SIZE = int(os.environ.get('COURSES_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.environ.get('COURSES_MAX_PAGE_SIZE', '200'))
+
+# Bulk endpoints: items per request, rows per upstream call, calls in flight
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '1000'))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '100'))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', '4'))
+
+
+def search_entry(row: dict) -> Tuple[str, dict, CourseRecord]:
+    """(id, searchable text, record) of a course row for the search index"""
+    text = {field: row.get(field) for field in SEARCH_FIELDS}
+    return row["id"], text, course_records.build(row)
+
+
+async def load_search_documents() -> List[Tuple[str, dict, CourseRecord]]:
+    """search_entry for every course, paged by id"""
+    entries = []
+    last_id = None
+    while True:
+        rows = (await repository.scan("search", last_id, SEARCH_LOAD_PAGE_SIZE)).rows
+        entries.extend(search_entry(row) for row in rows)
+        if len(rows) < SEARCH_LOAD_PAGE_SIZE:
+            return entries
+        last_id = rows[-1]["id"]
+
+
+# In-memory full-text index behind /api/courses/search: loaded in the
+# background on startup, patched by this process's writes and reloaded every
+# SEARCH_REFRESH_INTERVAL seconds to pick up other workers' writes
+SEARCH_LOAD_PAGE_SIZE = int(os.environ.get('SEARCH_LOAD_PAGE_SIZE', '1000'))
+course_search = CourseSearch(
+    load_search_documents,
+    refresh_interval=float(os.environ.get('SEARCH_REFRESH_INTERVAL', '300')),
+)
+
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "Classroom Interface API"}
 
 
-@api_router.get("/courses", response_model=List[Course])
-async def get_courses():
-    """Get all courses from Supabase"""
-    try:
-        response = await supabase_request("GET", "courses?select=*")
-        
-        if response.status_code == 200:
-            courses = response.json()
-            return courses
-        elif response.status_code == 404:
-            return []
-        else:
-            error_data = response.json()
-            # Check for RLS error (code 42501)
-            if error_data.get("code") == "42501":
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "RLS Policy Error",
-                        "code": "42501",
-                        "message": "Row Level Security policy violation. The database requires SQL policies to be configured.",
-                        "sql_fix": RLS_FIX_SQL
-                    }
-                )
-            raise HTTPException(status_code=response.status_code, detail=error_data)
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
+@api_router.get("/health/live")
+async def live_health():
+    """Liveness probe: the process is up and its event loop answers"""
+    return {"status": "alive"}
+
+
+@api_router.get("/health/ready", responses={503: {"description": "Warming up or shutting down"}})
+async def ready_health(response: Response):
+    """Readiness probe: 503 until warm-up has finished and again while shutting down"""
+    if not readiness.ready:
+        response.status_code = 503
+    return readiness.stats()
+
+
+@api_router.get("/health/pool")
+async def pool_health():
+    """Connection pool and circuit breaker stats for the course repository"""
+    return {"repository": repository.name, **repository.pool_stats(), "breaker": breaker.stats()}
+
+
+@api_router.get("/health/admission")
+async def admission_health():
+    """Rate limiter, concurrency limit and GET coalescing counters"""
+    return admission.stats()
+
+
+@api_router.get("/health/cache")
+async def cache_health():
+    """Hit/miss/eviction counters for the course read caches"""
+    return {**course_cache.stats(), "shared": shared_cache.stats(), "records": course_records.stats()}
+
+
+@api_router.get(
+    "/courses",
+    response_model=None,
+    responses={200: {"model": List[CourseSummary]}},
+)
+async def get_courses(
+    request: Request,
+    response: Response,
+    view: Literal["summary", "full"] = "summary",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Case-insensitive title substring"),
+    prefix: Optional[str] = Query(None, description="Case-insensitive title prefix"),
+    sort: Literal["title", "id"] = "title",
+    order: Literal["asc", "desc"] = "asc",
+):
+    """Get a page of courses from Supabase.
+
+    Returns card summaries by default; pass `view=full` for complete rows
+    including the Base64 `files` payloads. Pages are keyset-paginated: the
+    `X-Next-Cursor` response header is passed back as `cursor` to fetch the
+    next page, and `X-Total-Count` carries Postgres' row estimate (filtered
+    pages after the first may leave it out).
+    Responses carry an ETag and honour If-None-Match with a 304.
+    """
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, sort, order)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    # One extra row tells us whether another page exists
+    query = CourseQuery(tag=tag, q=q, prefix=prefix, sort=sort, order=order, after=after, limit=limit + 1)
+    page = await load_course_page(view, query, limit)
+
+    if page["total"] is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    # ETag only: a deleted row or one leaving the filter changes the page
+    # without any newer updated_at, so Last-Modified would give stale 304s
+    not_modified = check_not_modified(request, response, page["etag"])
+    if not_modified is not None:
+        return not_modified
+    if not TRUST_UPSTREAM_ROWS:
+        return metrics.validate_rows(Course if view == "full" else CourseSummary,
+                                     [record.row(view) for record in page["records"]])
+    return bytes_response(join_array(record.body(view) for record in page["records"]), response)
+
+
+async def load_course_page(view: str, query: CourseQuery, limit: int) -> dict:
+    """One page of courses through the read caches, its rows as CourseRecords"""
+    key = f"list:{view}:{query.key()}"
+
+    async def load():
+        page, size = await read_through(key, "list", lambda: fetch_course_page(view, query, limit))
+        compact = {name: value for name, value in page.items() if name != "rows"}
+        compact["records"] = course_records.many(page["rows"])
+        return compact, size
+
+    return await course_cache.get_or_load(key, load, stale_on=STALE_ON)
+
+
+async def fetch_course_page(view: str, query: CourseQuery, limit: int) -> Tuple[dict, int]:
+    """Fetch one page of courses; returns (page, upstream bytes)"""
+    result = await repository.list(view, query)
+    courses = result.rows
+    next_cursor = None
+    if len(courses) > limit:
+        courses = courses[:limit]
+        last = courses[-1]
+        next_cursor = encode_cursor(query.sort, query.order, last.get(query.sort), last["id"])
+    page = {
+        "rows": courses,
+        "total": result.total,
+        "next_cursor": next_cursor,
+        # Computed once here and cached with the page
+        "etag": content_etag(result.content),
+    }
+    return page, len(result.content)
+
+
+@api_router.get(
+    "/courses/export",
+    response_model=None,
+    responses={200: {"content": {"application/json": {}, "application/x-ndjson": {}}}},
+)
+async def export_courses(
+    request: Request,
+    view: Literal["summary", "full"] = "summary",
+    format: Optional[Literal["json", "ndjson"]] = None,
+    tag: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Case-insensitive title substring"),
+    prefix: Optional[str] = Query(None, description="Case-insensitive title prefix"),
+    sort: Literal["title", "id"] = "title",
+    order: Literal["asc", "desc"] = "asc",
+):
+    """Stream every matching course as a JSON array or NDJSON.
+
+    Rows are read from the repository as they arrive and each one is
+    serialized and sent on its own, so memory per request does not grow with
+    the size of the catalog. NDJSON is used when `format=ndjson` or the
+    client accepts application/x-ndjson.
+    """
+    if format is None:
+        format = "ndjson" if "application/x-ndjson" in request.headers.get("accept", "") else "json"
+    query = CourseQuery(tag=tag, q=q, prefix=prefix, sort=sort, order=order)
+    model = Course if view == "full" else CourseSummary
+    # Only the exported view is rendered; export rows are seen once, so no CourseRecord is built
+    project = course_rows if view == "full" else summary_rows
+
+    stack = AsyncExitStack()
+    rows = await repository.stream(stack, view, query)
+
+    async def body():
+        separator = b"\n" if format == "ndjson" else b","
+        first = True
+        try:
+            if format == "json":
+                yield b"["
+            async for row in rows:
+                if TRUST_UPSTREAM_ROWS:
+                    item = orjson.dumps(project(row))
+                else:
+                    item = model.model_validate(row).model_dump_json().encode()
+                if format == "ndjson":
+                    yield item + separator
+                else:
+                    yield item if first else separator + item
+                first = False
+            if format == "json":
+                yield b"]"
+        except Exception:
+            # Headers are already sent; the truncated body signals the failure
+            logger.exception("Course export aborted")
+        finally:
+            await stack.aclose()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(body(), media_type=media_type)
+
+
+@api_router.get("/courses/search", response_model=None, responses={200: {"model": SearchResults}})
+async def search_courses(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    tag: Optional[str] = None,
+):
+    """Ranked full-text search over title, description and content description.
+
+    Served from the in-memory index in search.py without calling Supabase.
+    Every word must match; the last one also matches as a prefix, so the
+    endpoint can back a typeahead. Returns 503 until the index has loaded.
+    """
+    if not course_search.ready:
+        raise HTTPException(status_code=503, detail="Search index is loading", headers={"Retry-After": "1"})
+    total, hits = course_search.search(q, limit, tag)
+    results = join_array(extend_object(record.summary, {"score": round(score, 4)}) for score, record in hits)
+    envelope = json.dumps({"query": q, "total": total}, separators=(",", ":")).encode()
+    return bytes_response(envelope[:-1] + b',"results":' + results + b"}", response)
+
+
+@api_router.get("/courses/stream", response_class=StreamingResponse)
+async def stream_course_changes(
+    request: Request,
+    last_event_id: Optional[str] = Query(None, description="Resume point, for clients that cannot send Last-Event-ID"),
+):
+    """Server-Sent Events feed of course changes.
+
+    Emits `created` and `updated` events carrying the course summary and
+    `deleted` events as writes happen, so dashboards can patch their list
+    instead of re-fetching it. Reconnecting clients resume after the
+    `Last-Event-ID` header. When that point is gone, or a client falls more
+    than CHANGE_FEED_BUFFER events behind, a `reset` event tells it to
+    reload the list.
+    """
+    resume = request.headers.get("last-event-id") or last_event_id
+    subscription = await change_feed.subscribe(
+        None if resume is None else int(resume) if resume.isdigit() else -1)
+
+    async def events():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                batch = await subscription.wait(SSE_HEARTBEAT)
+                if subscription.lagged:
+                    subscription.reset(change_feed.last_id)
+                    yield f"id: {change_feed.last_id}\nevent: reset\ndata: {{}}\n\n"
+                elif batch:
+                    yield "".join(event.encode() for event in batch)
+                else:
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ": ping\n\n"
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @api_router.get("/courses/{course_id}", response_model=Course)
-async def get_course(course_id: str):
+async def get_course(course_id: str, request: Request, response: Response):
     """Get a single course by ID"""
-    try:
-        response = await supabase_request("GET", f"courses?id=eq.{course_id}&select=*")
-        
-        if response.status_code == 200:
-            courses = response.json()
-            if courses:
-                return courses[0]
-            raise HTTPException(status_code=404, detail="Course not found")
-        else:
-            error_data = response.json()
-            if error_data.get("code") == "42501":
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "RLS Policy Error",
-                        "code": "42501",
-                        "message": "Row Level Security policy violation.",
-                        "sql_fix": RLS_FIX_SQL
-                    }
-                )
-            raise HTTPException(status_code=response.status_code, detail=error_data)
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
-
-
-@api_router.post("/courses", response_model=Course)
-async def create_course(course: CourseCreate):
+    cached = await load_course(course_id)
+    record = cached["record"]
+    not_modified = check_not_modified(request, response, cached["etag"], parse_timestamp(record.updated_at))
+    if not_modified is not None:
+        return not_modified
+    if TRUST_UPSTREAM_ROWS:
+        return bytes_response(record.body("full"), response)
+    return record.row()
+
+
+async def load_course(course_id: str) -> dict:
+    """Cached {record, etag} for a course; raises 404 if it does not exist"""
+    key = f"course:{course_id}"
+
+    async def load():
+        cached, size = await read_through(key, key, lambda: fetch_course(course_id))
+        return {"record": course_records.build(cached["row"]), "etag": cached["etag"]}, size
+
+    return await course_cache.get_or_load(key, load, stale_on=STALE_ON)
+
+
+async def fetch_course(course_id: str) -> Tuple[dict, int]:
+    """Fetch one full course row; returns ({row, etag}, upstream bytes)"""
+    result = await repository.get(course_id)
+    if not result.rows:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return {"row": result.rows[0], "etag": content_etag(result.content)}, len(result.content)
+
+
+async def read_through(key: str, scope: str, loader) -> Tuple[Any, int]:
+    """Serve from the shared cache, falling back to `loader` (the repository)"""
+    value, size, version = await shared_cache.lookup(key, scope)
+    if value is not None:
+        return value, size
+    value, size = await loader()
+    await shared_cache.store(key, value, version)
+    return value, size
+
+
+async def cache_course_write(course_id: str, row: Optional[dict] = None, content: bytes = b"",
+                             change: str = "updated") -> None:
+    """Write-through after a mutation: refresh the row, drop every list page
+    and publish a `change` event to the course stream.
+
+    `content` is the upstream representation the row was parsed from; it
+    sizes the cache entry and seeds its ETag.
+    """
+    key = f"course:{course_id}"
+    course_cache.invalidate_prefix("list:")
+    cached = None
+    if row is not None:
+        cached = {"row": row, "etag": content_etag(content)}
+        course_cache.set(key, {"record": course_records.build(row), "etag": cached["etag"]}, len(content))
+    else:
+        course_cache.invalidate(key)
+    versions = await shared_cache.bump(["list", key])
+    if cached is not None and key in versions:
+        await shared_cache.store(key, cached, versions[key])
+    await publish_change(change, course_id, row)
+
+
+def index_change(change: str, course_id: str, row: Optional[dict] = None) -> Tuple[dict, Optional[str]]:
+    """Apply a write to the search index; returns the /api/courses/stream
+    event for it and that event's idempotency key. created/updated events
+    carry the course summary when the row is known"""
+    data = None
+    key = f"course.publish:{course_id}:deleted" if change == "deleted" else None
+    if change == "deleted":
+        course_search.remove(course_id)
+    elif row is not None:
+        course_id, text, record = search_entry(row)
+        course_search.upsert(course_id, text, record)
+        data = record.row("summary")
+        if record.version is not None:
+            key = f"course.publish:{course_id}:{record.version}"
+    return {"change": change, "course_id": course_id, "data": data}, key
+
+
+async def publish_change(change: str, course_id: str, row: Optional[dict] = None) -> None:
+    """Index one write and queue its stream event"""
+    event, key = index_change(change, course_id, row)
+    await job_queue.enqueue("course.publish", {"events": [event]}, key=key)
+
+
+async def publish_changes_job(payload: dict) -> None:
+    events = payload["events"]
+    # A retry in this worker resumes after the events already published
+    start = payload.get("published", 0)
+    for n, event in enumerate(events[start:], start):
+        await change_feed.publish(event["change"], event["course_id"], event["data"])
+        payload["published"] = n + 1
+
+
+def stored_blob_ids(rows: List[dict]) -> List[str]:
+    """Blob store ids of the attachments of `rows` (deleted rows come back with their files)"""
+    return [file["blob_id"] for row in rows for file in row.get("files") or []
+            if isinstance(file, dict) and file.get("blob_id")]
+
+
+async def delete_blobs_job(payload: dict) -> None:
+    for blob_id in payload["blob_ids"]:
+        await blob_store.delete(blob_id)
+
+
+async def discard_blobs(blob_ids: List[str], error: Optional[Exception] = None) -> None:
+    """Queue deletion of the blobs stored for a write that was not applied.
+
+    Kept after StorageUnavailable: without an answer from the database the
+    write may have landed, and its row would refer to them.
+    """
+    if blob_ids and not isinstance(error, StorageUnavailable):
+        await job_queue.enqueue("blobs.delete", {"blob_ids": blob_ids})
+
+
+# Stream events keep the order of the writes: while a publish waits for its
+# retry, the events after it wait too
+job_queue.register("course.publish", publish_changes_job, ordered=True)
+job_queue.register("blobs.delete", delete_blobs_job)
+
+
+async def prepare_new_course(course: CourseCreate) -> dict:
+    """Row to insert for a new course: fresh id, placeholder image, stored files"""
+    course_data = course.model_dump()
+    course_data["id"] = str(uuid.uuid4())
+    course_data["files"] = await store_inline_files(course_data.get("files"))
+
+    # Use random placeholder if no image provided
+    if not course_data.get("image_url"):
+        course_data["image_url"] = f"https://picsum.photos/seed/{course_data['id'][:8]}/800/450"
+    return course_data
+
+
+async def cache_bulk_write(rows: List[dict], deleted_ids: List[str] = (), change: str = "updated") -> None:
+    """cache_course_write for many rows, with one shared-cache round trip and
+    one queued job for all their stream events"""
+    course_cache.invalidate_prefix("list:")
+    for row in rows:
+        content = json.dumps(row, separators=(",", ":")).encode()
+        course_cache.set(f"course:{row['id']}", {"record": course_records.build(row), "etag": content_etag(content)},
+                         len(content))
+    for course_id in deleted_ids:
+        course_cache.invalidate(f"course:{course_id}")
+    await shared_cache.bump_many(["list", *(f"course:{row['id']}" for row in rows),
+                                  *(f"course:{course_id}" for course_id in deleted_ids)])
+    events = [index_change(change, row["id"], row)[0] for row in rows]
+    events += [index_change("deleted", course_id)[0] for course_id in deleted_ids]
+    if events:
+        await job_queue.enqueue("course.publish", {"events": events})
+
+
+@api_router.post("/courses", response_model=Course, openapi_extra=body_schema(CourseCreate))
+async def create_course(course: CourseCreate = offloaded_body(CourseCreate)):
     """Create a new course"""
+    course_data = await prepare_new_course(course)
     try:
-        course_data = course.model_dump()
-        course_data["id"] = str(uuid.uuid4())
-        
-        # Use random placeholder if no image provided
-        if not course_data.get("image_url"):
-            course_data["image_url"] = f"https://picsum.photos/seed/{course_data['id'][:8]}/800/450"
-        
-        response = await supabase_request("POST", "courses", course_data)
-        
-        if response.status_code in [200, 201]:
-            created_courses = response.json()
-            if created_courses:
-                return created_courses[0]
-            return course_data
-        else:
-            error_data = response.json()
-            if error_data.get("code") == "42501":
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "RLS Policy Error",
-                        "code": "42501",
-                        "message": "Row Level Security policy violation. Cannot create course.",
-                        "sql_fix": RLS_FIX_SQL
-                    }
-                )
-            raise HTTPException(status_code=response.status_code, detail=error_data)
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
-
-
-@api_router.put("/courses/{course_id}", response_model=Course)
-async def update_course(course_id: str, course: CourseUpdate):
+        result = await repository.insert([course_data])
+    except Exception as e:
+        await discard_blobs(added_blobs(course.files or [], course_data["files"]), e)
+        raise
+    if result.rows:
+        await cache_course_write(course_data["id"], result.rows[0], result.content, change="created")
+        return result.rows[0]
+    await cache_course_write(course_data["id"], change="created")
+    return course_data
+
+
+@api_router.put("/courses/{course_id}", response_model=Course, openapi_extra=body_schema(CourseUpdate))
+async def update_course(course_id: str, course: CourseUpdate = offloaded_body(CourseUpdate)):
     """Update a course"""
+    # Filter out None values
+    update_data = {k: v for k, v in course.model_dump().items() if v is not None}
+    expected_version = update_data.pop("version", None)
+    stored = []
+    previous = None
+    if "files" in update_data:
+        # The attachments being replaced, whose blobs are deleted after the update
+        previous = await fetch_course_files(course_id)
+        update_data["files"] = await store_inline_files(update_data["files"])
+        stored = added_blobs(course.files, update_data["files"])
+
     try:
-        # Filter out None values
-        update_data = {k: v for k, v in course.model_dump().items() if v is not None}
-        
-        response = await supabase_request("PATCH", f"courses?id=eq.{course_id}", update_data)
-        
-        if response.status_code == 200:
-            updated_courses = response.json()
-            if updated_courses:
-                return updated_courses[0]
-            raise HTTPException(status_code=404, detail="Course not found")
-        else:
-            error_data = response.json()
-            if error_data.get("code") == "42501":
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "RLS Policy Error",
-                        "code": "42501",
-                        "message": "Row Level Security policy violation. Cannot update course.",
-                        "sql_fix": RLS_FIX_SQL
-                    }
-                )
-            raise HTTPException(status_code=response.status_code, detail=error_data)
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
+        result = await repository.update([course_id], update_data, expected_version)
+    except Exception as e:
+        await discard_blobs(stored, e)
+        raise
+    if result.rows:
+        row = result.rows[0]
+        await cache_course_write(course_id, row, result.content)
+        # Only when no other write came in between, which could still refer to them
+        if previous is not None and row.get("version") == previous.get("version", 0) + 1:
+            kept = set(stored_blob_ids([row]))
+            replaced = [blob_id for blob_id in stored_blob_ids([previous]) if blob_id not in kept]
+            if replaced:
+                await job_queue.enqueue("blobs.delete", {"blob_ids": replaced})
+        return row
+    await discard_blobs(stored)
+    if expected_version is not None:
+        await raise_version_conflict(course_id)
+    raise HTTPException(status_code=404, detail="Course not found")
 
 
 @api_router.delete("/courses/{course_id}")
 async def delete_course(course_id: str):
     """Delete a course"""
+    result = await repository.delete([course_id])
+    await cache_course_write(course_id, change="deleted")
+    blob_ids = stored_blob_ids(result.rows)
+    if blob_ids:
+        await job_queue.enqueue("blobs.delete", {"blob_ids": blob_ids}, key=f"blobs.delete:{course_id}")
+    return {"message": "Course deleted successfully"}
+
+
+def bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    results.sort(key=lambda r: r.index)
+    succeeded = sum(1 for r in results if r.status < 400)
+    return BulkResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+def check_bulk_size(items: list) -> None:
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+
+
+@api_router.post("/courses/bulk", response_model=BulkResult)
+async def bulk_create_courses(items: List[Any]):
+    """Create many courses with one repository insert per chunk.
+
+    Items are validated individually, so invalid ones are reported without
+    failing the rest of the batch.
+    """
+    check_bulk_size(items)
+    results: List[BulkItemResult] = []
+    written: List[dict] = []
+    stored = {}  # index -> blob ids stored for the item's attachments
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, CourseCreate.model_validate(item)))
+        except ValidationError as e:
+            results.append(BulkItemResult(index=index, status=422, error=e.errors(include_url=False)))
+
+    async def prepare(entry):
+        index, course = entry
+        try:
+            row = await prepare_new_course(course)
+        except HTTPException as e:
+            results.append(BulkItemResult(index=index, status=e.status_code, error=e.detail))
+            return None
+        stored[index] = added_blobs(course.files or [], row["files"])
+        return index, row
+
+    prepared = [p for p in await gather_bounded(valid, prepare, BULK_CONCURRENCY) if p is not None]
+
+    async def insert(chunk):
+        try:
+            result = await repository.insert([row for _, row in chunk])
+        except (RepositoryError, UpstreamUnavailable) as e:
+            await discard_blobs([blob_id for i, _ in chunk for blob_id in stored[i]], e)
+            if isinstance(e, UpstreamUnavailable):
+                raise
+            return [BulkItemResult(index=i, id=row["id"], status=e.status_code, error=e.detail)
+                    for i, row in chunk]
+        written.extend(result.rows)
+        created = {row["id"]: row for row in result.rows}
+        return [BulkItemResult(index=i, id=row["id"], status=201, course=created.get(row["id"], row))
+                for i, row in chunk]
+
+    for chunk_results in await gather_bounded(chunked(prepared, BULK_CHUNK_SIZE), insert, BULK_CONCURRENCY):
+        results.extend(chunk_results)
+    # Cached as the database returned them, with their updated_at and version
+    await cache_bulk_write(written, change="created")
+    return bulk_result(results)
+
+
+@api_router.patch("/courses/bulk", response_model=BulkResult)
+async def bulk_update_courses(items: List[Any]):
+    """Update many courses; each item is a CourseUpdate plus its `id`.
+
+    Items carrying the same changes (and expected version) are sent as one
+    repository update, so uniform edits cost a single round trip.
+    """
+    check_bulk_size(items)
+    results: List[BulkItemResult] = []
+    written: List[dict] = []
+    stored = {}  # index -> blob ids stored for the item's attachments
+    groups = {}
+    for index, item in enumerate(items):
+        course_id = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(course_id, str) or not course_id:
+            results.append(BulkItemResult(index=index, status=422, error="Each item needs a string id"))
+            continue
+        try:
+            update = CourseUpdate.model_validate({k: v for k, v in item.items() if k != "id"})
+        except ValidationError as e:
+            results.append(BulkItemResult(index=index, id=course_id, status=422, error=e.errors(include_url=False)))
+            continue
+        update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+        if "files" in update_data:
+            try:
+                update_data["files"] = await store_inline_files(update_data["files"])
+            except HTTPException as e:
+                results.append(BulkItemResult(index=index, id=course_id, status=e.status_code, error=e.detail))
+                continue
+            stored[index] = added_blobs(update.files, update_data["files"])
+        key = json.dumps(update_data, sort_keys=True, separators=(",", ":"))
+        groups.setdefault(key, []).append((index, course_id))
+
+    batches = [(json.loads(key), chunk) for key, members in groups.items()
+               for chunk in chunked(members, BULK_CHUNK_SIZE)]
+
+    async def update(batch):
+        update_data, chunk = batch
+        expected_version = update_data.pop("version", None)
+        try:
+            result = await repository.update([course_id for _, course_id in chunk], update_data, expected_version)
+        except (RepositoryError, UpstreamUnavailable) as e:
+            await discard_blobs([blob_id for i, _ in chunk for blob_id in stored.get(i, ())], e)
+            if isinstance(e, UpstreamUnavailable):
+                raise
+            return [BulkItemResult(index=i, id=course_id, status=e.status_code, error=e.detail)
+                    for i, course_id in chunk]
+        written.extend(result.rows)
+        updated = {row["id"]: row for row in result.rows}
+        await discard_blobs([blob_id for i, course_id in chunk if course_id not in updated
+                             for blob_id in stored.get(i, ())])
+        missing = 409 if expected_version is not None else 404
+        return [
+            BulkItemResult(index=i, id=course_id, status=200, course=updated[course_id])
+            if course_id in updated else
+            BulkItemResult(index=i, id=course_id, status=missing,
+                           error="Version conflict or course not found" if missing == 409 else "Course not found")
+            for i, course_id in chunk
+        ]
+
+    for batch_results in await gather_bounded(batches, update, BULK_CONCURRENCY):
+        results.extend(batch_results)
+    await cache_bulk_write(written)
+    return bulk_result(results)
+
+
+@api_router.post("/courses/bulk/delete", response_model=BulkResult)
+async def bulk_delete_courses(request: BulkDelete):
+    """Delete many courses with one repository delete per chunk"""
+    check_bulk_size(request.ids)
+    indexed = list(enumerate(request.ids))
+    blob_ids: List[str] = []
+
+    async def delete(chunk):
+        try:
+            result = await repository.delete([course_id for _, course_id in chunk])
+        except RepositoryError as e:
+            return [BulkItemResult(index=i, id=course_id, status=e.status_code, error=e.detail)
+                    for i, course_id in chunk]
+        deleted = {row["id"]: row for row in result.rows}
+        blob_ids.extend(stored_blob_ids(result.rows))
+        return [
+            BulkItemResult(index=i, id=course_id, status=200)
+            if course_id in deleted else
+            BulkItemResult(index=i, id=course_id, status=404, error="Course not found")
+            for i, course_id in chunk
+        ]
+
+    results: List[BulkItemResult] = []
+    for chunk_results in await gather_bounded(chunked(indexed, BULK_CHUNK_SIZE), delete, BULK_CONCURRENCY):
+        results.extend(chunk_results)
+    await cache_bulk_write([], [r.id for r in results if r.status == 200])
+    if blob_ids:
+        await job_queue.enqueue("blobs.delete", {"blob_ids": blob_ids})
+    return bulk_result(results)
+
+
+async def store_inline_files(files: Optional[List[dict]]) -> List[dict]:
+    """Move Base64 attachments sent by clients into the blob store"""
+    check_inline_files(files, payload_limits)
     try:
-        response = await supabase_request("DELETE", f"courses?id=eq.{course_id}")
-        
-        if response.status_code in [200, 204]:
-            return {"message": "Course deleted successfully"}
-        else:
-            error_data = response.json()
-            if error_data.get("code") == "42501":
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        "error": "RLS Policy Error",
-                        "code": "42501",
-                        "message": "Row Level Security policy violation. Cannot delete course.",
-                        "sql_fix": RLS_FIX_SQL
-                    }
-                )
-            raise HTTPException(status_code=response.status_code, detail=error_data)
-    except httpx.RequestError as e:
-        raise HTTPException(status_code=500, detail=f"Connection error: {str(e)}")
+        files, _ = await externalize_files(blob_store, files)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return files
+
+
+async def fetch_course_files(course_id: str) -> dict:
+    """Fresh {id, version, files} for a course, bypassing the caches"""
+    result = await repository.get(course_id, view="files")
+    if result.rows:
+        return result.rows[0]
+    raise HTTPException(status_code=404, detail="Course not found")
+
+
+def version_conflict(current_version: Optional[int]) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={
+            "error": "Version conflict",
+            "message": "The course was modified by someone else. Reload it and retry.",
+            "current_version": current_version,
+        },
+    )
+
+
+async def raise_version_conflict(course_id: str):
+    """Explain why a version-guarded write matched no rows (409 or 404)"""
+    current = await fetch_course_files(course_id)
+    raise version_conflict(current.get("version"))
+
+
+async def save_course_files(course_id: str, files: List[dict], version: Optional[int] = None) -> dict:
+    """Replace a course's attachment metadata; returns the updated row.
+
+    With `version`, the write only applies if the row is still at that
+    version and raises 409 otherwise.
+    """
+    result = await repository.update([course_id], {"files": files}, version)
+    if result.rows:
+        await cache_course_write(course_id, result.rows[0], result.content)
+        return result.rows[0]
+    if version is not None:
+        await raise_version_conflict(course_id)
+    raise HTTPException(status_code=404, detail="Course not found")
+
+
+# Server-side retries for file edits that commute (append/remove by id)
+FILE_WRITE_ATTEMPTS = 3
+
+
+async def update_course_files(course_id: str, change) -> dict:
+    """Apply `change(files) -> files` with optimistic concurrency, retrying conflicts"""
+    for attempt in range(FILE_WRITE_ATTEMPTS):
+        current = await fetch_course_files(course_id)
+        try:
+            return await save_course_files(course_id, change(current.get("files") or []), current.get("version"))
+        except HTTPException as e:
+            if e.status_code != 409 or attempt == FILE_WRITE_ATTEMPTS - 1:
+                raise
+
+
+async def read_upload(upload: UploadFile):
+    while chunk := await upload.read(blob_store.chunk_size):
+        yield chunk
+
+
+def find_file(course: dict, file_id: str) -> dict:
+    for file in course.get("files") or []:
+        if isinstance(file, dict) and file.get("id") == file_id:
+            return file
+    raise HTTPException(status_code=404, detail="File not found")
+
+
+@api_router.post("/courses/{course_id}/files", response_model=FileMetadata)
+async def upload_course_file(course_id: str, file: UploadFile = File(...)):
+    """Upload one attachment (multipart) and add it to the course"""
+    payload_limits.check_file(file.filename, file.content_type, file.size or 0)
+    await fetch_course_files(course_id)
+    info = await blob_store.write(read_upload(file))
+    metadata = file_metadata(
+        {"name": file.filename, "type": file.content_type},
+        info.blob_id, info.size, info.sha256,
+    )
+    try:
+        await update_course_files(course_id, lambda files: [*files, metadata])
+    except Exception:
+        await blob_store.delete(info.blob_id)
+        raise
+    return metadata
+
+
+async def read_limited(upload: UploadFile, limit: int) -> bytes:
+    """Read an upload into memory, failing with 413 past `limit` bytes"""
+    data = bytearray()
+    while chunk := await upload.read(1024 * 1024):
+        data += chunk
+        if len(data) > limit:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+    return bytes(data)
+
+
+@api_router.post("/courses/{course_id}/cover", response_model=Course)
+async def upload_course_cover(course_id: str, file: UploadFile = File(...)):
+    """Upload a cover image; stores resized WebP/JPEG variants and a blur
+    placeholder, and points image_url at the largest JPEG"""
+    await load_course(course_id)
+    data = await read_limited(file, COVER_MAX_BYTES)
+    try:
+        rendered = await cover_processor.render(data)
+    except ImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    variants = []
+    for variant in rendered["variants"]:
+        await image_store.put(variant["sha256"], variant["content"])
+        variants.append(ImageVariant(
+            url=f"/api/images/{image_name(variant)}",
+            width=variant["width"],
+            height=variant["height"],
+            format=variant["format"],
+            size=len(variant["content"]),
+        ))
+    src = max((v for v in variants if v.format == "jpg"), key=lambda v: v.width).url
+    cover = CoverImage(
+        src=src,
+        width=rendered["width"],
+        height=rendered["height"],
+        placeholder=rendered["placeholder"],
+        variants=variants,
+    )
+
+    result = await repository.update([course_id], {"image_url": src, "image_variants": cover.model_dump()})
+    if not result.rows:
+        raise HTTPException(status_code=404, detail="Course not found")
+    await cache_course_write(course_id, result.rows[0], result.content)
+    return result.rows[0]
+
+
+@api_router.get("/images/{name}")
+async def get_image(name: str, request: Request):
+    """Serve a cover rendition; names are content hashes, so never stale"""
+    digest, _, ext = name.partition(".")
+    if ext not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    try:
+        size = await image_store.size(digest)
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(image_store.read(digest), media_type=MEDIA_TYPES[ext], headers=headers)
+
+
+@api_router.get("/courses/{course_id}/files/{file_id}")
+async def download_course_file(course_id: str, file_id: str, request: Request):
+    """Stream an attachment, honouring single-range Range requests"""
+    file = find_file((await load_course(course_id))["record"].row(), file_id)
+    if not file.get("blob_id"):
+        raise HTTPException(status_code=404, detail="File has not been migrated to the blob store yet")
+    try:
+        size = await blob_store.size(file["blob_id"])
+    except BlobNotFound:
+        raise HTTPException(status_code=404, detail="File content not found")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(file.get('name') or 'file')}",
+        "Cache-Control": "private, max-age=3600",
+    }
+    if file.get("sha256"):
+        headers["ETag"] = f'"{file["sha256"]}"'
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1 if size else 0)
+    return StreamingResponse(
+        blob_store.read(file["blob_id"], start, end),
+        status_code=status_code,
+        media_type=file.get("type") or "application/octet-stream",
+        headers=headers,
+    )
+
+
+@api_router.delete("/courses/{course_id}/files/{file_id}")
+async def delete_course_file(course_id: str, file_id: str):
+    """Remove an attachment from the course and delete its content"""
+    file = find_file(await fetch_course_files(course_id), file_id)
+    await update_course_files(course_id, lambda files: [f for f in files if f.get("id") != file_id])
+    if file.get("blob_id"):
+        await blob_store.delete(file["blob_id"])
+    return {"message": "File deleted successfully"}
+
+
+@api_router.patch("/courses/{course_id}/files", response_model=Course, openapi_extra=body_schema(FilesPatch))
+async def patch_course_files(course_id: str, patch: FilesPatch = offloaded_body(FilesPatch)):
+    """Add, remove or rename individual attachments.
+
+    Only the changed file is sent by the client, and only the metadata array
+    is written upstream. `version` must match the course's current version,
+    otherwise nothing is applied and 409 is returned.
+    """
+    check_inline_files([op.file for op in patch.ops if op.file], payload_limits)
+    current = await fetch_course_files(course_id)
+    if current.get("version") != patch.version:
+        raise version_conflict(current.get("version"))
+
+    before = current.get("files") or []
+    try:
+        files, removed = await apply_file_operations(blob_store, before, [op.model_dump() for op in patch.ops])
+    except FileOperationError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    try:
+        row = await save_course_files(course_id, files, patch.version)
+    except BaseException as e:
+        # Also covers losing the version race to another writer (409)
+        await discard_blobs(added_blobs(before, files), e)
+        raise
+    for blob_id in removed:
+        await blob_store.delete(blob_id)
+    return row
+
+
+async def fetch_migration_page(after_id: Optional[str]) -> List[dict]:
+    return (await repository.scan("files", after_id, 20)).rows
+
+
+inline_file_migration = InlineFileMigration(
+    blob_store,
+    fetch_page=fetch_migration_page,
+    save_files=save_course_files,
+)
+
+
+@api_router.put("/progress/{user_id}/{course_id}", response_model=CourseProgress)
+async def record_progress(user_id: str, course_id: str, update: ProgressUpdate):
+    """Record a progress heartbeat for one user and course.
+
+    Buffered in memory and flushed to Mongo in batches, so frequent
+    heartbeats are cheap; `percent` only ever moves forward. 503 with
+    Retry-After while PROGRESS_MAX_PENDING records wait for Mongo.
+    """
+    try:
+        return await progress_store.record(user_id, course_id, update.percent, update.position)
+    except ProgressBacklogFull as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
+@api_router.get("/progress/{user_id}/{course_id}", response_model=CourseProgress)
+async def get_progress(user_id: str, course_id: str):
+    """A user's progress in one course (zero if nothing was recorded)"""
+    try:
+        return await progress_store.get(user_id, course_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Progress store unavailable: {e}")
+
+
+@api_router.get("/progress/{user_id}", response_model=List[CourseProgress])
+async def list_progress(user_id: str):
+    """All of a user's course progress, most recently updated first"""
+    try:
+        return await progress_store.for_user(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Progress store unavailable: {e}")
+
+
+@api_router.post("/admin/migrations/inline-files")
+async def start_inline_file_migration():
+    """Start moving legacy Base64 attachments into the blob store"""
+    inline_file_migration.start()
+    return inline_file_migration.status()
+
+
+@api_router.get("/admin/migrations/inline-files")
+async def inline_file_migration_status():
+    return inline_file_migration.status()
+
+
+@api_router.get("/admin/jobs")
+async def job_queue_status(limit: int = Query(20, ge=0, le=1000)):
+    """Background job queue depth and counters, with the latest dead letters"""
+    return {**job_queue.stats(), "dead_letters": await job_queue.dead_letters(limit)}
+
+
+@api_router.post("/admin/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Queue a dead-lettered job again"""
+    try:
+        job = await job_queue.retry(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Job store unavailable: {e}")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Dead-lettered job not found")
+    return job.describe()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, upstream and cache metrics"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+POOL_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "supabase_pool", "Supabase client pool state (see /api/health/pool)", ("stat",)))
+CACHE_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "course_cache", "Course read cache counters (see /api/health/cache)", ("stat",)))
+BREAKER_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "supabase_breaker", "Supabase circuit breaker state and counters (open=1 when failing fast)", ("stat",)))
+CHANGE_FEED_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "course_change_feed", "Course change feed subscribers and counters", ("stat",)))
+SEARCH_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "course_search_index", "Search index size and state (ready=1 once loaded)", ("stat",)))
+PROGRESS_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "course_progress", "Progress write-behind buffer, flushes and hot cache counters", ("stat",)))
+ADMISSION_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "api_admission", "Requests rate limited, shed and coalesced, and concurrency slots in use", ("class", "stat")))
+JOB_QUEUE_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "job_queue", "Background jobs queued, running and dead-lettered, and their counters", ("kind", "stat")))
+STARTUP_GAUGE = metrics.REGISTRY.register(metrics.Gauge(
+    "api_startup", "Readiness (ready=1) and seconds taken by each warm-up step", ("step", "stat")))
+
+
+def collect_runtime_gauges() -> None:
+    pool = repository.pool_stats()
+    for stat in ("connections", "idle_connections", "in_flight", "peak_in_flight",
+                 "requests_total", "retries_total", "errors_total"):
+        POOL_GAUGE.set(stat, value=pool[stat])
+    for stat, value in course_cache.stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            CACHE_GAUGE.set(stat, value=value)
+    breaker_stats = breaker.stats()
+    BREAKER_GAUGE.set("open", value=int(breaker_stats["state"] != "closed"))
+    for stat in ("in_flight", "trips_total", "rejected_total", "busy_total", "hedges_total", "hedge_wins_total"):
+        BREAKER_GAUGE.set(stat, value=breaker_stats[stat])
+    for stat, value in change_feed.stats().items():
+        if isinstance(value, int):
+            CHANGE_FEED_GAUGE.set(stat, value=value)
+    for stat, value in course_search.stats().items():
+        if isinstance(value, (int, float)):
+            SEARCH_GAUGE.set(stat, value=float(value))
+    for stat, value in progress_store.stats().items():
+        PROGRESS_GAUGE.set(stat, value=value)
+    admission_stats = admission.stats()
+    for stat in ("clients", "rate_limited_total", "coalescing", "coalesced_total"):
+        ADMISSION_GAUGE.set("all", stat, value=admission_stats[stat])
+    for limit in ("heavy", "read"):
+        for stat, value in admission_stats[limit].items():
+            ADMISSION_GAUGE.set(limit, stat, value=value)
+    job_stats = job_queue.stats()
+    for stat, value in job_stats.items():
+        if isinstance(value, (int, float)):
+            JOB_QUEUE_GAUGE.set("all", stat, value=value)
+    for kind, kind_stats in job_stats["kinds"].items():
+        for stat, value in kind_stats.items():
+            JOB_QUEUE_GAUGE.set(kind, stat, value=value)
+    STARTUP_GAUGE.set("all", "ready", value=int(readiness.ready))
+    if readiness.ready_seconds is not None:
+        STARTUP_GAUGE.set("all", "seconds", value=readiness.ready_seconds)
+    for step, result in readiness.steps.items():
+        if result["seconds"] is not None:
+            STARTUP_GAUGE.set(step, "seconds", value=result["seconds"])
+            STARTUP_GAUGE.set(step, "ok", value=int(bool(result["ok"])))
+
+
+metrics.REGISTRY.add_collector(collect_runtime_gauges)
+
+
+@app.exception_handler(PolicyViolation)
+async def policy_violation_handler(request: Request, exc: PolicyViolation):
+    """Row Level Security denials, from any handler or repository"""
+    return JSONResponse(
+        status_code=403,
+        content={"detail": {
+            "error": "RLS Policy Error",
+            "code": "42501",
+            "message": f"Row Level Security policy violation. Cannot {exc.action}.",
+            "sql_fix": RLS_FIX_SQL,
+        }},
+    )
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """Breaker open or concurrency limit reached: tell clients when to retry"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
 
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Innermost: CORS headers still go on 429/503 answers, and coalesced GETs
+# are compressed per client by the middleware below
+app.add_middleware(AdmissionMiddleware, control=admission)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Last-Modified", "Retry-After"],
+)
+
+# Negotiated zstd/br/gzip (zstd and br when their libraries are installed)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_BYTES', '1024')),
+    gzip_level=int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4')),
+    zstd_level=int(os.environ.get('COMPRESSION_ZSTD_LEVEL', '3')),
 )
 
+app.add_middleware(BodySizeLimitMiddleware, limits=payload_limits)
+
+# Outermost, so the latency histograms include CORS and the other middleware
+app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -314,6 +1532,54 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def warm_course_pages() -> None:
+    """Load the first summary page of /api/courses into the read caches, at
+    the API's default page size and at the dashboard's (the maximum)"""
+    await asyncio.gather(*(
+        load_course_page("summary", CourseQuery(limit=limit + 1), limit)
+        for limit in {DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE}
+    ))
+
+
+def warm_up_steps() -> dict:
+    """What has to be warm before the app reports ready (see lifecycle.py)"""
+    if not STARTUP_WARMUP:
+        return {}
+    steps = {
+        "connections": lambda: repository.warm(STARTUP_WARM_CONNECTIONS),
+        "courses": warm_course_pages,
+        # A TTL index only; the shared cache works without it
+        "shared_cache": shared_cache.setup,
+    }
+    if db.url:
+        # Course reads do not need Mongo; an outage should delay readiness briefly at most
+        steps["mongo"] = lambda: db.ping(timeout=2.0)
+    return steps
+
+
+async def start_services(stack: AsyncExitStack) -> None:
+    """Start what the handlers rely on, registering each shutdown on `stack`.
+
+    Only what must be in place before the first request runs here; the
+    rest of the warm-up happens in the background while the app is live
+    but not yet ready.
+    """
+    await repository.start()
+    stack.push_async_callback(repository.close)
+    stack.callback(db.close)
+    stack.callback(payload_parser.shutdown)
+    stack.callback(cover_processor.shutdown)
+    await change_feed.setup()
+    stack.push_async_callback(change_feed.close)
+    course_search.start()
+    stack.push_async_callback(course_search.stop)
+    await progress_store.setup()
+    stack.push_async_callback(progress_store.close)
+    # Closed before the change feed and repository its jobs use
+    await job_queue.setup()
+    stack.push_async_callback(job_queue.close)
+    if env_bool('MIGRATE_INLINE_FILES', False):
+        inline_file_migration.start()
+    stack.push_async_callback(inline_file_migration.stop)
+    readiness.start(warm_up_steps())
+    stack.push_async_callback(readiness.stop)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """Second-level cache shared by every worker process.
+
+    Entries are stamped with the version of their scope (the course list, or
+    a single course) at the moment the upstream read started. Mutations bump
+    the version, so an entry written by a read that raced a write is never
+    served.
+    """
+
+    async def setup(self) -> None:
+        pass
+
+    async def lookup(self, key: str, scope: str) -> Tuple[Optional[Any], int, int]:
+        """Return (cached value or None, its size in bytes, current version of `scope`)"""
+        return None, 0, 0
+
+    async def store(self, key: str, value: Any, version: int) -> None:
+        pass
+
+    async def bump(self, scopes: Iterable[str]) -> dict:
+        """Invalidate `scopes`; returns their new versions"""
+        return {}
+
+    async def bump_many(self, scopes: Iterable[str]) -> None:
+        """Invalidate many scopes at once, without reporting versions"""
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none"}
+
+
+class MongoSharedCache(SharedCache):
+    """SharedCache stored in MongoDB, expired by a TTL index"""
+
+    def __init__(self, db, ttl: float, max_bytes: int = 8 * 1024 * 1024,
+                 timeout: float = 0.25, retry_after: float = 30.0):
+        self.entries = db["course_cache"]
+        self.versions = db["course_cache_versions"]
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._unavailable_until = 0.0
+        # Scopes whose bump was skipped while Mongo was unavailable
+        self._pending: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.stores = 0
+        self.errors = 0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _failed(self, action: str, error: Exception) -> None:
+        # Mongo is an optimisation here; never let it slow down or fail requests
+        self.errors += 1
+        self._unavailable_until = time.monotonic() + self.retry_after
+        logger.warning("Shared cache %s failed (%s); bypassing for %ss", action, error, self.retry_after)
+
+    async def setup(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self.entries.create_index("expires_at", expireAfterSeconds=0),
+                timeout=max(self.timeout, 5.0),
+            )
+        except Exception as e:
+            self._failed("index setup", e)
+
+    async def _catch_up(self) -> bool:
+        """Apply the bumps skipped during an outage before the cache is used
+        again (entries stored before it would otherwise look current); False
+        while Mongo is still unavailable"""
+        if not self.available:
+            return False
+        if not self._pending:
+            return True
+        scopes = list(self._pending)
+        try:
+            await self._bump_all(scopes)
+        except Exception as e:
+            self._failed("catch-up version bump", e)
+            return False
+        self._pending.difference_update(scopes)
+        return True
+
+    async def _bump_all(self, scopes: List[str]) -> None:
+        from pymongo import UpdateOne  # deferred with Motor (see mongo.py)
+
+        operations = [UpdateOne({"_id": scope}, {"$inc": {"version": 1}}, upsert=True) for scope in scopes]
+        await asyncio.wait_for(self.versions.bulk_write(operations, ordered=False), timeout=self.timeout)
+
+    async def lookup(self, key: str, scope: str) -> Tuple[Optional[Any], int, int]:
+        if not await self._catch_up():
+            return None, 0, 0
+        try:
+            entry, stamp = await asyncio.wait_for(
+                asyncio.gather(
+                    self.entries.find_one({"_id": key}),
+                    self.versions.find_one({"_id": scope}),
+                ),
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            self._failed("lookup", e)
+            return None, 0, 0
+
+        version = stamp["version"] if stamp else 0
+        if entry is None or entry["expires_at"].replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+            self.misses += 1
+            return None, 0, version
+        if entry["version"] != version:
+            self.stale += 1
+            return None, 0, version
+        self.hits += 1
+        return json.loads(entry["value"]), len(entry["value"]), version
+
+    async def store(self, key: str, value: Any, version: int) -> None:
+        if not await self._catch_up():
+            return
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        if len(payload) > self.max_bytes:
+            return
+        document = {
+            "value": payload,
+            "version": version,
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+        }
+        try:
+            await asyncio.wait_for(
+                self.entries.replace_one({"_id": key}, document, upsert=True),
+                timeout=self.timeout,
+            )
+            self.stores += 1
+        except Exception as e:
+            self._failed("store", e)
+
+    async def bump(self, scopes: Iterable[str]) -> dict:
+        scopes = list(scopes)
+        if not await self._catch_up():
+            self._pending.update(scopes)
+            return {}
+        try:
+            stamps = await asyncio.wait_for(
+                asyncio.gather(*(
+                    self.versions.find_one_and_update(
+                        {"_id": scope}, {"$inc": {"version": 1}}, upsert=True, return_document=True)
+                    for scope in scopes
+                )),
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            # Unlike reads, a lost bump can leave stale data behind: retried by _catch_up
+            self._pending.update(scopes)
+            self._failed("version bump", e)
+            return {}
+        return {scope: stamp["version"] for scope, stamp in zip(scopes, stamps)}
+
+    async def bump_many(self, scopes: Iterable[str]) -> None:
+        scopes = list(scopes)
+        if not scopes:
+            return
+        if not await self._catch_up():
+            self._pending.update(scopes)
+            return
+        try:
+            await self._bump_all(scopes)
+        except Exception as e:
+            self._pending.update(scopes)
+            self._failed("version bump", e)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "mongo",
+            "available": self.available,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "stores": self.stores,
+            "errors": self.errors,
+            "pending_bumps": len(self._pending),
+        }
@@ -0,0 +1,271 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Errors raised before any bytes reach the upstream, so retrying them is
+# safe even for POST/PATCH/DELETE.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class PoolSettings:
+    """Connection pool, timeout and retry settings for the Supabase client"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    write_timeout: float = 15.0
+    pool_timeout: float = 5.0
+    max_retries: int = 2
+    backoff_base: float = 0.1
+    backoff_max: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        return cls(
+            max_connections=env_int("SUPABASE_POOL_MAX_CONNECTIONS", cls.max_connections),
+            max_keepalive_connections=env_int("SUPABASE_POOL_MAX_KEEPALIVE", cls.max_keepalive_connections),
+            keepalive_expiry=env_float("SUPABASE_POOL_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            http2=env_bool("SUPABASE_HTTP2", cls.http2),
+            connect_timeout=env_float("SUPABASE_CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=env_float("SUPABASE_READ_TIMEOUT", cls.read_timeout),
+            write_timeout=env_float("SUPABASE_WRITE_TIMEOUT", cls.write_timeout),
+            pool_timeout=env_float("SUPABASE_POOL_TIMEOUT", cls.pool_timeout),
+            max_retries=env_int("SUPABASE_MAX_RETRIES", cls.max_retries),
+            backoff_base=env_float("SUPABASE_BACKOFF_BASE", cls.backoff_base),
+            backoff_max=env_float("SUPABASE_BACKOFF_MAX", cls.backoff_max),
+        )
+
+    def timeout(self, total: Optional[float] = None) -> httpx.Timeout:
+        if total is not None:
+            return httpx.Timeout(total, connect=min(total, self.connect_timeout))
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+
+class SupabaseClient:
+    """Long-lived, pooled HTTP client for the Supabase REST API.
+
+    One instance is shared by every request handler so connections (and
+    TLS sessions) are reused instead of being re-established per call.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        settings: Optional[PoolSettings] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.settings = settings or PoolSettings()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._lock = asyncio.Lock()
+        self.requests_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def http2_enabled(self) -> bool:
+        if not self.settings.http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("SUPABASE_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+            self.settings.http2 = False
+            return False
+        return True
+
+    def _build_client(self) -> httpx.AsyncClient:
+        settings = self.settings
+        limits = httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        )
+        headers = {
+            "apikey": self.api_key,
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Prefer": "return=representation",
+        }
+        kwargs = {}
+        if self._transport is not None:
+            kwargs["transport"] = self._transport
+        return httpx.AsyncClient(
+            base_url=f"{self.base_url}/rest/v1/",
+            headers=headers,
+            limits=limits,
+            timeout=settings.timeout(),
+            http2=self.http2_enabled,
+            **kwargs,
+        )
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._client is None:
+                self._client = self._build_client()
+                logger.info(
+                    "Supabase client started (max_connections=%s, keepalive=%s, http2=%s)",
+                    self.settings.max_connections,
+                    self.settings.max_keepalive_connections,
+                    self.settings.http2,
+                )
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.settings.backoff_max, self.settings.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        data=None,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """Send a request, retrying connection failures with jittered backoff"""
+        client = await self._get_client()
+        request_timeout = self.settings.timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        attempt = 0
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            while True:
+                try:
+                    return await client.request(
+                        method,
+                        endpoint,
+                        json=data,
+                        headers=headers,
+                        timeout=request_timeout,
+                    )
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.settings.max_retries:
+                        self.errors_total += 1
+                        raise
+                    delay = self._backoff(attempt)
+                    attempt += 1
+                    self.retries_total += 1
+                    logger.warning(
+                        "Supabase %s %s failed (%s), retry %s/%s in %.2fs",
+                        method, endpoint, type(e).__name__, attempt, self.settings.max_retries, delay,
+                    )
+                    await asyncio.sleep(delay)
+                except httpx.RequestError:
+                    self.errors_total += 1
+                    raise
+        finally:
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        endpoint: str,
+        headers: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[httpx.Response]:
+        """Like `request`, but yields the response before its body is read"""
+        client = await self._get_client()
+        request_timeout = self.settings.timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        request = client.build_request(method, endpoint, headers=headers, timeout=request_timeout)
+        attempt = 0
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            while True:
+                try:
+                    response = await client.send(request, stream=True)
+                    break
+                except RETRYABLE_ERRORS:
+                    if attempt >= self.settings.max_retries:
+                        self.errors_total += 1
+                        raise
+                    self.retries_total += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                except httpx.RequestError:
+                    self.errors_total += 1
+                    raise
+            try:
+                yield response
+            finally:
+                await response.aclose()
+        finally:
+            self.in_flight -= 1
+
+    def pool_stats(self) -> dict:
+        """Snapshot of pool usage, for sizing the limits above"""
+        connections = []
+        if self._client is not None:
+            pool = getattr(self._client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return {
+            "started": self._client is not None,
+            "http2": self.settings.http2,
+            "max_connections": self.settings.max_connections,
+            "max_keepalive_connections": self.settings.max_keepalive_connections,
+            "keepalive_expiry": self.settings.keepalive_expiry,
+            "connections": len(connections),
+            "idle_connections": idle,
+            "active_connections": len(connections) - idle,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "requests_total": self.requests_total,
+            "retries_total": self.retries_total,
+            "errors_total": self.errors_total,
+            "sampled_at": time.time(),
+        }
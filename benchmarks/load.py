@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""Async load generator and latency benchmark for the Classroom API.
+
+Drives a weighted mix of list/detail/create/update/delete calls from many
+concurrent workers and reports p50/p95/p99 latency, throughput and error
+rate per endpoint. Without --base-url it starts the backend in-process on a
+local port backed by the in-memory PostgREST stand-in (SUPABASE_BACKEND=fake,
+see backend/fake_supabase.py), so runs are offline and repeatable.
+
+    python benchmarks/load.py --duration 20 --concurrency 32 --output run.json
+    python benchmarks/load.py --baseline run.json --max-regression 0.15
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+OPERATIONS = ("list", "detail", "create", "update", "delete")
+DEFAULT_MIX = "list=60,detail=25,create=5,update=7,delete=3"
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, operation: str, seconds: float, status: Optional[int]) -> None:
+        self.latencies.setdefault(operation, []).append(seconds)
+        key = str(status) if status is not None else "exception"
+        statuses = self.statuses.setdefault(operation, {})
+        statuses[key] = statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        all_latencies = []
+        for operation, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            all_latencies.extend(values)
+            endpoints[operation] = self._stats(values, self.errors.get(operation, 0), elapsed)
+            endpoints[operation]["statuses"] = self.statuses.get(operation, {})
+        overall = self._stats(sorted(all_latencies), sum(self.errors.values()), elapsed)
+        return {"elapsed_s": round(elapsed, 3), "overall": overall, "endpoints": endpoints}
+
+    @staticmethod
+    def _stats(values: List[float], errors: int, elapsed: float) -> dict:
+        count = len(values)
+        return {
+            "requests": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+        }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, mix: Dict[str, float], seed: int):
+        self.client = client
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.random = random.Random(seed)
+        self.recorder = Recorder()
+        self.course_ids: List[str] = []
+
+    async def prime(self) -> None:
+        """Collect course ids for the detail/update/delete operations"""
+        response = await self.client.get("/api/courses", params={"limit": 200})
+        response.raise_for_status()
+        self.course_ids.extend(course["id"] for course in response.json())
+
+    def _pick_id(self) -> Optional[str]:
+        return self.random.choice(self.course_ids) if self.course_ids else None
+
+    async def op_list(self) -> httpx.Response:
+        return await self.client.get("/api/courses", params={"limit": 50})
+
+    async def op_detail(self) -> Optional[httpx.Response]:
+        course_id = self._pick_id()
+        return await self.client.get(f"/api/courses/{course_id}") if course_id else None
+
+    async def op_create(self) -> httpx.Response:
+        response = await self.client.post("/api/courses", json={
+            "title": f"Load test {uuid.uuid4().hex[:8]}",
+            "description": "Created by benchmarks/load.py",
+            "tag": "BENCH",
+        })
+        if response.status_code < 400:
+            self.course_ids.append(response.json()["id"])
+        return response
+
+    async def op_update(self) -> Optional[httpx.Response]:
+        course_id = self._pick_id()
+        if not course_id:
+            return None
+        return await self.client.put(f"/api/courses/{course_id}", json={"progress": self.random.randint(0, 100)})
+
+    async def op_delete(self) -> Optional[httpx.Response]:
+        if len(self.course_ids) < 2:
+            return None
+        course_id = self.course_ids.pop(self.random.randrange(len(self.course_ids)))
+        return await self.client.delete(f"/api/courses/{course_id}")
+
+    async def worker(self, deadline: float, budget: List[int]) -> None:
+        while time.perf_counter() < deadline and budget[0] != 0:
+            budget[0] -= 1
+            operation = self.random.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(self, f"op_{operation}")()
+            except httpx.HTTPError:
+                self.recorder.record(operation, time.perf_counter() - started, None)
+                continue
+            if response is not None:
+                self.recorder.record(operation, time.perf_counter() - started, response.status_code)
+
+    async def run(self, concurrency: int, duration: float, requests: int) -> dict:
+        await self.prime()
+        # A negative budget means "until the deadline"
+        budget = [requests if requests > 0 else -1]
+        deadline = time.perf_counter() + duration if duration > 0 else float("inf")
+        started = time.perf_counter()
+        await asyncio.gather(*(self.worker(deadline, budget) for _ in range(concurrency)))
+        return self.recorder.summary(time.perf_counter() - started)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_local_server(args):
+    """Run backend/server.py under uvicorn in this process against FakeSupabase"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "classroom_bench")
+    # In-process backends: without a local Mongo, writes would wait on its timeouts
+    os.environ.setdefault("SHARED_CACHE_BACKEND", "none")
+    os.environ.setdefault("JOB_QUEUE_BACKEND", "memory")
+    os.environ.setdefault("CHANGE_FEED_BACKEND", "memory")
+    # Every simulated client shares one address; leave per-client limits out
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    os.environ.update({
+        "SUPABASE_BACKEND": "fake",
+        "FAKE_SUPABASE_ROWS": str(args.seed_courses),
+        "FAKE_SUPABASE_SEED": str(args.seed),
+        "FAKE_SUPABASE_LATENCY": str(args.upstream_latency),
+        "FAKE_SUPABASE_JITTER": str(args.upstream_jitter),
+        "FAKE_SUPABASE_FAILURE_RATE": str(args.upstream_failure_rate),
+    })
+    sys.path.insert(0, str(BACKEND_DIR))
+    import uvicorn
+    import server
+
+    # server.py logs every upstream call at INFO through httpx
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    port = free_port()
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    uvicorn_server = uvicorn.Server(config)
+    task = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return f"http://127.0.0.1:{port}", uvicorn_server, task
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Endpoints whose p95 latency or throughput regressed beyond the limit"""
+    failures = []
+    for operation, stats in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(operation)
+        if not before:
+            continue
+        if before["p95_ms"] and stats["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+            failures.append(f"{operation}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+        if before["rps"] and stats["rps"] < before["rps"] * (1 - max_regression):
+            failures.append(f"{operation}: rps {before['rps']} -> {stats['rps']}")
+        if stats["error_rate"] > before["error_rate"] + max_regression / 10:
+            failures.append(f"{operation}: error rate {before['error_rate']} -> {stats['error_rate']}")
+    return failures
+
+
+def print_report(result: dict) -> None:
+    header = (f"{'endpoint':<10}{'reqs':>8}{'rps':>10}{'err%':>8}"
+              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print(header)
+    print("-" * len(header))
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        print(f"{name:<10}{stats['requests']:>8}{stats['rps']:>10.1f}{stats['error_rate'] * 100:>8.2f}"
+              f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+
+async def main(args) -> int:
+    server_handle = None
+    base_url = args.base_url
+    if not base_url:
+        base_url, uvicorn_server, task = await start_local_server(args)
+        server_handle = (uvicorn_server, task)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            test = LoadTest(client, args.mix, args.seed)
+            result = await test.run(args.concurrency, args.duration, args.requests)
+    finally:
+        if server_handle:
+            server_handle[0].should_exit = True
+            await server_handle[1]
+
+    result["config"] = {
+        "base_url": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "requests": args.requests,
+        "mix": args.mix,
+        "seed": args.seed,
+        "seed_courses": args.seed_courses,
+        "upstream_latency": args.upstream_latency,
+        "upstream_jitter": args.upstream_jitter,
+        "upstream_failure_rate": args.upstream_failure_rate,
+    }
+    result["recorded_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    print_report(result)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        failures = compare(result, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        if failures:
+            print("\nRegressions against baseline:")
+            for failure in failures:
+                print(f"  - {failure}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Target a running server instead of an in-process one")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (0 = until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--seed-courses", type=int, default=500, help="Rows seeded into the fake Supabase table")
+    parser.add_argument("--upstream-latency", type=float, default=0.005, help="Fake Supabase base latency (s)")
+    parser.add_argument("--upstream-jitter", type=float, default=0.0, help="Extra uniform random latency (s)")
+    parser.add_argument("--upstream-failure-rate", type=float, default=0.0,
+                        help="Fraction of fake Supabase calls answered with a 503")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Allowed fractional p95/rps regression before failing")
+    args = parser.parse_args(argv)
+    if args.duration <= 0 and args.requests <= 0:
+        parser.error("set --duration or --requests")
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
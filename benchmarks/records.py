@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Memory per cached course and serialization cost per response: dict rows
+vs CourseRecords (backend/records.py).
+
+Builds a synthetic catalog of `--courses` rows (10k by default) shaped like
+the courses table and compares, per row:
+
+    memory      the rows as decoded from the upstream JSON (what the caches
+                held before) against CourseRecords built from them, for the
+                summary and full views (tracemalloc)
+    build       rendering a record from a row, and looking up the record of
+                an unchanged row again (interned)
+
+and per response, for a page of `--page` rows and for the whole catalog:
+
+    validated   model_validate + model_dump_json (TRUST_UPSTREAM_ROWS=false)
+    projected   RowProjector + orjson, what list pages did before records
+    records     joining the records' pre-serialized bodies
+
+    python benchmarks/records.py --courses 20000 --page 200
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+
+def load_server():
+    os.environ.setdefault("SUPABASE_BACKEND", "fake")
+    os.environ.setdefault("SHARED_CACHE_BACKEND", "none")
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    return server
+
+
+def catalog(count: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for n in range(count):
+        files = [{"id": f"f{i}", "name": f"notes-{i}.pdf", "type": "application/pdf",
+                  "size": rng.randint(1_000, 5_000_000), "sha256": f"{rng.getrandbits(256):064x}",
+                  "blob_id": f"blob-{n}-{i}"}
+                 for i in range(rng.randint(0, 4))]
+        rows.append({
+            "id": f"{rng.getrandbits(128):032x}",
+            "title": f"Course {n:06d}",
+            "description": "Lorem ipsum dolor sit amet " * rng.randint(1, 8),
+            "image_url": f"https://picsum.photos/seed/{n}/800/450",
+            "content_description": "Week by week outline. " * rng.randint(2, 20),
+            "files": files,
+            "progress": rng.randint(0, 100),
+            "tag": rng.choice(["AIS+", "Math", "Science", "History"]),
+            "version": rng.randint(1, 9),
+            "updated_at": "2026-01-%02dT%02d:00:00.000000+00:00" % (rng.randint(1, 28), rng.randint(0, 23)),
+            "image_variants": None,
+        })
+    return rows
+
+
+def summary_view(row: dict) -> dict:
+    """The row as the summary view returns it (computed columns, no files or text)"""
+    files = row["files"]
+    summary = {k: row[k] for k in ("id", "title", "description", "image_url", "progress", "tag", "image_variants",
+                                   "version", "updated_at")}
+    summary["file_count"] = len(files)
+    summary["files_size"] = sum(f["size"] for f in files)
+    return summary
+
+
+def measure_memory(build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def time_per_call(call: Callable[[], object], repeat: int) -> float:
+    call()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - started) / repeat
+
+
+def print_table(rows: List[dict], columns: List[str]) -> None:
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def main(args) -> int:
+    server = load_server()
+    import orjson
+    from records import CourseRecords, join_array
+
+    full_rows = catalog(args.courses, args.seed)
+    views = {"full": full_rows, "summary": [summary_view(row) for row in full_rows]}
+    models = {"full": (server.Course, server.course_rows), "summary": (server.CourseSummary, server.summary_rows)}
+    count = len(full_rows)
+
+    memory = []
+    build = []
+    for view, rows in views.items():
+        upstream = json.dumps(rows).encode()
+        dict_bytes = measure_memory(lambda: json.loads(upstream))
+        record_bytes = measure_memory(lambda: CourseRecords(server.course_rows, server.summary_rows).many(rows))
+        memory.append({
+            "view": view,
+            "rows": count,
+            "dict_bytes_per_row": dict_bytes // count,
+            "record_bytes_per_row": record_bytes // count,
+            "saved": f"{1 - record_bytes / dict_bytes:.0%}",
+        })
+
+        records = CourseRecords(server.course_rows, server.summary_rows)
+        held = records.many(rows)
+        fresh = time_per_call(lambda: CourseRecords(server.course_rows, server.summary_rows).many(rows), 3)
+        again = time_per_call(lambda: records.many(rows), 3)
+        build.append({
+            "view": view,
+            "build_us_per_row": round(fresh / count * 1e6, 2),
+            "interned_us_per_row": round(again / count * 1e6, 2),
+        })
+
+        model, projector = models[view]
+        for label, size in (("page", min(args.page, count)), ("catalog", count)):
+            page_rows, page_records = rows[:size], held[:size]
+            repeat = max(1, args.repeat * args.page // size)
+            validated = time_per_call(
+                lambda: b"[" + b",".join(model.model_validate(row).model_dump_json().encode()
+                                         for row in page_rows) + b"]", repeat)
+            projected = time_per_call(lambda: orjson.dumps(projector.many(page_rows)), repeat)
+            joined = time_per_call(lambda: join_array(record.body(view) for record in page_records), repeat)
+            build[-1].setdefault("responses", []).append({
+                "view": view,
+                "response": f"{label} ({size})",
+                "validated_ms": round(validated * 1000, 3),
+                "projected_ms": round(projected * 1000, 3),
+                "records_ms": round(joined * 1000, 3),
+                "speedup": f"{projected / joined:.1f}x" if joined else "-",
+            })
+        del held
+
+    responses = [response for entry in build for response in entry.pop("responses")]
+    print("Memory per cached row (bytes)")
+    print_table(memory, ["view", "rows", "dict_bytes_per_row", "record_bytes_per_row", "saved"])
+    print()
+    print("Record build cost (once per upstream read)")
+    print_table(build, ["view", "build_us_per_row", "interned_us_per_row"])
+    print()
+    print("Serialization per response (ms)")
+    print_table(responses, ["view", "response", "validated_ms", "projected_ms", "records_ms", "speedup"])
+    if args.output:
+        Path(args.output).write_text(json.dumps({"memory": memory, "build": build, "responses": responses},
+                                                indent=2))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=10_000, help="Rows in the synthetic catalog")
+    parser.add_argument("--page", type=int, default=50, help="Rows per list page")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed page responses (fewer for the catalog)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
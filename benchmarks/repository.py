@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Latency and CPU cost of the course repositories: PostgREST vs asyncpg.
+
+Drives the storage layer directly (backend/repository.py), without the HTTP
+app or its caches, so the numbers are what each backend costs per call:
+
+    postgrest   Supabase's PostgREST API over the pooled httpx client
+    asyncpg     Postgres directly over an asyncpg pool
+
+Each backend gets its own `--courses` seeded rows (tagged `bench-<backend>`,
+deleted afterwards), then every operation runs `--requests` times from
+`--concurrency` concurrent tasks. Point both at the same database for a
+fair comparison: SUPABASE_URL/SUPABASE_KEY for PostgREST and DATABASE_URL
+(the project's Postgres connection string) for asyncpg. Without
+SUPABASE_URL, or with --fake, PostgREST is served by the in-memory stand-in
+(backend/fake_supabase.py), which only measures client-side overhead.
+
+    DATABASE_URL=postgresql://... python benchmarks/repository.py --fake --requests 500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+OPERATIONS = ("list_summary", "list_full", "detail", "update", "scan")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def build_repository(name: str, args):
+    from repository import AsyncpgCourseRepository, DatabaseSettings, PostgrestCourseRepository
+    from resilience import BreakerSettings, CircuitBreaker
+    from supabase_client import PoolSettings, SupabaseClient
+
+    breaker = CircuitBreaker(BreakerSettings.from_env())
+    if name == "asyncpg":
+        settings = DatabaseSettings.from_env()
+        settings.max_size = max(settings.max_size, args.concurrency)
+        return AsyncpgCourseRepository(settings, breaker)
+    if args.fake or not os.environ.get("SUPABASE_URL"):
+        from fake_supabase import FakeSupabase
+
+        fake = FakeSupabase(latency=args.fake_latency)
+        client = SupabaseClient("http://fake.supabase", "key", PoolSettings.from_env(), transport=fake.transport())
+    else:
+        client = SupabaseClient(os.environ["SUPABASE_URL"], os.environ.get("SUPABASE_KEY", ""), PoolSettings.from_env())
+    return PostgrestCourseRepository(client, breaker)
+
+
+def seed_rows(backend: str, count: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for n in range(count):
+        files = [{"id": f"f{i}", "name": f"notes-{i}.pdf", "type": "application/pdf",
+                  "size": rng.randint(1_000, 5_000_000), "sha256": "0" * 64, "blob_id": f"blob-{n}-{i}"}
+                 for i in range(rng.randint(0, 4))]
+        rows.append({
+            "id": f"bench-{backend}-{n:06d}",
+            "title": f"Course {rng.randint(0, count):06d}",
+            "description": "Lorem ipsum dolor sit amet " * rng.randint(1, 8),
+            "image_url": f"https://picsum.photos/seed/{n}/800/450",
+            "content_description": "Week by week outline. " * rng.randint(2, 20),
+            "files": files,
+            "progress": rng.randint(0, 100),
+            "tag": f"bench-{backend}",
+        })
+    return rows
+
+
+async def timed_runs(call: Callable, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = [requests]
+
+    async def worker():
+        nonlocal errors
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "ops_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "cpu_ms": round(cpu / max(1, len(latencies)) * 1000, 3),
+    }
+
+
+async def run_backend(name: str, args) -> List[dict]:
+    from repository import CourseQuery
+
+    repository = build_repository(name, args)
+    await repository.start()
+    rows = seed_rows(name, args.courses, args.seed)
+    ids = [row["id"] for row in rows]
+    tag = f"bench-{name}"
+    rng = random.Random(args.seed)
+    try:
+        for start in range(0, len(rows), 500):
+            await repository.insert(rows[start:start + 500])
+
+        operations: Dict[str, Callable] = {
+            "list_summary": lambda: repository.list("summary", CourseQuery(tag=tag, limit=51)),
+            "list_full": lambda: repository.list("full", CourseQuery(tag=tag, limit=21)),
+            "detail": lambda: repository.get(rng.choice(ids)),
+            "update": lambda: repository.update([rng.choice(ids)], {"progress": rng.randint(0, 100)}),
+            "scan": lambda: repository.scan("search", None, 500),
+        }
+        results = []
+        for operation in args.operations:
+            await operations[operation]()  # warm connections and statement caches
+            result = await timed_runs(operations[operation], args.requests, args.concurrency)
+            results.append({"backend": name, "operation": operation, **result})
+        return results
+    finally:
+        for start in range(0, len(ids), 500):
+            await repository.delete(ids[start:start + 500])
+        await repository.close()
+
+
+def print_table(rows: List[dict], columns: List[str]) -> None:
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+async def main(args) -> int:
+    # Ahead of this directory, whose repository.py is this script
+    sys.path.insert(0, str(BACKEND_DIR))
+    logging.basicConfig(level=logging.WARNING)
+    if "asyncpg" in args.backends and not os.environ.get("DATABASE_URL"):
+        print("asyncpg needs DATABASE_URL; skipping it", file=sys.stderr)
+        args.backends = [b for b in args.backends if b != "asyncpg"]
+    results = []
+    for backend in args.backends:
+        results.extend(await run_backend(backend, args))
+    if not results:
+        return 1
+    print_table(results, ["backend", "operation", "requests", "errors", "ops_per_s", "p50_ms", "p95_ms", "cpu_ms"])
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", type=lambda s: s.split(","), default=["postgrest", "asyncpg"])
+    parser.add_argument("--operations", type=lambda s: s.split(","), default=list(OPERATIONS))
+    parser.add_argument("--courses", type=int, default=1000, help="Rows seeded per backend")
+    parser.add_argument("--requests", type=int, default=300, help="Timed calls per operation")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--fake", action="store_true", help="Serve PostgREST from the in-memory stand-in")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="Seconds added to each fake PostgREST call")
+    parser.add_argument("--output", help="Write results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
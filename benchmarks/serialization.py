@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""CPU cost per request of response validation, serialization and compression.
+
+Runs the backend in-process against the in-memory PostgREST stand-in
+(SUPABASE_BACKEND=fake) and times repeated course list/detail requests with
+process CPU time. Reads are served from the course cache after the first
+request, so the numbers isolate what this process spends on each response:
+
+    validated   rows re-validated with `model_validate` (TRUST_UPSTREAM_ROWS=false)
+    trusted     rows projected onto the model and serialized with orjson
+    trusted+X   the same, compressed with X (gzip, and br/zstd when installed)
+
+A second table compares the serialization step on its own: pydantic
+validation + jsonable_encoder + json.dumps against projection + orjson.
+
+    python benchmarks/serialization.py --courses 500 --requests 300
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+ENDPOINTS = {
+    "list_summary": "/api/courses?limit=100",
+    "list_full": "/api/courses?view=full&limit=50",
+    "detail": None,  # filled in with a seeded course id
+}
+
+
+def load_server(args):
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "classroom_bench")
+    os.environ.setdefault("SHARED_CACHE_BACKEND", "none")
+    # Every simulated client shares one address; leave per-client limits out
+    os.environ.setdefault("ADMISSION_ENABLED", "false")
+    os.environ.update({
+        "SUPABASE_BACKEND": "fake",
+        "FAKE_SUPABASE_ROWS": str(args.courses),
+        "FAKE_SUPABASE_SEED": str(args.seed),
+        "FAKE_SUPABASE_LATENCY": "0",
+        "COURSE_CACHE_TTL": "3600",
+    })
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return server
+
+
+def cpu_per_call(call: Callable[[], object], repeat: int) -> float:
+    call()  # warm caches
+    started = time.process_time()
+    for _ in range(repeat):
+        call()
+    return (time.process_time() - started) / repeat
+
+
+def scenarios(compression) -> Dict[str, dict]:
+    found = {"validated": {"trust": False, "encoding": "identity"},
+             "trusted": {"trust": True, "encoding": "identity"}}
+    for coding in compression.available_encodings():
+        found[f"trusted+{coding}"] = {"trust": True, "encoding": coding}
+    return found
+
+
+def endpoint_runs(server, client, args) -> List[dict]:
+    import compression
+
+    results = []
+    for name, scenario in scenarios(compression).items():
+        server.TRUST_UPSTREAM_ROWS = scenario["trust"]
+        headers = {"Accept-Encoding": scenario["encoding"]}
+        for endpoint, path in ENDPOINTS.items():
+            sizes = []
+
+            def call():
+                response = client.get(path, headers=headers)
+                response.raise_for_status()
+                sizes.append(response.num_bytes_downloaded)
+
+            cpu = cpu_per_call(call, args.requests)
+            results.append({
+                "scenario": name,
+                "endpoint": endpoint,
+                "cpu_ms": round(cpu * 1000, 3),
+                "bytes": sizes[-1],
+            })
+    return results
+
+
+def serializer_runs(server, client, args) -> List[dict]:
+    from fastapi.encoders import jsonable_encoder
+    import orjson
+
+    rows = client.get("/api/courses?view=full&limit=100").json()
+    results = []
+    for label, model, projector in (("Course", server.Course, server.course_rows),
+                                    ("CourseSummary", server.CourseSummary, server.summary_rows)):
+        def validated():
+            return json.dumps(jsonable_encoder([model.model_validate(row) for row in rows])).encode()
+
+        def trusted():
+            return orjson.dumps(projector.many(rows))
+
+        body = trusted()
+        results.append({
+            "model": label,
+            "rows": len(rows),
+            "validated_ms": round(cpu_per_call(validated, args.requests) * 1000, 3),
+            "trusted_ms": round(cpu_per_call(trusted, args.requests) * 1000, 3),
+            "bytes": len(body),
+            "gzip_bytes": len(gzip.compress(body, 6)),
+        })
+    return results
+
+
+def print_table(rows: List[dict], columns: List[str]) -> None:
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def main(args) -> int:
+    server = load_server(args)
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        ids = client.get("/api/courses?limit=1").json()
+        ENDPOINTS["detail"] = f"/api/courses/{ids[0]['id']}"
+        endpoints = endpoint_runs(server, client, args)
+        serializers = serializer_runs(server, client, args)
+
+    print("CPU per request (ms, in-process client included)")
+    print_table(endpoints, ["scenario", "endpoint", "cpu_ms", "bytes"])
+    print()
+    print("Serialization only, per page (ms)")
+    print_table(serializers, ["model", "rows", "validated_ms", "trusted_ms", "bytes", "gzip_bytes"])
+    if args.output:
+        Path(args.output).write_text(json.dumps({"endpoints": endpoints, "serializers": serializers}, indent=2))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=300, help="Rows seeded into the fake Supabase table")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per scenario and endpoint")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Import time, time to live/ready and first-request latency of the API.
+
+Two measurements, each repeated `--runs` times in fresh processes:
+
+    import    `python -X importtime -c "import server"`: total import time
+              of backend/server.py and the packages that cost the most
+    startup   `uvicorn server:app` on a local port: seconds from spawn until
+              /api/health/live and /api/health/ready answer 200, then the
+              latency of the first two dashboard page loads
+              (/api/courses?limit=200)
+
+Startup runs once per `--modes` entry: "warm" is the default warm-up
+(STARTUP_WARMUP=true), "cold" turns it off, so the first page shows what
+warm-up saves. The API is served from the in-memory PostgREST stand-in
+(SUPABASE_BACKEND=fake, see backend/fake_supabase.py) with
+`--upstream-latency` added to every call, and without Mongo unless
+MONGO_URL is set.
+
+    python benchmarks/startup.py --runs 5 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env(args, warm: bool = True) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("DB_NAME", "classroom_bench")
+    env.update({
+        "SUPABASE_BACKEND": "fake",
+        "FAKE_SUPABASE_ROWS": str(args.courses),
+        "FAKE_SUPABASE_LATENCY": str(args.upstream_latency),
+        "SHARED_CACHE_BACKEND": "none",
+        "STARTUP_WARMUP": "true" if warm else "false",
+    })
+    return env
+
+
+def measure_import(args) -> dict:
+    """Median import time of server.py, and the costliest top-level packages"""
+    totals: List[float] = []
+    packages: Dict[str, List[float]] = {}
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=BACKEND_DIR,
+                                env=server_env(args), capture_output=True, text=True, check=True)
+        run: Dict[str, float] = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if not match:
+                continue
+            own, cumulative, indent, module = int(match[1]), int(match[2]), len(match[3]), match[4]
+            if module == "server" and indent == 1:
+                totals.append(cumulative / 1000)
+            # Self time summed per top-level package, wherever it was imported from
+            package = module.split(".")[0]
+            run[package] = run.get(package, 0.0) + own / 1000
+        for package, ms in run.items():
+            packages.setdefault(package, []).append(ms)
+    top = sorted(((statistics.median(v), k) for k, v in packages.items()), reverse=True)[:args.top]
+    return {
+        "import_ms": round(statistics.median(totals), 1),
+        "packages": [{"package": name, "ms": round(ms, 1)} for ms, name in top],
+    }
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_startup(args, warm: bool) -> dict:
+    port = free_port()
+    spawned = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=server_env(args, warm), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            deadline = spawned + args.timeout
+            live = wait_for(client, "/api/health/live", deadline)
+            ready = wait_for(client, "/api/health/ready", deadline)
+            if live is None or ready is None:
+                raise RuntimeError(f"server did not become ready within {args.timeout}s")
+            pages = []
+            for _ in range(2):
+                started = time.perf_counter()
+                client.get("/api/courses", params={"limit": 200}).raise_for_status()
+                pages.append((time.perf_counter() - started) * 1000)
+        return {"live_s": live - spawned, "ready_s": ready - spawned, "first_ms": pages[0], "second_ms": pages[1]}
+    finally:
+        process.terminate()
+        process.wait(10)
+
+
+def print_table(rows: List[dict], columns: List[str]) -> None:
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def main(args) -> int:
+    imports = measure_import(args)
+    print(f"import server: {imports['import_ms']} ms (median of {args.runs})")
+    print_table(imports["packages"], ["package", "ms"])
+    print()
+
+    startup = []
+    for mode in args.modes:
+        runs = [measure_startup(args, warm=mode == "warm") for _ in range(args.runs)]
+        startup.append({"mode": mode, **{
+            stat: round(statistics.median(run[stat] for run in runs), 3)
+            for stat in ("live_s", "ready_s", "first_ms", "second_ms")
+        }})
+    print_table(startup, ["mode", "live_s", "ready_s", "first_ms", "second_ms"])
+    if args.output:
+        Path(args.output).write_text(json.dumps({"import": imports, "startup": startup}, indent=2))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement")
+    parser.add_argument("--modes", type=lambda s: s.split(","), default=["warm", "cold"])
+    parser.add_argument("--courses", type=int, default=2000, help="Rows served by the PostgREST stand-in")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="Seconds added to each upstream call")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed by import cost")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds allowed to become ready")
+    parser.add_argument("--output", help="Write results as JSON")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
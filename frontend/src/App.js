@@ -13,6 +13,7 @@ import AdminModal from "./components/AdminModal";
 import CreateCardModal from "./components/CreateCardModal";
 import EditCardModal from "./components/EditCardModal";
 import RLSErrorModal from "./components/RLSErrorModal";
+import { applyCourseChange, useCourseFeed } from "./hooks/use-course-feed";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -79,8 +80,17 @@ const Dashboard = () => {
   const fetchCourses = useCallback(async () => {
     setLoading(true);
     try {
-      const response = await axios.get(`${API}/courses`);
-      setCourses(response.data || []);
+      // The list is paginated; follow the cursor until the last page
+      let loaded = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API}/courses`, {
+          params: { limit: 200, ...(cursor ? { cursor } : {}) },
+        });
+        loaded = loaded.concat(response.data || []);
+        setCourses(loaded);
+        cursor = response.headers["x-next-cursor"];
+      } while (cursor);
     } catch (error) {
       console.error("Error fetching courses:", error);
       
@@ -101,6 +111,12 @@ const Dashboard = () => {
     fetchCourses();
   }, [fetchCourses]);
 
+  // Keep the list current with changes made in other tabs and dashboards
+  useCourseFeed(`${API}/courses/stream`, {
+    onChange: (type, event) => setCourses((prev) => applyCourseChange(prev, type, event)),
+    onReset: fetchCourses,
+  });
+
   // Admin toggle handler
   const handleAdminToggle = () => {
     setShowAdminModal(true);
@@ -187,7 +203,11 @@ const Dashboard = () => {
     
     setIsSaving(true);
     try {
-      const response = await axios.put(`${API}/courses/${selectedCourse.id}`, updateData);
+      // Send the version we loaded so a concurrent edit is not overwritten
+      const response = await axios.put(`${API}/courses/${selectedCourse.id}`, {
+        ...updateData,
+        version: selectedCourse.version,
+      });
       setCourses((prev) =>
         prev.map((c) => (c.id === selectedCourse.id ? response.data : c))
       );
@@ -199,6 +219,8 @@ const Dashboard = () => {
       if (error.response?.status === 403 && error.response?.data?.detail?.code === "42501") {
         setRlsSqlFix(error.response.data.detail.sql_fix || DEFAULT_RLS_FIX);
         setShowRLSError(true);
+      } else if (error.response?.status === 409) {
+        toast.error("This course was changed by someone else. Reopen it and try again.");
       } else {
         toast.error("Failed to save changes");
       }
@@ -208,8 +230,16 @@ const Dashboard = () => {
   };
 
   // View handlers
-  const handleViewCourse = (course) => {
-    setSelectedCourse(course);
+  // The list only carries card summaries, so load the full course
+  // (content description and files) before opening the detail view.
+  const handleViewCourse = async (course) => {
+    try {
+      const response = await axios.get(`${API}/courses/${course.id}`);
+      setSelectedCourse(response.data);
+    } catch (error) {
+      console.error("Error loading course:", error);
+      toast.error("Failed to load course");
+    }
   };
 
   const handleOpenEditModal = (course) => {
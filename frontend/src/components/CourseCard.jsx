@@ -2,8 +2,14 @@ import React from 'react';
 import { Play, Pencil } from 'lucide-react';
 import { motion } from 'framer-motion';
 import { Progress } from '../components/ui/progress';
+import { coverSrcSet, coverVariants, resolveImageUrl } from '../lib/images';
+
+// Rendered card width: one column on mobile, two from md, three from lg
+const CARD_SIZES = '(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw';
 
 export const CourseCard = ({ course, isAdmin, onView, onEdit }) => {
+  const cover = coverVariants(course);
+
   return (
     <motion.div
       data-testid={`course-card-${course.id}`}
@@ -14,14 +20,24 @@ export const CourseCard = ({ course, isAdmin, onView, onEdit }) => {
       className="group bg-white rounded-xl border border-gray-200 overflow-hidden hover:shadow-lg transition-shadow duration-300"
     >
       {/* Image Container */}
-      <div className="relative aspect-video overflow-hidden">
-        <motion.img
-          src={course.image_url || `https://picsum.photos/seed/${course.id?.slice(0, 8) || 'default'}/800/450`}
-          alt={course.title}
-          className="w-full h-full object-cover"
-          whileHover={{ scale: 1.05 }}
-          transition={{ duration: 0.4 }}
-        />
+      <div
+        className="relative aspect-video overflow-hidden bg-cover bg-center"
+        style={cover ? { backgroundImage: `url(${cover.placeholder})` } : undefined}
+      >
+        <picture>
+          {cover && <source type="image/webp" srcSet={coverSrcSet(cover, 'webp')} sizes={CARD_SIZES} />}
+          <motion.img
+            src={resolveImageUrl(course.image_url) || `https://picsum.photos/seed/${course.id?.slice(0, 8) || 'default'}/800/450`}
+            srcSet={cover ? coverSrcSet(cover, 'jpg') : undefined}
+            sizes={cover ? CARD_SIZES : undefined}
+            alt={course.title}
+            loading="lazy"
+            decoding="async"
+            className="w-full h-full object-cover"
+            whileHover={{ scale: 1.05 }}
+            transition={{ duration: 0.4 }}
+          />
+        </picture>
         
         {/* Hover Overlay with Play Icon */}
         <motion.div
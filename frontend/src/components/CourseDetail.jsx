@@ -16,6 +16,7 @@ import {
 import { Button } from '../components/ui/button';
 import { Textarea } from '../components/ui/textarea';
 import { Progress } from '../components/ui/progress';
+import { coverSrcSet, coverVariants, resolveImageUrl } from '../lib/images';
 
 const getFileIcon = (type) => {
   if (type?.startsWith('video/')) return Video;
@@ -42,6 +43,7 @@ export const CourseDetail = ({
   const [files, setFiles] = useState(course?.files || []);
   const [isDragging, setIsDragging] = useState(false);
   const [hasChanges, setHasChanges] = useState(false);
+  const cover = coverVariants(course);
 
   const handleDescriptionChange = (e) => {
     setContentDescription(e.target.value);
@@ -106,7 +108,10 @@ export const CourseDetail = ({
 
   const handleDownloadFile = (file) => {
     const link = document.createElement('a');
-    link.href = file.data;
+    // Uploaded files are streamed from the blob store; legacy ones are inline
+    link.href = file.blob_id
+      ? `${process.env.REACT_APP_BACKEND_URL}/api/courses/${course.id}/files/${file.id}`
+      : file.data;
     link.download = file.name;
     document.body.appendChild(link);
     link.click();
@@ -171,12 +176,20 @@ export const CourseDetail = ({
       {/* Content */}
       <div className="max-w-4xl mx-auto px-6 md:px-12 py-12">
         {/* Hero Image */}
-        <div className="aspect-video rounded-2xl overflow-hidden mb-8">
-          <img
-            src={course?.image_url || `https://picsum.photos/seed/${course?.id?.slice(0, 8) || 'default'}/1200/675`}
-            alt={course?.title}
-            className="w-full h-full object-cover"
-          />
+        <div
+          className="aspect-video rounded-2xl overflow-hidden mb-8 bg-cover bg-center"
+          style={cover ? { backgroundImage: `url(${cover.placeholder})` } : undefined}
+        >
+          <picture>
+            {cover && <source type="image/webp" srcSet={coverSrcSet(cover, 'webp')} sizes="(min-width: 896px) 896px, 100vw" />}
+            <img
+              src={resolveImageUrl(course?.image_url) || `https://picsum.photos/seed/${course?.id?.slice(0, 8) || 'default'}/1200/675`}
+              srcSet={cover ? coverSrcSet(cover, 'jpg') : undefined}
+              sizes={cover ? '(min-width: 896px) 896px, 100vw' : undefined}
+              alt={course?.title}
+              className="w-full h-full object-cover"
+            />
+          </picture>
         </div>
 
         {/* Course Info */}
@@ -3,6 +3,7 @@ import { motion, AnimatePresence } from 'framer-motion';
 import { X, Upload, Image as ImageIcon, Loader2, Trash2 } from 'lucide-react';
 import { Input } from '../components/ui/input';
 import { Button } from '../components/ui/button';
+import { resolveImageUrl } from '../lib/images';
 
 export const EditCardModal = ({ isOpen, onClose, onSubmit, onDelete, course, isLoading }) => {
   const [title, setTitle] = useState('');
@@ -15,7 +16,7 @@ export const EditCardModal = ({ isOpen, onClose, onSubmit, onDelete, course, isL
     if (course) {
       setTitle(course.title || '');
       setImageUrl(course.image_url || '');
-      setImagePreview(course.image_url || '');
+      setImagePreview(resolveImageUrl(course.image_url) || '');
     }
   }, [course]);
 
@@ -0,0 +1,49 @@
+import { useEffect, useRef } from "react";
+
+const CHANGE_EVENTS = ["created", "updated", "deleted"];
+
+// Apply one change event to a list of course summaries
+export function applyCourseChange(courses, type, { course_id: id, data }) {
+  if (type === "deleted") {
+    return courses.filter((c) => c.id !== id);
+  }
+  if (courses.some((c) => c.id === id)) {
+    return courses.map((c) => (c.id === id ? { ...c, ...data } : c));
+  }
+  return type === "created" ? [data, ...courses] : courses;
+}
+
+// Subscribe to the server's course change stream (Server-Sent Events).
+// EventSource reconnects on its own and resumes after the last event it
+// saw; `onReset` runs when the server can no longer fill that gap and the
+// list has to be reloaded.
+export function useCourseFeed(url, { onChange, onReset }) {
+  const handlers = useRef({ onChange, onReset });
+  handlers.current = { onChange, onReset };
+
+  useEffect(() => {
+    if (typeof EventSource === "undefined") return undefined;
+    const source = new EventSource(url);
+
+    const listeners = CHANGE_EVENTS.map((type) => {
+      const listener = (message) => {
+        const event = JSON.parse(message.data);
+        if (type !== "deleted" && !event.data) {
+          handlers.current.onReset();
+        } else {
+          handlers.current.onChange(type, event);
+        }
+      };
+      source.addEventListener(type, listener);
+      return [type, listener];
+    });
+    const reset = () => handlers.current.onReset();
+    source.addEventListener("reset", reset);
+
+    return () => {
+      listeners.forEach(([type, listener]) => source.removeEventListener(type, listener));
+      source.removeEventListener("reset", reset);
+      source.close();
+    };
+  }, [url]);
+}
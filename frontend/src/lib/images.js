@@ -0,0 +1,19 @@
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+
+// Cover renditions are served by the backend under /api/images
+export function resolveImageUrl(url) {
+  return url && url.startsWith('/api/') ? `${BACKEND_URL}${url}` : url;
+}
+
+// Variants only describe the current cover if image_url was not replaced since
+export function coverVariants(course) {
+  const cover = course?.image_variants;
+  return cover && cover.src === course.image_url ? cover : null;
+}
+
+export function coverSrcSet(cover, format) {
+  return cover.variants
+    .filter((variant) => variant.format === format)
+    .map((variant) => `${resolveImageUrl(variant.url)} ${variant.width}w`)
+    .join(', ');
+}
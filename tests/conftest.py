@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The API under test is served from the in-memory PostgREST stand-in
+# (backend/fake_supabase.py), without Mongo and with blobs in a temp dir
+STORE_DIR = tempfile.mkdtemp(prefix="classroom-tests-")
+os.environ.pop("MONGO_URL", None)
+os.environ.update({
+    "SUPABASE_BACKEND": "fake",
+    "FAKE_SUPABASE_ROWS": "30",
+    "FAKE_SUPABASE_LATENCY": "0",
+    "SHARED_CACHE_BACKEND": "none",
+    "CHANGE_FEED_BACKEND": "memory",
+    "JOB_QUEUE_BACKEND": "memory",
+    "ADMISSION_ENABLED": "false",
+    "BLOB_STORE_DIR": os.path.join(STORE_DIR, "blobs"),
+    "IMAGE_STORE_DIR": os.path.join(STORE_DIR, "images"),
+})
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server
+
+    return server
+
+
+@pytest.fixture(scope="session")
+def client(server):
+    """TestClient with the app started (lifespan) once for the session"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        yield client
@@ -0,0 +1,137 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from admission import AdmissionControl, AdmissionMiddleware, AdmissionSettings, ConcurrencyLimit, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_admission_is_off_by_default():
+    assert AdmissionSettings().enabled is False
+
+
+def test_bucket_refills_at_the_configured_rate():
+    clock = Clock()
+    limiter = RateLimiter(rate=2, burst=2, max_clients=10, clock=clock)
+    assert limiter.take("a") == limiter.take("a") == 0
+    assert limiter.take("a") == 0.5
+    assert limiter.take("b") == 0  # buckets are per client
+    clock.now = 0.5
+    assert limiter.take("a") == 0
+    assert limiter.take("a", cost=5) == 1.0  # costs are capped at the bucket size
+    assert limiter.limited_total == 2
+
+
+def test_least_recently_seen_buckets_are_dropped():
+    limiter = RateLimiter(rate=1, burst=1, max_clients=2)
+    for key in ("a", "b", "a", "c"):
+        limiter.take(key)
+    assert list(limiter.buckets) == ["a", "c"]
+
+
+def test_concurrency_limit_sheds_past_its_queue():
+    async def run():
+        limit = ConcurrencyLimit(limit=1, queue=1, timeout=0.05)
+        assert await limit.acquire()
+        waiter = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+        assert limit.waiting == 1
+        assert not await limit.acquire()  # queue full
+        assert not await waiter  # timed out
+        limit.release()
+        assert await limit.acquire()
+        return limit
+
+    limit = asyncio.run(run())
+    assert limit.shed_total == 2
+
+
+def make_app(settings: AdmissionSettings):
+    calls = []
+    release = asyncio.Event()
+
+    async def courses(request):
+        calls.append(request.url.path)
+        if request.query_params.get("wait"):
+            await release.wait()
+        return JSONResponse({"calls": len(calls)})
+
+    async def health(request):
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[Route("/api/courses", courses, methods=["GET", "POST"]),
+                            Route("/api/health", health)])
+    control = AdmissionControl(settings)
+    return AdmissionMiddleware(app, control), control, calls, release
+
+
+def client_for(app, address="10.0.0.1"):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=(address, 1234)),
+                             base_url="http://test")
+
+
+def test_empty_bucket_is_429_with_retry_after():
+    app, control, _, _ = make_app(AdmissionSettings(enabled=True, rate=1, burst=5, heavy_cost=5, coalesce=False))
+
+    async def run():
+        async with client_for(app) as client:
+            assert (await client.post("/api/courses")).status_code == 200
+            limited = await client.get("/api/courses")
+            assert limited.status_code == 429
+            assert limited.headers["Retry-After"] == "1"
+            assert (await client.get("/api/health")).status_code == 200
+        async with client_for(app, "10.0.0.2") as other:
+            assert (await other.get("/api/courses")).status_code == 200
+
+    asyncio.run(run())
+    assert control.limiter.limited_total == 1
+
+
+def test_forwarded_address_is_used_only_when_trusted():
+    for trusted, expected in ((False, {"10.0.0.1"}), (True, {"1.1.1.1", "2.2.2.2"})):
+        app, control, _, _ = make_app(AdmissionSettings(enabled=True, trust_forwarded=trusted))
+
+        async def run():
+            async with client_for(app) as client:
+                for address in ("1.1.1.1", "2.2.2.2"):
+                    await client.get("/api/courses", headers={"X-Forwarded-For": f"{address}, 10.0.0.1"})
+
+        asyncio.run(run())
+        assert set(control.limiter.buckets) == expected
+
+
+def test_identical_concurrent_gets_share_one_response():
+    app, control, calls, release = make_app(AdmissionSettings(enabled=True))
+
+    async def run():
+        async with client_for(app) as client:
+            requests = [asyncio.ensure_future(client.get("/api/courses?wait=1")) for _ in range(4)]
+            while not calls:
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.01)
+            release.set()
+            return [response.json() for response in await asyncio.gather(*requests)]
+
+    assert asyncio.run(run()) == [{"calls": 1}] * 4
+    assert control.coalesced_total == 3
+
+
+def test_disabled_admission_passes_everything_through():
+    app, control, calls, _ = make_app(AdmissionSettings(rate=0.001, burst=1))
+
+    async def run():
+        async with client_for(app) as client:
+            return [(await client.get("/api/courses")).status_code for _ in range(3)]
+
+    assert asyncio.run(run()) == [200, 200, 200]
+    assert control.limiter.buckets == {}
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from cache import ReadCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = ReadCache(ttl=10, max_bytes=100, clock=clock)
+    cache.set("a", 1, 1)
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = ReadCache(ttl=10, max_bytes=10)
+    cache.set("a", "a", 4)
+    cache.set("b", "b", 4)
+    cache.get("a")
+    cache.set("c", "c", 4)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("a", None, "c")
+    assert cache.current_bytes == 8
+    cache.set("huge", "x", 11)
+    assert cache.get("huge") is None
+
+
+def test_invalidate_prefix():
+    cache = ReadCache(ttl=10, max_bytes=100)
+    for key in ("list:a", "list:b", "course:1"):
+        cache.set(key, key, 1)
+    cache.invalidate_prefix("list:")
+    assert [cache.get(key) for key in ("list:a", "list:b", "course:1")] == [None, None, "course:1"]
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ReadCache(ttl=10, max_bytes=100)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value", 1
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert calls == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = ReadCache(ttl=10, max_bytes=100)
+
+    async def run():
+        async def loader():
+            cache.invalidate("k")  # a write lands while the read is in flight
+            return "old", 1
+
+        assert await cache.get_or_load("k", loader) == "old"
+
+    asyncio.run(run())
+    assert cache.get("k") is None
+
+
+def test_stale_copy_is_served_when_the_load_fails():
+    clock = Clock()
+    cache = ReadCache(ttl=1, max_bytes=100, stale_ttl=60, clock=clock)
+    cache.set("k", "cached", 1)
+    clock.now = 5
+
+    async def failing():
+        raise ConnectionError("upstream down")
+
+    async def run(stale_on):
+        return await cache.get_or_load("k", failing, stale_on=stale_on)
+
+    assert asyncio.run(run((ConnectionError,))) == "cached"
+    assert cache.stale_served == 1
+    with pytest.raises(ConnectionError):
+        asyncio.run(run(()))
@@ -0,0 +1,50 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from compression import CompressionMiddleware, negotiate
+
+BODY = b"data: " + b"x" * 4096 + b"\n\n"
+
+
+def make_client(media_type: str) -> TestClient:
+    async def endpoint(request):
+        return Response(BODY, media_type=media_type)
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("media_type, encoding", [
+    ("application/json", "gzip"),
+    ("text/plain", "gzip"),
+    ("text/event-stream", None),
+    ("image/png", None),
+])
+def test_compressed_content_types(media_type, encoding):
+    response = make_client(media_type).get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get("Content-Encoding") == encoding
+    assert response.content == BODY
+
+
+def test_negotiate_prefers_client_q_values_then_server_order():
+    encoders = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, br", encoders) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", encoders) == "gzip"
+    assert negotiate("*;q=0.1, zstd;q=0", encoders) == "br"
+    assert negotiate("identity", encoders) is None
+    assert negotiate(None, encoders) is None
+
+
+def test_course_list_is_compressed_with_a_weak_etag(client):
+    params = {"view": "full", "limit": 20}
+    plain = client.get("/api/courses", params=params, headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/api/courses", params=params, headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Vary"] == "Accept-Encoding"
+    assert compressed.headers["ETag"] == "W/" + plain.headers["ETag"]
+    assert compressed.json() == plain.json()
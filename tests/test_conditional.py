@@ -0,0 +1,80 @@
+import pytest
+
+from conditional import content_etag, parse_range, parse_timestamp
+
+
+def test_etag_is_strong_and_content_derived():
+    etag = content_etag(b"[]")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == content_etag(b"[]") != content_etag(b"[ ]")
+
+
+def test_parse_timestamp_drops_microseconds():
+    parsed = parse_timestamp("2026-01-02T03:04:05.678901+00:00")
+    assert parsed.isoformat() == "2026-01-02T03:04:05+00:00"
+    assert parse_timestamp("2026-01-02T03:04:05").tzinfo is not None
+    assert parse_timestamp("yesterday") is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=5-", (5, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=90-500", (90, 99)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=5-4", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 100)
+
+
+def first_course(client) -> dict:
+    return client.get("/api/courses", params={"limit": 1, "sort": "id"}).json()[0]
+
+
+def test_course_etag_gives_304(client):
+    course_id = first_course(client)["id"]
+    response = client.get(f"/api/courses/{course_id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+    cached = client.get(f"/api/courses/{course_id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert client.get(f"/api/courses/{course_id}", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client):
+    course_id = first_course(client)["id"]
+    last_modified = client.get(f"/api/courses/{course_id}").headers["Last-Modified"]
+    assert client.get(f"/api/courses/{course_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    old = "Thu, 01 Jan 1970 00:00:00 GMT"
+    assert client.get(f"/api/courses/{course_id}", headers={"If-Modified-Since": old}).status_code == 200
+
+
+def test_list_etag_changes_after_a_write(client):
+    params = {"limit": 5, "sort": "id"}
+    etag = client.get("/api/courses", params=params).headers["ETag"]
+    assert client.get("/api/courses", params=params, headers={"If-None-Match": etag}).status_code == 304
+    course = first_course(client)
+    progress = (course["progress"] + 1) % 100
+    assert client.put(f"/api/courses/{course['id']}", json={"progress": progress}).status_code == 200
+    assert client.get("/api/courses", params=params, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_list_is_not_stale_after_a_delete(client):
+    params = {"limit": 5, "sort": "id"}
+    page = client.get("/api/courses", params=params)
+    # Deleting a row leaves no newer updated_at behind, so lists have no Last-Modified
+    assert "Last-Modified" not in page.headers
+    assert client.delete(f"/api/courses/{page.json()[0]['id']}").status_code == 200
+    since = "Fri, 01 Jan 2100 00:00:00 GMT"
+    assert client.get("/api/courses", params=params, headers={"If-Modified-Since": since}).status_code == 200
+    assert client.get("/api/courses", params=params, headers={"If-None-Match": page.headers["ETag"]}).status_code == 200
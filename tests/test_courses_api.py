@@ -0,0 +1,116 @@
+import base64
+import json
+import time
+
+import pytest
+
+
+def test_total_count_is_the_same_on_every_page(client, server):
+    total = len(server.fake_supabase.tables["courses"])
+    first = client.get("/api/courses", params={"limit": 10})
+    assert first.status_code == 200
+    assert first.headers["X-Total-Count"] == str(total)
+    second = client.get("/api/courses", params={"limit": 10, "cursor": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    assert second.headers["X-Total-Count"] == str(total)
+    assert {c["id"] for c in first.json()}.isdisjoint(c["id"] for c in second.json())
+
+
+def test_filtered_total_ignores_the_cursor(client, server):
+    tag = "Math"
+    total = sum(1 for row in server.fake_supabase.tables["courses"].values() if row["tag"] == tag)
+    first = client.get("/api/courses", params={"limit": 2, "tag": tag})
+    second = client.get("/api/courses", params={"limit": 2, "tag": tag, "cursor": first.headers["X-Next-Cursor"]})
+    assert first.headers["X-Total-Count"] == second.headers["X-Total-Count"] == str(total)
+
+
+def test_bulk_created_courses_are_cached_as_stored(client, server):
+    response = client.post("/api/courses/bulk", json=[{"title": "Bulk one"}, {"title": "Bulk two"}])
+    assert response.json()["succeeded"] == 2
+    for result in response.json()["results"]:
+        stored = server.fake_supabase.tables["courses"][result["id"]]
+        response = client.get(f"/api/courses/{result['id']}")
+        assert response.json()["version"] == stored["version"]
+        # Served from the cache entry written by the bulk create, which needs the row's updated_at
+        assert response.headers["Last-Modified"]
+
+
+def blob_count(server) -> int:
+    return sum(1 for path in server.blob_store.root.rglob("*") if path.is_file())
+
+
+def settled_blob_count(server, expected: int) -> int:
+    """Blob count once queued deletions had a chance to run"""
+    deadline = time.monotonic() + 5
+    while blob_count(server) != expected and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return blob_count(server)
+
+
+def text_file(text: str) -> dict:
+    return {"name": "a.txt", "type": "text/plain", "data": base64.b64encode(text.encode()).decode()}
+
+
+def test_failed_create_deletes_its_blobs(client, server, monkeypatch):
+    async def refuse(rows):
+        raise server.RepositoryError(status_code=400, detail={"message": "refused"})
+
+    monkeypatch.setattr(server.repository, "insert", refuse)
+    before = blob_count(server)
+    file = {"name": "a.txt", "type": "text/plain", "data": base64.b64encode(b"hello").decode()}
+    assert client.post("/api/courses", json={"title": "t", "files": [file]}).status_code == 400
+    assert client.post("/api/courses/bulk", json=[{"title": "t", "files": [file]}]).json()["failed"] == 1
+    assert settled_blob_count(server, before) == before
+
+
+def test_replaced_attachments_are_deleted(client, server):
+    course = client.post("/api/courses", json={"title": "replaced", "files": [text_file("old")]}).json()
+    kept = client.post("/api/courses", json={"title": "kept", "files": [text_file("kept")]}).json()
+    count = blob_count(server)
+    response = client.put(f"/api/courses/{course['id']}", json={"files": [text_file("new")]})
+    assert response.status_code == 200
+    # The new blob replaces the old one; untouched files are not deleted
+    assert client.put(f"/api/courses/{kept['id']}", json={"files": kept["files"]}).status_code == 200
+    assert settled_blob_count(server, count) == count
+    assert client.get(f"/api/courses/{kept['id']}/files/{kept['files'][0]['id']}").status_code == 200
+
+
+def test_failed_file_patch_deletes_added_blobs(client, server):
+    course = client.post("/api/courses", json={"title": "patched"}).json()
+    before = blob_count(server)
+    ops = [{"op": "add", "file": text_file("kept?")}, {"op": "remove", "id": "missing"}]
+    response = client.patch(f"/api/courses/{course['id']}/files", json={"version": course["version"], "ops": ops})
+    assert response.status_code == 404
+    assert blob_count(server) == before
+
+
+def test_file_patch_losing_the_version_race_deletes_added_blobs(client, server, monkeypatch):
+    course = client.post("/api/courses", json={"title": "raced"}).json()
+    update = server.repository.update
+
+    async def concurrent_update(ids, changes, version=None):
+        # Another writer gets in between the version check and the write
+        server.fake_supabase.tables["courses"][course["id"]]["version"] += 1
+        return await update(ids, changes, version)
+
+    monkeypatch.setattr(server.repository, "update", concurrent_update)
+    before = blob_count(server)
+    ops = [{"op": "add", "file": text_file("raced")}]
+    response = client.patch(f"/api/courses/{course['id']}/files", json={"version": course["version"], "ops": ops})
+    assert response.status_code == 409
+    assert settled_blob_count(server, before) == before
+
+
+@pytest.mark.parametrize("view", ["summary", "full"])
+def test_export_matches_list_pages(client, server, view):
+    exported = client.get("/api/courses/export", params={"view": view, "sort": "id"}).json()
+    listed = client.get("/api/courses", params={"view": view, "sort": "id", "limit": 100}).json()
+    assert exported == listed
+
+
+def test_ndjson_export(client, server):
+    response = client.get("/api/courses/export", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == len(server.fake_supabase.tables["courses"])
+    assert all(json.loads(line)["id"] for line in lines)
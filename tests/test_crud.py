@@ -0,0 +1,48 @@
+import base64
+import uuid
+
+# The create/read/update/delete flow backend_test.py used to run against a
+# deployed preview; benchmarks/load.py covers throughput and latency
+
+
+def test_course_lifecycle(client):
+    assert client.get("/api/").status_code == 200
+
+    created = client.post("/api/courses", json={
+        "title": "Test Course - API Testing",
+        "description": "This is a test course created by automated testing",
+        "image_url": "https://picsum.photos/800/450",
+        "content_description": "Test content description",
+        "files": [],
+        "progress": 0,
+        "tag": "TEST",
+    })
+    assert created.status_code in (200, 201)
+    course_id = created.json()["id"]
+    assert client.get(f"/api/courses/{course_id}").json()["title"] == "Test Course - API Testing"
+
+    updated = client.put(f"/api/courses/{course_id}", json={
+        "title": "Updated Test Course - API Testing",
+        "content_description": "Updated content description with more details",
+        "progress": 25,
+    })
+    assert updated.status_code == 200
+    assert (updated.json()["title"], updated.json()["progress"]) == ("Updated Test Course - API Testing", 25)
+
+    pdf = base64.b64encode(b"%PDF-1.4\n%%EOF\n").decode()
+    with_files = client.put(f"/api/courses/{course_id}", json={"files": [{
+        "name": "test-document.pdf",
+        "type": "application/pdf",
+        "size": 1024,
+        "data": f"data:application/pdf;base64,{pdf}",
+        "lastModified": 1640995200000,
+    }]})
+    assert with_files.status_code == 200
+    assert [f["name"] for f in with_files.json()["files"]] == ["test-document.pdf"]
+
+    assert client.delete(f"/api/courses/{course_id}").status_code in (200, 204)
+    assert client.get(f"/api/courses/{course_id}").status_code == 404
+
+
+def test_unknown_course_is_404(client):
+    assert client.get(f"/api/courses/{uuid.uuid4()}").status_code == 404
@@ -0,0 +1,39 @@
+import io
+
+import pytest
+from PIL import Image
+
+from images import ImageError, render_cover
+
+
+def png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_cover_variants_are_never_upscaled():
+    rendered = render_cover(png(900, 450), widths=(400, 800, 1200))
+    assert (rendered["width"], rendered["height"]) == (900, 450)
+    assert sorted({(v["width"], v["height"]) for v in rendered["variants"]}) == [(400, 200), (800, 400), (900, 450)]
+    assert {v["format"] for v in rendered["variants"]} == {"webp", "jpg"}
+    assert rendered["placeholder"].startswith("data:image/jpeg;base64,")
+
+
+def test_unreadable_cover_is_rejected():
+    with pytest.raises(ImageError):
+        render_cover(b"not an image")
+
+
+def test_uploaded_cover_is_served_by_content_hash(client):
+    course_id = client.post("/api/courses", json={"title": "cover"}).json()["id"]
+    response = client.post(f"/api/courses/{course_id}/cover", files={"file": ("cover.png", png(500, 250), "image/png")})
+    assert response.status_code == 200
+    course = response.json()
+    assert course["image_url"] == course["image_variants"]["src"]
+    image = client.get(course["image_url"])
+    assert image.headers["Content-Type"] == "image/jpeg"
+    assert Image.open(io.BytesIO(image.content)).size == (500, 250)
+    assert client.get(course["image_url"], headers={"If-None-Match": image.headers["ETag"]}).status_code == 304
+    invalid = client.post(f"/api/courses/{course_id}/cover", files={"file": ("x.png", b"nope", "image/png")})
+    assert invalid.status_code == 400
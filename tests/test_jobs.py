@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from jobs import JobQueue
+
+
+def run_queue(scenario, **options):
+    """Run `scenario(queue)` against a started in-memory JobQueue"""
+    async def run():
+        queue = JobQueue(backoff=0.01, max_backoff=0.05, drain_timeout=1, **options)
+        await queue.setup()
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.close()
+
+    return asyncio.run(run())
+
+
+async def settle(queue: JobQueue, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while queue.jobs:
+        assert asyncio.get_running_loop().time() < deadline, queue.stats()
+        await asyncio.sleep(0.005)
+
+
+def test_jobs_run_and_keys_deduplicate():
+    seen = []
+
+    async def handler(payload):
+        seen.append(payload["n"])
+
+    async def scenario(queue):
+        queue.register("work", handler)
+        first = await queue.enqueue("work", {"n": 1}, key="k")
+        again = await queue.enqueue("work", {"n": 2}, key="k")
+        await settle(queue)
+        return first, again, queue
+
+    first, again, queue = run_queue(scenario)
+    assert again is first
+    assert seen == [1]
+    assert (first.status, queue.completed_total, queue.deduplicated_total) == ("done", 1, 1)
+
+
+def test_unknown_kind_is_refused():
+    async def scenario(queue):
+        with pytest.raises(ValueError):
+            await queue.enqueue("nope", {})
+
+    run_queue(scenario)
+
+
+def test_failed_job_is_retried_then_dead_lettered():
+    attempts = {"flaky": 0, "broken": 0}
+
+    async def flaky(payload):
+        attempts["flaky"] += 1
+        if attempts["flaky"] < 3:
+            raise RuntimeError("not yet")
+
+    async def broken(payload):
+        attempts["broken"] += 1
+        raise ValueError()
+
+    async def scenario(queue):
+        queue.register("flaky", flaky)
+        queue.register("broken", broken)
+        await queue.enqueue("flaky", {})
+        job = await queue.enqueue("broken", {})
+        await settle(queue)
+        dead = await queue.dead_letters()
+        retried = await queue.retry(job.id)
+        await settle(queue)
+        return queue, dead, retried
+
+    queue, dead, retried = run_queue(scenario, max_attempts=3)
+    assert attempts == {"flaky": 3, "broken": 6}
+    assert [(entry["kind"], entry["attempts"], entry["error"]) for entry in dead] == [("broken", 3, "ValueError")]
+    assert retried is not None and retried.status == "dead"
+    assert (queue.completed_total, queue.dead_total) == (1, 2)
+
+
+def test_ordered_kind_waits_behind_a_failed_job():
+    done = []
+    failures = {1: 2}
+
+    async def publish(payload):
+        n = payload["n"]
+        if failures.get(n):
+            failures[n] -= 1
+            raise RuntimeError("feed down")
+        done.append(n)
+
+    async def scenario(queue):
+        queue.register("publish", publish, ordered=True)
+        for n in range(5):
+            await queue.enqueue("publish", {"n": n})
+        await settle(queue)
+
+    run_queue(scenario)
+    assert done == [0, 1, 2, 3, 4]
+
+
+def test_timed_out_job_counts_as_failed():
+    async def slow(payload):
+        await asyncio.sleep(1)
+
+    async def scenario(queue):
+        queue.register("slow", slow)
+        await queue.enqueue("slow", {})
+        await settle(queue)
+        return queue
+
+    queue = run_queue(scenario, max_attempts=1, timeout=0.01)
+    assert queue.dead[0].error == "TimeoutError"
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+import pytest
+
+from jsonstream import JSONStreamError, iter_array_items
+
+
+def split(data: bytes, size: int) -> list:
+    async def chunks():
+        for n in range(0, len(data), size):
+            yield data[n:n + size]
+
+    async def collect():
+        return [item async for item in iter_array_items(chunks())]
+
+    return asyncio.run(collect())
+
+
+ROWS = [
+    {"id": "a", "files": [{"data": "QUJD" * 100}], "tags": ["x", "y"]},
+    {"id": "b", "title": "quote \" backslash \\ bracket ] brace } comma ,"},
+    "string item",
+    12.5,
+    [],
+]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100_000])
+def test_items_survive_any_chunking(size):
+    data = json.dumps(ROWS, indent=1).encode()
+    assert [json.loads(item) for item in split(data, size)] == ROWS
+
+
+def test_empty_array():
+    assert split(b" [ ] ", 1) == []
+
+
+@pytest.mark.parametrize("data, message", [
+    (b'{"a": 1}', "expected a JSON array"),
+    (b"[1,,2]", "empty array item"),
+    (b'[{"a": "]"}', "truncated JSON array"),
+])
+def test_malformed_input(data, message):
+    with pytest.raises(JSONStreamError, match=message):
+        split(data, 3)
@@ -0,0 +1,43 @@
+import pytest
+
+from metrics import Counter, Histogram, Metric, endpoint_table
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe("/a", value=value)
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 4.05',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("requests_total", "Requests", ("path",))
+    counter.inc('a"b\\c')
+    assert counter.render()[-1] == 'requests_total{path="a\\"b\\\\c"} 1'
+
+
+def test_metric_must_render():
+    with pytest.raises(TypeError):
+        Metric("m", "doc")
+
+
+def test_endpoint_table():
+    assert endpoint_table("courses?id=eq.1") == "courses"
+    assert endpoint_table("/rpc/search") == "rpc"
+
+
+def test_requests_are_labelled_by_route_template(client):
+    course_id = client.get("/api/courses", params={"limit": 1}).json()[0]["id"]
+    client.get(f"/api/courses/{course_id}")
+    scrape = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/courses/{course_id}",status="200"}' in scrape
+    assert course_id not in scrape
+    assert 'supabase_requests_total{method="GET",table="courses"' in scrape
@@ -0,0 +1,67 @@
+import base64
+import os
+
+import pytest
+
+from payloads import PayloadLimits, base64_size, decode_payload, without_content
+
+
+def test_base64_size_matches_decoded_length():
+    for size in (0, 1, 2, 3, 100, 1001):
+        encoded = base64.b64encode(os.urandom(size)).decode()
+        assert base64_size(encoded) == size
+        assert base64_size("data:text/plain;base64," + encoded) == size
+
+
+def test_decode_payload_replaces_data_with_content():
+    body = b'{"title": "t", "files": [{"name": "a.txt", "type": "text/plain", "data": "aGVsbG8="}]}'
+    data = decode_payload(body, PayloadLimits())
+    assert data["files"] == [{"name": "a.txt", "type": "text/plain", "content": b"hello"}]
+
+
+def test_without_content_drops_bytes():
+    data = {"files": [{"name": "a", "content": b"x"}], "title": None}
+    assert without_content(data) == {"files": [{"name": "a"}], "title": None}
+    assert without_content(b"raw") is None
+
+
+def inline_file(size: int) -> dict:
+    return {"name": "big.bin", "type": "application/octet-stream",
+            "data": base64.b64encode(os.urandom(size)).decode()}
+
+
+@pytest.mark.parametrize("size", [1_000, 300_000])
+def test_invalid_course_body_is_422(client, server, size):
+    # 300KB bodies are decoded in a worker process, with `content` bytes in place of `data`
+    offloaded = server.payload_parser.offloaded_total
+    response = client.post("/api/courses", json={"description": "no title", "files": [inline_file(size)]})
+    assert response.status_code == 422
+    assert any(error["loc"] == ["body", "title"] for error in response.json()["detail"])
+    assert server.payload_parser.offloaded_total == offloaded + (size > PayloadLimits.offload_bytes)
+
+
+def test_oversized_file_is_413(client, server, monkeypatch):
+    monkeypatch.setattr(server.payload_limits, "max_file_bytes", 1000)
+    response = client.post("/api/courses", json={"title": "t", "files": [inline_file(2000)]})
+    assert response.status_code == 413
+
+
+def test_oversized_body_is_413_before_it_is_read(client, server, monkeypatch):
+    monkeypatch.setattr(server.payload_limits, "max_body_bytes", 1000)
+    response = client.post("/api/courses", json={"title": "t", "description": "x" * 2000})
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Request body exceeds 1000 bytes"
+
+
+def test_disallowed_file_type_is_rejected(client, server, monkeypatch):
+    monkeypatch.setattr(server.payload_limits, "allowed_file_types", ("image/",))
+    file = {**inline_file(10), "type": "application/x-msdownload"}
+    assert client.post("/api/courses", json={"title": "t", "files": [file]}).status_code == 415
+
+
+@pytest.mark.parametrize("size", [1_000, 300_000])
+def test_invalid_base64_is_400(client, server, size):
+    file = {**inline_file(size), "data": "!" * (size * 4 // 3)}
+    response = client.post("/api/courses", json={"title": "t", "files": [file]})
+    assert response.status_code == 400
+    assert "Base64" in response.json()["detail"]
@@ -0,0 +1,32 @@
+from postgrest import build_query, decode_cursor, encode_cursor, keyset_filter, parse_content_range
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("title", "asc", "Algebra, part 2", "id-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "title", "asc") == ("Algebra, part 2", "id-1")
+
+
+def test_cursor_for_another_order_is_rejected():
+    cursor = encode_cursor("title", "asc", "A", "id-1")
+    assert decode_cursor(cursor, "title", "desc") is None
+    assert decode_cursor(cursor, "id", "asc") is None
+
+
+def test_malformed_cursor_is_rejected():
+    for cursor in ("", "not base64!", encode_cursor("title", "asc", "A", 7), "WyJ0aXRsZSJd"):
+        assert decode_cursor(cursor, "title", "asc") is None
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    assert keyset_filter("id", "desc", None, "abc") == ("id", "lt.abc")
+    assert keyset_filter("title", "asc", "A,B", "abc") == ("or", '(title.gt."A,B",and(title.eq."A,B",id.gt.abc))')
+
+
+def test_build_query_and_content_range():
+    assert build_query("courses", []) == "courses"
+    assert build_query("courses", [("tag", "eq.AIS+"), ("limit", 5)]) == "courses?tag=eq.AIS%2B&limit=5"
+    assert parse_content_range("0-24/1234") == 1234
+    assert parse_content_range("*/~90") == 90
+    assert parse_content_range("0-24/*") is None
+    assert parse_content_range(None) is None
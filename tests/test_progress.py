@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from progress import ProgressBacklogFull, ProgressStore
+
+
+class Collection:
+    def __init__(self):
+        self.down = True
+        self.written = 0
+
+    async def find_one(self, query, projection):
+        return None
+
+    async def bulk_write(self, operations, ordered):
+        if self.down:
+            raise ConnectionError("mongo is down")
+        self.written += len(operations)
+
+
+def make_store(collection, **kwargs):
+    return ProgressStore({"course_progress": collection}, max_pending=4, **kwargs)
+
+
+def test_pending_records_are_capped_while_mongo_is_down():
+    collection = Collection()
+    store = make_store(collection)
+
+    async def scenario():
+        for course in "abcd":
+            await store.record("u", course, 10)
+        with pytest.raises(ProgressBacklogFull):
+            await store.record("u", "e", 10)
+        # Heartbeats for pending records still coalesce
+        assert (await store.record("u", "a", 20))["percent"] == 20
+        assert await store.flush() == 0
+        with pytest.raises(ProgressBacklogFull):
+            await store.record("u", "e", 10)
+
+        collection.down = False
+        assert await store.flush() == 4
+        await store.record("u", "e", 10)
+
+    asyncio.run(scenario())
+    assert store.stats()["pending"] == 1
+    assert store.stats()["rejected_total"] == 2
+    assert collection.written == 4
+
+
+def test_full_backlog_is_a_503_with_retry_after(client, server, monkeypatch):
+    store = make_store(Collection())
+    monkeypatch.setattr(server, "progress_store", store)
+    for course in "abcd":
+        assert client.put(f"/api/progress/u/{course}", json={"percent": 10}).status_code == 200
+    response = client.put("/api/progress/u/e", json={"percent": 10})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert len(store.dirty) == 4
@@ -0,0 +1,57 @@
+from typing import List, Optional
+
+import orjson
+import pytest
+from pydantic import BaseModel
+
+from records import CourseRecords, extend_object, join_array
+from serialization import RowProjector
+
+
+class Full(BaseModel):
+    id: str
+    title: str
+    version: int = 1
+    files: List[dict] = []
+
+
+class Summary(BaseModel):
+    id: str
+    title: str
+    file_count: Optional[int] = None
+
+
+def make_records() -> CourseRecords:
+    return CourseRecords(RowProjector(Full), RowProjector(Summary))
+
+
+def row(version: int = 1, **extra) -> dict:
+    return {"id": "c1", "title": "Algebra", "version": version, "updated_at": f"t{version}",
+            "files": [{"id": "f", "name": "a.txt", "size": 3}], "unknown": True, **extra}
+
+
+def test_record_bodies_match_the_response_models():
+    record = make_records().build(row())
+    assert orjson.loads(record.body("full")) == {"id": "c1", "title": "Algebra", "version": 1,
+                                                 "files": [{"id": "f", "name": "a.txt", "size": 3}]}
+    assert orjson.loads(record.body("summary")) == {"id": "c1", "title": "Algebra", "file_count": 1}
+    with pytest.raises(AttributeError):
+        record.title = "changed"
+
+
+def test_unchanged_rows_reuse_their_record():
+    records = make_records()
+    first = records.build(row())
+    assert records.build(row()) is first
+    newer = records.build(row(version=2, title="Linear algebra"))
+    assert newer is not first and b"Linear algebra" in newer.body("full")
+    # An older row read later does not displace the interned newer record
+    records.build(row())
+    assert records.build(row(version=2)) is newer
+    assert records.stats()["reused_total"] == 2
+
+
+def test_fragments_join_into_json():
+    body = join_array([b'{"a":1}', extend_object(b'{"b":2}', {"score": 0.5})])
+    assert orjson.loads(body) == [{"a": 1}, {"b": 2, "score": 0.5}]
+    assert join_array([]) == b"[]"
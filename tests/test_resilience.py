@@ -0,0 +1,158 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+import pytest
+
+from resilience import BreakerSettings, CircuitBreaker, CircuitOpen, UpstreamBusy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Answer:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+def respond(status_code: int, delay: float = 0.0):
+    async def call():
+        await asyncio.sleep(delay)
+        return Answer(status_code)
+    return call
+
+
+def test_breaker_opens_on_failures_and_closes_after_probes():
+    clock = Clock()
+    breaker = CircuitBreaker(BreakerSettings(min_calls=4, window=4, open_seconds=10, half_open_calls=2), clock=clock)
+
+    async def run():
+        for status in (200, 500, 500, 503):
+            await breaker.call(respond(status))
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            await breaker.call(respond(200))
+        clock.now = 10
+        await breaker.call(respond(200))
+        assert breaker.state == "half_open"
+        await breaker.call(respond(200))
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+    assert (breaker.trips_total, breaker.rejected_total) == (1, 1)
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker(BreakerSettings(min_calls=2, window=2))
+
+    async def run():
+        for _ in range(4):
+            await breaker.call(respond(404))
+
+    asyncio.run(run())
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_the_breaker():
+    clock = Clock()
+    breaker = CircuitBreaker(BreakerSettings(min_calls=1, window=1, open_seconds=5), clock=clock)
+
+    async def run():
+        await breaker.call(respond(500))
+        clock.now = 5
+        await breaker.call(respond(500))
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+    assert breaker.trips_total == 2
+
+
+def hedging_breaker(delay: float = 0.01) -> CircuitBreaker:
+    breaker = CircuitBreaker(BreakerSettings(hedge_enabled=True, hedge_min_samples=1, hedge_min_delay=delay))
+    breaker.record(False, 0.0)
+    return breaker
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    breaker = hedging_breaker()
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return Answer(200)
+
+    async def run():
+        response = await breaker.call(call, hedge=True)
+        assert response.status_code == 200
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert (breaker.hedges_total, breaker.hedge_wins_total, breaker.in_flight) == (1, 1, 0)
+
+
+def test_no_hedge_without_enough_samples():
+    breaker = CircuitBreaker(BreakerSettings(hedge_enabled=True, hedge_min_samples=5))
+    assert breaker.hedge_delay() is None
+
+
+class Upstream:
+    """A call that hangs until released, counting attempts still running"""
+
+    def __init__(self):
+        self.started = 0
+        self.running = 0
+
+    async def __call__(self):
+        self.started += 1
+        self.running += 1
+        try:
+            await asyncio.sleep(3600)
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.parametrize("cancel_after, attempts", [(0.001, 1), (0.05, 2)])
+def test_cancelled_caller_cancels_its_attempts(cancel_after, attempts):
+    async def run():
+        breaker = hedging_breaker()
+        upstream = Upstream()
+        caller = asyncio.ensure_future(breaker.call(upstream, hedge=True))
+        await asyncio.sleep(cancel_after)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.01)
+        # Checked before asyncio.run() cancels whatever is left
+        assert upstream.started == attempts
+        assert upstream.running == 0
+        assert breaker.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_stream_holds_its_slot_until_closed():
+    breaker = CircuitBreaker(BreakerSettings(max_concurrency=1, acquire_timeout=0.01, min_calls=2, window=2))
+
+    async def run():
+        async with AsyncExitStack() as stack:
+            assert (await breaker.open_stream(stack, respond(200))).status_code == 200
+            assert breaker.in_flight == 1
+            with pytest.raises(UpstreamBusy):
+                await breaker.call(respond(200))
+        assert breaker.in_flight == 0
+
+        # Failed opens count like failed calls
+        async with AsyncExitStack() as stack:
+            await breaker.open_stream(stack, respond(503))
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpen):
+            async with AsyncExitStack() as stack:
+                await breaker.open_stream(stack, respond(200))
+        assert breaker.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,52 @@
+import time
+
+from search import SearchIndex, tokenize
+
+
+def make_index() -> SearchIndex:
+    index = SearchIndex()
+    index.add("1", {"title": "Linear algebra", "description": "Vectors and matrices"}, {"id": "1"})
+    index.add("2", {"title": "Calculus", "description": "Limits, with some linear approximation"}, {"id": "2"})
+    index.add("3", {"title": "Café <b>français</b>"}, {"id": "3"})
+    return index
+
+
+def ids(hits):
+    return [document["id"] for _, document in hits]
+
+
+def test_tokenize_folds_case_accents_and_markup():
+    assert tokenize("Café <b>Français</b>!") == ["cafe", "francais"]
+
+
+def test_title_hits_rank_first():
+    total, hits = make_index().search("linear")
+    assert (total, ids(hits)) == (2, ["1", "2"])
+
+
+def test_every_word_must_match_and_the_last_is_a_prefix():
+    index = make_index()
+    assert ids(index.search("linear matr")[1]) == ["1"]
+    assert ids(index.search("linear matr", prefix=False)[1]) == []
+    assert ids(index.search("franc")[1]) == ["3"]
+
+
+def test_reindex_and_remove():
+    index = make_index()
+    index.add("1", {"title": "Geometry"}, {"id": "1"})
+    assert ids(index.search("linear")[1]) == ["2"]
+    index.remove("2")
+    assert index.search("linear") == (0, [])
+    assert "limits" not in index.terms
+
+
+def test_search_endpoint_follows_writes(client, server):
+    deadline = time.monotonic() + 5
+    while not server.course_search.ready and time.monotonic() < deadline:
+        time.sleep(0.02)
+    course = client.post("/api/courses", json={"title": "Xylophone workshop", "tag": "Music"}).json()
+    results = client.get("/api/courses/search", params={"q": "xylo"}).json()
+    assert results["total"] == 1 and results["results"][0]["id"] == course["id"]
+    assert client.get("/api/courses/search", params={"q": "xylo", "tag": "Math"}).json()["total"] == 0
+    client.delete(f"/api/courses/{course['id']}")
+    assert client.get("/api/courses/search", params={"q": "xylo"}).json()["total"] == 0
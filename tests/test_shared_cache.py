@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from shared_cache import MongoSharedCache
+
+
+class Collection:
+    """Enough of a Motor collection for the version bumps; `down` makes every
+    call hang like an unreachable server"""
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+        self.versions = {}
+
+    async def _call(self):
+        self.calls += 1
+        if self.down:
+            await asyncio.sleep(60)
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        await self._call()
+        self.versions[query["_id"]] = self.versions.get(query["_id"], 0) + 1
+        return {"_id": query["_id"], "version": self.versions[query["_id"]]}
+
+    async def bulk_write(self, operations, ordered):
+        await self._call()
+        for operation in operations:
+            scope = operation._filter["_id"]
+            self.versions[scope] = self.versions.get(scope, 0) + 1
+
+
+def make_cache(collection, **kwargs):
+    return MongoSharedCache({"course_cache": Collection(), "course_cache_versions": collection},
+                            ttl=60, timeout=0.05, **kwargs)
+
+
+def test_bump_returns_new_versions():
+    collection = Collection()
+    cache = make_cache(collection)
+    assert asyncio.run(cache.bump(["list", "course:1"])) == {"list": 1, "course:1": 1}
+    assert asyncio.run(cache.bump(["list"])) == {"list": 2}
+
+
+def test_bumps_are_bounded_while_mongo_is_down():
+    collection = Collection()
+    collection.down = True
+    cache = make_cache(collection)
+
+    async def scenario():
+        started = time.monotonic()
+        assert await cache.bump(["list", "course:1", "course:2"]) == {}
+        await cache.bump_many(["list", "course:3"])
+        await cache.bump(["list", "course:4"])
+        return time.monotonic() - started
+
+    # One timeout for the first write; the rest skip Mongo entirely
+    assert asyncio.run(scenario()) < 0.5
+    assert not cache.available
+    assert collection.calls == 3
+    assert cache.stats()["pending_bumps"] == 5
+
+
+def test_skipped_bumps_are_applied_before_the_cache_is_used_again():
+    collection = Collection()
+    cache = make_cache(collection, retry_after=0)
+    collection.down = True
+    asyncio.run(cache.bump(["list", "course:1"]))
+    assert collection.versions == {}
+
+    collection.down = False
+    asyncio.run(cache.bump(["course:2"]))
+    assert collection.versions == {"list": 1, "course:1": 1, "course:2": 1}
+    assert cache.stats()["pending_bumps"] == 0
+
+
+def test_course_writes_are_not_held_up_by_a_down_shared_cache(client, server, monkeypatch):
+    collection = Collection()
+    collection.down = True
+    cache = make_cache(collection)
+    monkeypatch.setattr(server, "shared_cache", cache)
+    started = time.monotonic()
+    for title in ("one", "two", "three"):
+        assert client.post("/api/courses", json={"title": title}).status_code in (200, 201)
+    assert time.monotonic() - started < 1.5
+    assert not cache.available
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+import pytest
+
+from supabase_client import PoolSettings, SupabaseClient
+
+
+def make_client(handler, **settings):
+    return SupabaseClient("https://example.supabase.co", "key",
+                          PoolSettings(backoff_base=0, **settings), transport=httpx.MockTransport(handler))
+
+
+def test_requests_share_one_client():
+    seen = []
+
+    def handler(request):
+        seen.append((str(request.url), request.headers["apikey"]))
+        return httpx.Response(200, json=[])
+
+    supabase = make_client(handler)
+
+    async def run():
+        await supabase.request("GET", "courses?select=id")
+        client = supabase._client
+        await supabase.request("GET", "courses?select=id")
+        assert supabase._client is client
+        await supabase.close()
+        assert supabase.pool_stats()["started"] is False
+
+    asyncio.run(run())
+    assert seen == [("https://example.supabase.co/rest/v1/courses?select=id", "key")] * 2
+    assert supabase.requests_total == 2
+
+
+def test_connection_failures_are_retried():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json=[])
+
+    supabase = make_client(handler, max_retries=2)
+    assert asyncio.run(supabase.request("GET", "courses")).status_code == 200
+    assert supabase.retries_total == 2
+
+    attempts.clear()
+    supabase = make_client(handler, max_retries=1)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(supabase.request("GET", "courses"))
+    assert supabase.errors_total == 1
+
+
+def test_pool_settings_from_env(monkeypatch):
+    monkeypatch.setenv("SUPABASE_POOL_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("SUPABASE_READ_TIMEOUT", "1.5")
+    settings = PoolSettings.from_env()
+    assert (settings.max_connections, settings.read_timeout) == (7, 1.5)
+    assert settings.max_keepalive_connections == PoolSettings.max_keepalive_connections